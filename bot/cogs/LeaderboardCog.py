@@ -1,11 +1,11 @@
 import math
 from datetime import datetime, timedelta
 import discord
-from discord.ext import tasks, commands
+from discord.ext import commands
 import asyncio
 import bot.db.queries.leaderboard
-import bot.utils.io
 from bot.classes import ErrorHandlerCog
+from bot.utils.Outbound import Outbound
 from bot.utils.emojis import TOP_1_GLOBAL, TOP_2_GLOBAL, TOP_3_GLOBAL, TOP_25_GLOBAL, ECO, ECO_NEGATIVE, NEW_TEAM, \
     TOP_1_PERCENT
 
@@ -21,6 +21,7 @@ class LeaderboardCog(ErrorHandlerCog):
                       "That channel will no longer be updated."
         }
     }
+    MAX_CONCURRENT_UPDATES = 3  # Leaderboard channels updated at once
 
     def __init__(self, bot: commands.Bot) -> None:
         super().__init__(bot)
@@ -29,16 +30,22 @@ class LeaderboardCog(ErrorHandlerCog):
         self.current_ct_id = ""
         self.first_run = True
         self.next_update = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        self.leader_token: int or None = None
 
     async def cog_load(self) -> None:
+        if not self.bot.background_jobs:
+            return
         await self.load_state()
-        self.track_leaderboard.start()
+        self.bot.leader.declare("leaderboard")
+        self.bot.scheduler.register("leaderboard:update", self.track_leaderboard)
+        self.bot.scheduler.schedule("leaderboard:update", None, self.next_update, every=timedelta(hours=1))
 
     def cog_unload(self) -> None:
-        self.track_leaderboard.cancel()
+        self.bot.scheduler.unregister("leaderboard:update")
+        self.bot.scheduler.cancel("leaderboard:update", None)
 
     async def load_state(self) -> None:
-        state = await asyncio.to_thread(bot.utils.io.get_cog_state, "leaderboard")
+        state = await self.bot.state.get("leaderboard")
         if state is None:
             return
 
@@ -53,12 +60,15 @@ class LeaderboardCog(ErrorHandlerCog):
             self.last_hour_score = data["last_hour_score"]
         self.first_run = False
 
-    async def save_state(self) -> None:
+    def save_state(self) -> None:
+        # Shared by every process, so only the leader writes it
+        if not self.bot.leader.holds("leaderboard", self.leader_token):
+            return
         data = {
             "current_ct_id": self.current_ct_id,
             "last_hour_score": self.last_hour_score,
         }
-        await asyncio.to_thread(bot.utils.io.save_cog_state, "leaderboard", data)
+        self.bot.state.set("leaderboard", data)
 
     @leaderboard_group.command(name="add", description="Add a leaderboard to a channel.")
     @discord.app_commands.describe(channel="The channel to add it to.")
@@ -87,12 +97,16 @@ class LeaderboardCog(ErrorHandlerCog):
             ephemeral=True,
         )
 
-    @tasks.loop(seconds=10)
-    async def track_leaderboard(self) -> None:
+    async def track_leaderboard(self, _key: None = None, _payload: None = None) -> None:
         now = datetime.now()
-        if now < self.next_update:
+        self.next_update = self.bot.scheduler.get("leaderboard:update", None)
+        token = self.bot.leader.token("leaderboard")
+        if token is None:
             return
-        self.next_update += timedelta(hours=1)
+        if token != self.leader_token:
+            # Another process may have been updating it in the meantime
+            self.leader_token = token
+            await self.load_state()
 
         msg_header = ("Team                                                 |    Points\n"
                       "———————————————— + —————") \
@@ -167,41 +181,62 @@ class LeaderboardCog(ErrorHandlerCog):
                                      top_1_percent_message + \
                                      time_remaining_message + \
                                      f"\n*Last updated: <t:{int(now.timestamp())}:R>*"
+        # Fetching takes a while, leadership might have moved on since
+        if not self.bot.leader.holds("leaderboard", token):
+            return
         self.last_hour_score = current_hour_score
 
         await self.send_leaderboard(messages)
         self.first_run = False
 
-        await self.save_state()
+        self.save_state()
 
     async def send_leaderboard(self, messages: list[str]) -> None:
+        channels = await bot.db.queries.leaderboard.leaderboard_channels()
+        # A few at a time, so the outbound queue isn't flooded and other writes can go in between
+        update_slots = asyncio.Semaphore(LeaderboardCog.MAX_CONCURRENT_UPDATES)
+
+        async def update(guild_id: int, channel_id: int) -> None:
+            async with update_slots:
+                await self.update_leaderboard_channel(guild_id, channel_id, messages)
+
+        await asyncio.gather(*[update(leaderboard.guild_id, leaderboard.channel_id) for leaderboard in channels])
+
+    async def update_leaderboard_channel(self, guild_id: int, channel_id: int, messages: list[str]) -> None:
+        guild = await self.bot.resolver.guild(guild_id, on_missing=self.on_guilds_missing)
+        if guild is None:
+            return
+
+        channel = await self.bot.resolver.channel(channel_id, on_missing=self.on_channels_missing)
+        if channel is None:
+            return
+        try:
+            await bot.utils.discordutils.update_messages(
+                self.bot.user,
+                [(x, None) for x in messages],
+                channel,
+                tolerance=0,
+                outbound=self.bot.outbound,
+                priority=Outbound.LEADERBOARD,
+            )
+        except discord.Forbidden:
+            pass
+
+    @staticmethod
+    async def on_guilds_missing(guild_ids: list[int]) -> None:
+        channels = await bot.db.queries.leaderboard.leaderboard_channels()
+        for leaderboard in channels:
+            if leaderboard.guild_id in guild_ids:
+                await bot.db.queries.leaderboard.remove_leaderboard_channel(leaderboard.guild_id,
+                                                                            leaderboard.channel_id)
+
+    @staticmethod
+    async def on_channels_missing(channel_ids: list[int]) -> None:
         channels = await bot.db.queries.leaderboard.leaderboard_channels()
         for leaderboard in channels:
-            guild_id, channel_id = leaderboard.guild_id, leaderboard.channel_id
-            guild = self.bot.get_guild(guild_id)
-            if guild is None:
-                try:
-                    guild = await self.bot.fetch_guild(guild_id)
-                except discord.NotFound:
-                    await bot.db.queries.leaderboard.remove_leaderboard_channel(guild_id, channel_id)
-                    continue
-
-            channel = guild.get_channel(channel_id)
-            if channel is None:
-                try:
-                    channel = await guild.fetch_channel(channel_id)
-                except discord.NotFound:
-                    await bot.db.queries.leaderboard.remove_leaderboard_channel(guild_id, channel_id)
-                    continue
-            try:
-                await bot.utils.discordutils.update_messages(
-                    self.bot.user,
-                    [(x, None) for x in messages],
-                    channel,
-                    tolerance=0
-                )
-            except discord.Forbidden:
-                pass
+            if leaderboard.channel_id in channel_ids:
+                await bot.db.queries.leaderboard.remove_leaderboard_channel(leaderboard.guild_id,
+                                                                            leaderboard.channel_id)
 
 
 async def setup(bot: commands.Bot) -> None:
@@ -2,6 +2,8 @@ import discord
 from discord.ext import commands
 from typing import Literal
 import config
+import bot.db.stats
+from bot.utils.Cache import Cache
 
 
 SUCCESS_REACTION = '\N{THUMBS UP SIGN}'
@@ -34,6 +36,95 @@ class OwnerCog(commands.Cog):
             self.bot.synced_tree = synced
         await ctx.send(f"Synced {len(synced)} commands ({'globally' if where is None else 'here'}).")
 
+    @commands.command()
+    @is_owner()
+    async def dbstats(self, ctx: discord.ext.commands.Context, action: None or Literal["reset"] = None) -> None:
+        if action == "reset":
+            bot.db.stats.reset()
+            await ctx.message.add_reaction(SUCCESS_REACTION)
+            return
+
+        stats = bot.db.stats.get_stats()
+        if len(stats) == 0:
+            await ctx.send("No queries recorded yet.")
+            return
+
+        row = "{:<32.32} {:>6} {:>4} {:>8} {:>7} {:>6} {:>6} {:>7}\n"
+        message = row.format("Query", "Calls", "Err", "Total ms", "Avg ms", "p50", "p95", "Rows")
+        for qs in stats[:20]:
+            message += row.format(
+                qs.name, qs.calls, qs.errors, f"{qs.total_ms:.0f}", f"{qs.avg_ms:.1f}",
+                f"{qs.percentile_ms(0.5):.0f}", f"{qs.percentile_ms(0.95):.0f}", qs.rows,
+            )
+        await ctx.send(f"```\n{message}```")
+
+    @commands.command()
+    @is_owner()
+    async def pingstats(self, ctx: discord.ext.commands.Context) -> None:
+        planner_cog = self.bot.get_cog("PlannerCog")
+        if planner_cog is None or len(planner_cog.pings.latency) == 0:
+            await ctx.send("No pings sent yet.")
+            return
+
+        row = "{:<10} {:>6} {:>6} {:>10} {:>10}\n"
+        message = row.format("Kind", "Sent", "Failed", "Avg late s", "Max late s")
+        for kind, stats in planner_cog.pings.latency.items():
+            avg_late = stats["total_late"] / stats["sent"] if stats["sent"] else 0.0
+            message += row.format(kind, stats["sent"], stats["failed"], f"{avg_late:.1f}", f"{stats['max_late']:.1f}")
+        message += f"\nQueued: {planner_cog.pings.pending}"
+        await ctx.send(f"```\n{message}```")
+
+    @commands.command()
+    @is_owner()
+    async def outbound(self, ctx: discord.ext.commands.Context) -> None:
+        row = "{:<12} {:>6} {:>10} {:>10} {:>8}\n"
+        message = row.format("Priority", "Sent", "Avg wait s", "Max wait s", "Deferred")
+        for name, stats in self.bot.outbound.stats.items():
+            avg_wait = stats["total_wait"] / stats["sent"] if stats["sent"] else 0.0
+            message += row.format(name, stats["sent"], f"{avg_wait:.2f}", f"{stats['max_wait']:.2f}",
+                                  stats["deferred"])
+        message += f"\nQueued: {self.bot.outbound.pending}"
+        await ctx.send(f"```\n{message}```")
+
+    @commands.command(aliases=["cache"])
+    @is_owner()
+    async def caches(self,
+                     ctx: discord.ext.commands.Context,
+                     action: None or Literal["flush"] = None,
+                     name: str or None = None) -> None:
+        if action == "flush":
+            if name is None:
+                Cache.flush_all()
+            elif name in Cache.registry:
+                Cache.registry[name].clear()
+            else:
+                await ctx.send(f"No cache named `{name}`.")
+                return
+            await ctx.message.add_reaction(SUCCESS_REACTION)
+            return
+
+        row = "{:<16.16} {:>5} {:>7} {:>6} {:>7} {:>6} {:>4} {:>6}\n"
+        message = row.format("Cache", "Size", "Hits", "Stale", "Misses", "Loads", "Err", "Evict")
+        for cache_name, cache in sorted(Cache.registry.items()):
+            stats = cache.stats
+            message += row.format(cache_name, len(cache), stats["hits"], stats["stale_hits"], stats["misses"],
+                                  stats["loads"], stats["load_errors"], stats["evictions"])
+        await ctx.send(f"```\n{message}```")
+
+    @commands.command()
+    @is_owner()
+    async def leader(self, ctx: discord.ext.commands.Context) -> None:
+        if len(self.bot.leader.keys) == 0:
+            await ctx.send("This process doesn't run any background job.")
+            return
+
+        row = "{:<20} {:>6} {:>6}\n"
+        message = row.format("Job", "Leader", "Token")
+        for key in self.bot.leader.keys:
+            token = self.bot.leader.token(key)
+            message += row.format(key, "yes" if token is not None else "no", token if token is not None else "-")
+        await ctx.send(f"```\n{message}```")
+
     @commands.group(aliases=["cogs"])
     @is_owner()
     async def cog(self, ctx: discord.ext.commands.Context) -> None:
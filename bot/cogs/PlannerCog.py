@@ -1,20 +1,28 @@
 from datetime import datetime, timedelta
+import functools
+import random
 import re
 import discord
 from discord.ext import tasks, commands
 import asyncio
 import bot.db.model
+import bot.db.connection
+import bot.db.invalidation
 import bot.db.queries.planner
 import bot.db.queries.tickets
-import bot.utils.io
 import bot.utils.discordutils
 from bot.classes import ErrorHandlerCog
+from bot.utils.PrioritySemaphore import PrioritySemaphore
+from bot.utils.PingDispatcher import PingDispatcher
+from bot.utils.Outbound import Outbound
+from bot.utils.Tile import Tile, TileType, GameType
 from bot.utils.emojis import TILE_BANNER, TILE_REGULAR, TILE_RELIC, RELICS
 from bot.views import PlannerUserView, PlannerAdminView
+from bot.views.PlannerUser import BannerSelect
+from bot.views.PlannerAdmin import SwitchPlannerButton, EditTimeButton, ForceUnclaimButton, AddRemoveTileButton
 from bot.utils.emojis import EXPIRE_LATER, EXPIRE_DONT_RECAP, EXPIRE_AFTER_RESET, EXPIRE_STALE, EXPIRE_2HR, \
     EXPIRE_3HR, BLANK
 from bot.utils.emojis import LEAST_TIERS, LEAST_CASH, TIME_ATTACK, BLOONARIUS, LYCH, VORTEX, DREADBLOON, PHAYZE
-from bloonspy import btd6
 
 
 PLANNER_ADMIN_PANEL = """
@@ -36,6 +44,33 @@ PLANNER_TABLE_EMPTY = "https://cdn.discordapp.com/attachments/924255725390270474
 PLANNER_TABLE_ROW = "{emoji_claim} {emoji_tile} {emoji_gametype} `{tile}`  |  "
 PLANNER_TABLE_ROW_TIME = "<t:{expire_at}:T> (<t:{expire_at}:R>){claimer}\n"
 PLANNER_TABLE_ROW_STALE = "⚠️ **__STALE SINCE <t:{expire_at}:R>__** ⚠️{claimer}\n"
+BOSS_EMOJIS = [BLOONARIUS, LYCH, VORTEX, DREADBLOON, PHAYZE]
+
+
+def get_tile_presentation(tile: Tile) -> tuple[str, str]:
+    """Gets the emojis that describe a tile in the planner.
+
+    :param tile: The tile.
+    :return: The tile type emoji and the game type emoji.
+    """
+    emoji_tile = TILE_REGULAR
+    if tile.tile_type == TileType.BANNER:
+        emoji_tile = TILE_BANNER
+    elif tile.tile_type == TileType.RELIC:
+        emoji_tile = TILE_RELIC
+        if tile.relic in RELICS.keys():
+            emoji_tile = RELICS[tile.relic]
+
+    emoji_gametype = BLANK
+    if tile.game_type == GameType.LEAST_TIERS:
+        emoji_gametype = LEAST_TIERS
+    elif tile.game_type == GameType.LEAST_CASH:
+        emoji_gametype = LEAST_CASH
+    elif tile.game_type == GameType.RACE:
+        emoji_gametype = TIME_ATTACK
+    elif tile.game_type == GameType.BOSS and tile.boss is not None:
+        emoji_gametype = BOSS_EMOJIS[tile.boss]
+    return emoji_tile, emoji_gametype
 
 
 class PlannerCog(ErrorHandlerCog):
@@ -57,66 +92,114 @@ class PlannerCog(ErrorHandlerCog):
     }
     CHECK_EVERY = 30
     CHECK_EVERY_UNCLAIMED = 60
+    MAX_DECAY_CATCH_UP = 30  # Minutes of decays a new leader still pings for, if nobody was leading
+    # Planner components are routed by their custom_id, no view is registered per planner
+    DYNAMIC_ITEMS = (BannerSelect, SwitchPlannerButton, EditTimeButton, ForceUnclaimButton, AddRemoveTileButton)
+    ROLLOVER_RENDER_STAGGER = 2  # Seconds between planner re-renders after a new event starts
+    REFRESH_EVERY = 3600  # Seconds. Each planner refreshes at its own offset within this interval
+    REFRESH_JITTER = 60  # Max seconds added to each scheduled refresh
+    MAX_CONCURRENT_RENDERS = 3
+    MAX_CONCURRENT_PINGS = 5
+    # Tables whose changes can change which tile decays next
+    DECAY_TABLES = ["claims", "planners", "plannertileclaims", "plannertrackedtiles"]
+    RENDER_URGENT = 0  # Someone is waiting for it, or a tile's expiry status changed
+    RENDER_BACKGROUND = 1
 
     def __init__(self, dbot: commands.Bot) -> None:
         super().__init__(dbot)
-        next_check = datetime.now().replace(second=0, microsecond=0)
-        next_check = next_check.replace(minute=int(next_check.minute/PlannerCog.CHECK_EVERY)*PlannerCog.CHECK_EVERY) \
-                     + timedelta(minutes=PlannerCog.CHECK_EVERY)
-        # This is updated in inject_new_banners which gets called every reset
+        next_check = PlannerCog.first_check(datetime.now())
+        # The last event rolled over, updated in inject_new_banners which check_reset calls every minute
         self.current_event = bot.utils.bloons.get_current_ct_number()
         self.next_check = next_check
         self.next_check_unclaimed = next_check
-        self.banner_decays = []
-        self.next_planner_refreshes = {}
         self.last_check_end = self.next_check
+        # The leadership terms check_reminders and check_decay last loaded the ping marks for
+        self.reminders_term = None
+        self.decay_term = None
+        self.banner_decays = []
+        # Decays up to here have been pinged
+        self.decay_mark = datetime.now()
+        # Set when claims or planners change, so check_decay reloads banner_decays
+        self.banner_decays_stale = False
         self.ct_day = 0
+        # Tile code -> emojis, for the season in tile_presentation_season. Tiles don't change during a season.
+        self.tile_presentation: dict[str, tuple[str, str]] = {}
+        self.tile_presentation_season = None
+        # Planner channel -> rendered table rows, keyed by everything that can change the row
+        self.planner_rows: dict[int, dict[tuple[str, datetime, int or None, str], str]] = {}
+        # Planner channel -> (is the first chunk, key of its first row) -> (keys of its rows, the chunk),
+        # for each message the table was split into
+        self.planner_chunks: dict[int, dict[tuple[bool, tuple], tuple[tuple, str]]] = {}
+        # Planner channel -> when a tile's expiry emoji will change next
+        self.planner_next_row_change: dict[int, datetime] = {}
+        self.render_slots = PrioritySemaphore(PlannerCog.MAX_CONCURRENT_RENDERS)
+        self.pings = PingDispatcher(self.bot.resolver, self.bot.outbound,
+                                    max_concurrent=PlannerCog.MAX_CONCURRENT_PINGS)
 
-    async def load_state(self) -> None:
-        state = await asyncio.to_thread(bot.utils.io.get_cog_state, "planner")
-        if state is None:
-            return
-
-        saved_at = datetime.fromtimestamp(state["saved_at"])
-        if self.next_check-saved_at > timedelta(minutes=PlannerCog.CHECK_EVERY):
+    @staticmethod
+    def first_check(now: datetime) -> datetime:
+        """:return: The first reminder check after a moment, on a CHECK_EVERY boundary."""
+        now = now.replace(second=0, microsecond=0)
+        return now.replace(minute=int(now.minute/PlannerCog.CHECK_EVERY)*PlannerCog.CHECK_EVERY) \
+            + timedelta(minutes=PlannerCog.CHECK_EVERY)
+
+    async def load_reminder_marks(self, now: datetime) -> None:
+        """Picks the reminder windows up from where the last leader left them, so the ones
+        it didn't get to are still checked and the ones it did aren't pinged again."""
+        marks = await bot.db.queries.planner.get_ping_marks() or {}
+        first_check = PlannerCog.first_check(now)
+        if "reminders" not in marks or \
+                first_check-marks["reminders"] > timedelta(minutes=PlannerCog.CHECK_EVERY):
+            # Nobody has been leading for a while, start over
+            self.next_check = first_check
+            self.next_check_unclaimed = first_check
+            self.last_check_end = first_check
             return
 
-        data = state["data"]
-        if "next_check" in data:
-            self.next_check = datetime.fromtimestamp(data["next_check"])
-        if "last_check_end" in data:
-            self.last_check_end = datetime.fromtimestamp(data["last_check_end"])
-
-    async def save_state(self) -> None:
-        data = {
-            "next_check": self.next_check.timestamp(),
-            "last_check_end": self.last_check_end.timestamp(),
-        }
-        await asyncio.to_thread(bot.utils.io.save_cog_state, "planner", data)
+        self.next_check = marks["reminders"]
+        self.last_check_end = marks.get("reminders-end", self.next_check)
+        self.next_check_unclaimed = marks.get("reminders-unclaimed", self.next_check)
+
+    async def load_decay_mark(self, now: datetime) -> None:
+        """Picks the decay pings up from where the last leader left them, so decays that
+        came due with nobody leading are still pinged."""
+        marks = await bot.db.queries.planner.get_ping_marks() or {}
+        oldest_mark = now - timedelta(minutes=PlannerCog.MAX_DECAY_CATCH_UP)
+        if "decay" not in marks:
+            self.decay_mark = now
+        else:
+            self.decay_mark = max(marks["decay"], oldest_mark)
 
     async def cog_load(self) -> None:
-        await self.load_state()
-        views = await self.get_views()
-        for v in views:
-            self.bot.add_view(v)
+        self.bot.add_dynamic_items(*PlannerCog.DYNAMIC_ITEMS)
+        # Has tickets roles are handled by the process that has the guild's members
+        self.check_reset.start()
+        self.check_orphan_has_tickets_roles.start()
+        if not self.bot.background_jobs:
+            return
+
+        self.bot.leader.declare("planner:pings")
+        self.bot.leader.declare("planner:refresh")
+        self.pings.start()
         self.check_reminders.start()
 
-        self.banner_decays = await bot.db.queries.planner.get_tile_closest_to_expire(datetime.now())
+        for table in PlannerCog.DECAY_TABLES:
+            bot.db.invalidation.subscribe(table, self.on_decays_changed)
         self.check_decay.start()
 
-        next_refresh = datetime.now().replace(second=0, microsecond=0, minute=0) + timedelta(hours=1)
+        self.bot.scheduler.register("planner:refresh", self.check_planner_refresh)
         planners = await bot.db.queries.planner.get_planners()
         for p in planners:
-            self.next_planner_refreshes[p.planner_channel] = next_refresh
-        self.check_planner_refresh.start()
-
-        self.check_reset.start()
-        self.check_orphan_has_tickets_roles.start()
+            self.schedule_refresh(p.planner_channel)
 
     def cog_unload(self) -> None:
+        self.bot.remove_dynamic_items(*PlannerCog.DYNAMIC_ITEMS)
+        self.pings.stop()
         self.check_reminders.cancel()
         self.check_decay.cancel()
-        self.check_planner_refresh.cancel()
+        for table in PlannerCog.DECAY_TABLES:
+            bot.db.invalidation.unsubscribe(table, self.on_decays_changed)
+        self.bot.scheduler.unregister("planner:refresh")
         self.check_reset.cancel()
         self.check_orphan_has_tickets_roles.cancel()
 
@@ -127,6 +210,15 @@ class PlannerCog(ErrorHandlerCog):
         member/role if there's any.
         """
         now = datetime.now()
+        # Only the leader moves the windows forward. They're shared through the
+        # database, so a new leader carries on from where the last one stopped.
+        token = self.bot.leader.token("planner:pings")
+        if token is None:
+            return
+        if token != self.reminders_term:
+            await self.load_reminder_marks(now)
+            self.reminders_term = token
+
         if now < self.next_check:
             return
         _cts, ct_end = bot.utils.bloons.get_current_ct_period()
@@ -143,11 +235,10 @@ class PlannerCog(ErrorHandlerCog):
             check_unclaimed = True
             self.next_check_unclaimed += timedelta(minutes=PlannerCog.CHECK_EVERY_UNCLAIMED)
 
-        _cts, ct_end = bot.utils.bloons.get_current_ct_period()
         planners = await bot.db.queries.planner.get_planners(only_active=True)
         for planner in planners:
             tile_codes = await bot.db.queries.planner.get_planner_tracked_tiles(planner.planner_channel)
-            pings = await self.check_planner_reminder(
+            pings, first_expire = await self.check_planner_reminder(
                 planner.planner_channel,
                 planner.ping_channel,
                 tile_codes,
@@ -155,14 +246,21 @@ class PlannerCog(ErrorHandlerCog):
                 min(check_to, ct_end-timedelta(hours=12)),
                 check_to_unclaimed if check_unclaimed else None
             )
-            if len(pings.keys()) > 0:
-                await self.send_reminder(
+            if len(pings.keys()) > 0 and self.bot.leader.holds("planner:pings", token):
+                self.send_reminder(
                     pings,
                     planner.planner_channel,
                     planner.ping_channel,
                     planner.ping_role_with_tickets if planner.ping_role_with_tickets else planner.team_role,
+                    now,
+                    first_expire,
                 )
-        await self.save_state()
+        if self.bot.leader.holds("planner:pings", token):
+            await bot.db.queries.planner.advance_ping_marks({
+                "reminders": self.next_check,
+                "reminders-end": self.last_check_end,
+                "reminders-unclaimed": self.next_check_unclaimed,
+            })
 
     async def check_planner_reminder(self,
                                      planner_id: int,
@@ -170,9 +268,15 @@ class PlannerCog(ErrorHandlerCog):
                                      banner_codes: list[str],
                                      check_from: datetime,
                                      check_to: datetime,
-                                     check_to_unclaimed: datetime or None) -> dict[int or None, list[str]]:
+                                     check_to_unclaimed: datetime or None
+                                     ) -> tuple[dict[int or None, list[str]], datetime or None]:
+        """Gets which tiles to remind each member about.
+
+        :return: Tiles to remind about for each member (None for unclaimed ones) and
+                 when the first of them expires.
+        """
         if ping_ch_id is None:
-            return {}
+            return {}, None
         banners = await bot.db.queries.planner.get_planned_tiles(planner_id, banner_codes,
                                                                  expire_between=(check_from, check_to))
         banners_unclaimed = []
@@ -182,7 +286,7 @@ class PlannerCog(ErrorHandlerCog):
                                                                                                check_to_unclaimed),
                                                                                claimed_status="UNCLAIMED")
         if len(banners) == 0 and len(banners_unclaimed) == 0:
-            return {}
+            return {}, None
 
         pings = {}
         for b in banners:
@@ -196,13 +300,16 @@ class PlannerCog(ErrorHandlerCog):
             if unclaimed_b.tile not in pings[None]:
                 pings[None].append(unclaimed_b.tile)
 
-        return pings
+        first_expire = min(b.expires_at for b in banners + banners_unclaimed)
+        return pings, first_expire
 
-    async def send_reminder(self,
-                            pings: dict[int or None, list[str]],
-                            planner_id: int,
-                            ping_channel_id: int,
-                            ping_role: int) -> None:
+    def send_reminder(self,
+                      pings: dict[int or None, list[str]],
+                      planner_id: int,
+                      ping_channel_id: int,
+                      ping_role: int,
+                      due_at: datetime,
+                      first_expire: datetime) -> None:
         message = "**Tiles that will expire soon:**\n"
         pinged_someone = False
         for uid in pings:
@@ -235,19 +342,28 @@ class PlannerCog(ErrorHandlerCog):
                     message += ", "
             message += f""
 
-        ping_channel = self.bot.get_channel(ping_channel_id)
-        if ping_channel is None:
-            try:
-                ping_channel = await self.bot.fetch_channel(ping_channel_id)
-            except (discord.NotFound, discord.Forbidden):
-                await bot.db.queries.planner.planner_delete_config(planner_id, ping_channel=True)
-                await self.send_planner_msg(planner_id)
-                return None
-
-        await ping_channel.send(
-            content=message
+        self.pings.send(
+            ping_channel_id, message, due_at,
+            kind="reminder",
+            deadline=first_expire,
+            on_channel_missing=self.on_ping_channels_missing,
         )
 
+    async def on_ping_channels_missing(self, channel_ids: list[int]) -> None:
+        """Unsets the ping channel of the planners whose ping channel was deleted."""
+        planners = await bot.db.queries.planner.get_planners()
+        for planner in planners:
+            if planner.ping_channel in channel_ids:
+                await bot.db.queries.planner.planner_delete_config(planner.planner_channel, ping_ch=True)
+                await self.send_planner_msg(planner.planner_channel)
+
+    async def on_planner_channels_missing(self, channel_ids: list[int]) -> None:
+        """Deletes the planners whose channel was deleted."""
+        for channel_id in channel_ids:
+            await bot.db.queries.planner.del_planner(channel_id)
+            self.forget_planner(channel_id)
+        await self.bot.member_cache.refresh()
+
     @tasks.loop(seconds=5)
     async def check_decay(self) -> None:
         """
@@ -258,8 +374,17 @@ class PlannerCog(ErrorHandlerCog):
         if now >= ct_end-timedelta(hours=12):
             return
 
+        # Followers leave banner_decays alone, a new leader reloads it
+        # from the last leader's mark and pings what came due since
+        token = self.bot.leader.token("planner:pings")
+        if token is None:
+            return
+        if token != self.decay_term:
+            await self.load_decay_mark(now)
+            self.decay_term = token
+            self.banner_decays_stale = True
+
         update_expire_list = False
-        send_ping_coros = []
         for banner in self.banner_decays:
             tile_expire_time = banner.claimed_at + timedelta(hours=banner.expires_in_hr)
             if tile_expire_time < now:
@@ -274,46 +399,29 @@ class PlannerCog(ErrorHandlerCog):
                     tiles_tracked,
                     expire_between=(tile_expire_time, now),
                 )
+                ping_role = planner.ping_role_with_tickets if planner.ping_role_with_tickets else planner.ping_role
                 for exp_tile in tiles_expiring:
-                    send_ping_coros.append(
-                        self.decay_ping_when_ready(exp_tile, planner)
-                    )
+                    self.send_decay_ping(exp_tile, ping_role)
 
-        await asyncio.gather(*send_ping_coros)
+        reload_from = self.decay_mark
         if update_expire_list:
-            self.banner_decays = await bot.db.queries.planner.get_tile_closest_to_expire(now)
-
-    async def decay_ping_when_ready(self,
-                                    tile: "bot.db.model.PlannedTile.PlannedTile",
-                                    planner: "bot.db.model.Planner.Planner") -> None:
-        # now = datetime.now()
-        tile_data = await bot.db.queries.planner.planner_get_tile_status(tile.tile, tile.planner_channel)
-        ping_role = planner.ping_role_with_tickets if planner.ping_role_with_tickets else planner.ping_role
-
-        # This check never happens when called by check_decay since it only
-        # fetches tiles whose expires_at is strictly lower than now.
-        # if now < tile_data.expires_at:
-        #     await asyncio.sleep((tile_data.expires_at-now).total_seconds())
-
-        await self.send_decay_ping(tile.planner_channel, tile_data.ping_channel,
-                                   tile.tile, tile_data.claimed_by, ping_role)
-
-    async def send_decay_ping(self,
-                              planner_id: int,
-                              ping_channel_id: int,
-                              tile: str,
-                              user_id: int or None,
-                              role_id: int or None) -> None:
-        ping_channel = self.bot.get_channel(ping_channel_id)
-        if ping_channel is None:
-            try:
-                ping_channel = await self.bot.fetch_channel(ping_channel_id)
-            except (discord.NotFound, discord.Forbidden):
-                await bot.db.queries.planner.planner_delete_config(planner_id, ping_channel=True)
-                await self.send_planner_msg(planner_id)
-                return None
-
-        message = f"**TILE `{tile}` HAS JUST GONE STALE**, claim it now"
+            reload_from = now
+            if self.bot.leader.holds("planner:pings", token):
+                await bot.db.queries.planner.advance_ping_marks({"decay": now})
+        if update_expire_list or self.banner_decays_stale:
+            self.banner_decays_stale = False
+            self.banner_decays = await bot.db.queries.planner.get_tile_closest_to_expire(reload_from)
+        # Anything that comes due from here on is in banner_decays
+        self.decay_mark = now
+
+    def on_decays_changed(self, _key: str or None) -> None:
+        self.banner_decays_stale = True
+
+    def send_decay_ping(self,
+                        tile: "bot.db.model.PlannedTile.PlannedTile",
+                        role_id: int or None) -> None:
+        user_id = tile.claimed_by
+        message = f"**TILE `{tile.tile}` HAS JUST GONE STALE**, claim it now"
         if user_id:
             message += f" <@{user_id}>"
         elif role_id:
@@ -322,32 +430,61 @@ class PlannerCog(ErrorHandlerCog):
             message += " @here"
         message += "!"
 
-        await ping_channel.send(
-            content=message
+        self.pings.send(
+            tile.ping_channel, message, tile.expires_at,
+            kind="decay",
+            on_channel_missing=self.on_ping_channels_missing,
         )
 
-    @tasks.loop(seconds=30)
-    async def check_planner_refresh(self) -> None:
+    def schedule_refresh(self, planner_channel: int, urgent_at: datetime or None = None) -> None:
+        """Schedules a planner's next periodic refresh.
+
+        Every planner refreshes at its own offset within the hour (plus some jitter),
+        so they don't all re-render at the same time.
+
+        :param planner_channel: The ID of the Planner channel.
+        :param urgent_at: If set and earlier than the periodic refresh, refresh at this time
+                          instead, ahead of the other planners.
+        """
+        if not self.bot.background_jobs:
+            return
+        now = datetime.now()
+        interval = PlannerCog.REFRESH_EVERY
+        offset = planner_channel % interval
+        next_ts = (int(now.timestamp()) // interval) * interval + offset
+        while next_ts <= now.timestamp() + interval/2:
+            next_ts += interval
+        refresh_at = datetime.fromtimestamp(next_ts) + timedelta(seconds=random.uniform(0, PlannerCog.REFRESH_JITTER))
+
+        urgent = urgent_at is not None and urgent_at < refresh_at
+        self.bot.scheduler.schedule(
+            "planner:refresh", planner_channel,
+            urgent_at if urgent else refresh_at,
+            payload={"urgent": urgent},
+        )
+
+    async def check_planner_refresh(self, planner_channel: int, payload: dict or None) -> None:
         now = datetime.now()
         ct_start, ct_end = bot.utils.bloons.get_current_ct_period()
-        if now > ct_end + timedelta(hours=1) or now < ct_start:
+        # Followers keep the schedule going, in case they take over
+        if now > ct_end + timedelta(hours=1) or now < ct_start or not self.bot.leader.is_leader("planner:refresh"):
+            self.schedule_refresh(planner_channel)
             return
-
-        for planner_channel in self.next_planner_refreshes:
-            if self.next_planner_refreshes[planner_channel] > now:
-                continue
-            await self.send_planner_msg(planner_channel)
+        await self.send_planner_msg(planner_channel, urgent=payload is not None and payload.get("urgent", False))
 
     @tasks.loop(seconds=60)
     async def check_reset(self) -> None:
         """Calls functions at every CT Day reset"""
+        if self.bot.background_jobs:
+            # Checked every time, in case no process was leading at the reset
+            await self.inject_new_banners()
+
         current_day = bot.utils.bloons.get_current_ct_day()
         if current_day == self.ct_day:
             return
         self.ct_day = current_day
         if self.ct_day <= 7:
             await self.reassign_has_tickets_roles()
-            await self.inject_new_banners()
 
     @tasks.loop(seconds=3600*24)
     async def check_orphan_has_tickets_roles(self) -> None:
@@ -361,28 +498,39 @@ class PlannerCog(ErrorHandlerCog):
     async def inject_new_banners(self) -> None:
         """
         If there's a new CT event live, inject the new event's banners into all planners.
+        Done by the process leading the planner refreshes. The others keep trying until they
+        lead or see it's been done, since each event is rolled over only once in the database.
         """
         current_event = bot.utils.bloons.get_current_ct_number()
         if current_event == self.current_event:
             return
+        token = self.bot.leader.token("planner:refresh")
+        if token is None:
+            return
 
-        banners = [
-            tile['Code'] for tile in (await asyncio.to_thread(bot.utils.bloons.fetch_all_tiles, current_event))
-            if tile['TileType'] == 'Banner'
-        ]
-        planners = await bot.db.queries.planner.get_planners()
-        for p in planners:
-            tiles = await bot.db.queries.planner.get_planner_tracked_tiles(p.planner_channel)
-            await asyncio.gather(*[
-                bot.db.queries.planner.remove_tile_from_planner(p.planner_channel, t)
-                for t in tiles
-            ])
-            await asyncio.gather(*[
-                bot.db.queries.planner.add_tile_to_planner(p.planner_channel, t, 24)
-                for t in banners
-            ])
-
+        tiles = await bot.utils.bloons.get_season_tiles(current_event)
+        if len(tiles) == 0:
+            return
+        banners = [tile.code for tile in tiles.values() if tile.tile_type == TileType.BANNER]
+        if not self.bot.leader.holds("planner:refresh", token):
+            return
+        if not bot.db.connection.is_connected():
+            return
+        planners = await bot.db.queries.planner.rollover_planner_tiles(current_event, banners, 24)
         self.current_event = current_event
+        if planners is None:
+            # Some other process already did it
+            return
+
+        # Re-render them a few at a time instead of all at once
+        now = datetime.now()
+        random.shuffle(planners)
+        for i in range(len(planners)):
+            self.bot.scheduler.schedule(
+                "planner:refresh", planners[i],
+                now + timedelta(seconds=i*PlannerCog.ROLLOVER_RENDER_STAGGER + random.uniform(0, 1)),
+                payload={"urgent": False},
+            )
 
     async def reassign_has_tickets_roles(self) -> None:
         """
@@ -391,24 +539,21 @@ class PlannerCog(ErrorHandlerCog):
         """
         planners = await bot.db.queries.planner.get_planners()
         for pln in planners:
-            planner_ch = self.bot.get_channel(pln.planner_channel)
-            if planner_ch is None:
-                try:
-                    planner_ch = await self.bot.fetch_channel(pln.planner_channel)
-                except (discord.NotFound, discord.Forbidden):
-                    await bot.db.queries.planner.del_planner(pln.planner_channel)
-                    continue
+            planner_ch = await self.bot.resolver.channel(pln.planner_channel,
+                                                         on_missing=self.on_planner_channels_missing)
+            if planner_ch is None or pln.team_role is None:
+                continue
+            if not self.bot.owns_guild(planner_ch.guild.id):
+                continue
 
-            role = discord.utils.get(planner_ch.guild.roles, id=pln.team_role)
+            role = await self.bot.resolver.role(planner_ch.guild, pln.team_role)
             if role is None:
-                roles = await planner_ch.guild.fetch_roles()
-                role = discord.utils.get(roles, id=pln.team_role)
-                if role is None:
-                    continue
+                continue
+            await self.bot.member_cache.require(planner_ch.guild)
 
             checks = []
             for member in role.members:
-                checks.append(self.check_has_tickets_role(member, pln))
+                checks.append(self.check_has_tickets_role(member, pln, priority=Outbound.MAINTENANCE))
             await asyncio.gather(*checks)
 
     async def remove_has_tickets_roles(self) -> None:
@@ -419,22 +564,26 @@ class PlannerCog(ErrorHandlerCog):
             if pln.ping_role_with_tickets is None:
                 continue
 
-            planner_ch = self.bot.get_channel(pln.planner_channel)
+            planner_ch = await self.bot.resolver.channel(pln.planner_channel,
+                                                         on_missing=self.on_planner_channels_missing)
             if planner_ch is None:
-                try:
-                    planner_ch = await self.bot.fetch_channel(pln.planner_channel)
-                except (discord.NotFound, discord.Forbidden):
-                    await bot.db.queries.planner.del_planner(pln.planner_channel)
-                    continue
+                continue
+            if not self.bot.owns_guild(planner_ch.guild.id):
+                continue
 
-            role = discord.utils.get(planner_ch.guild.roles, id=pln.ping_role_with_tickets)
+            role = await self.bot.resolver.role(planner_ch.guild, pln.ping_role_with_tickets)
             if role is None:
-                roles = await planner_ch.guild.fetch_roles()
-                role = discord.utils.get(roles, id=pln.ping_role_with_tickets)
+                continue
+            await self.bot.member_cache.require(planner_ch.guild)
 
             removals = []
             for member in role.members:
-                removals.append(member.remove_roles(role))
+                removals.append(self.bot.outbound.run(
+                    functools.partial(member.remove_roles, role),
+                    Outbound.MAINTENANCE,
+                    route=("roles", planner_ch.guild.id),
+                    guild_id=planner_ch.guild.id,
+                ))
             await asyncio.gather(*removals)
 
     @planner_group.command(name="new", description="Create a new Planner channel.")
@@ -458,10 +607,12 @@ class PlannerCog(ErrorHandlerCog):
             return
 
         await bot.db.queries.planner.del_planner(channel.id)
+        self.forget_planner(channel.id)
         await interaction.response.send_message(
             content=f"<#{channel.id}> will no longer be updated as a planner!",
             ephemeral=True
         )
+        await self.bot.member_cache.refresh()
 
     @planner_group.command(name="add", description="Adds Planner to an existing channel.")
     @discord.app_commands.guild_only()
@@ -520,6 +671,8 @@ class PlannerCog(ErrorHandlerCog):
             )
             return
 
+        if ping_channel:
+            self.bot.resolver.forget(ping_channel.id)
         await bot.db.queries.planner.planner_update_config(
             planner_channel.id,
             ping_ch=ping_channel.id if ping_channel else None,
@@ -562,16 +715,7 @@ class PlannerCog(ErrorHandlerCog):
             )
             return
 
-        currently_tracked = await bot.db.queries.planner.get_planner_tracked_tiles(planner_channel.id)
-        await asyncio.gather(*[
-            bot.db.queries.planner.remove_tile_from_planner(planner_channel.id, tile)
-            for tile in currently_tracked
-        ])
-
-        await asyncio.gather(*[
-            bot.db.queries.planner.add_tile_to_planner(planner_channel.id, tile, 24)
-            for tile in tile_list
-        ])
+        await bot.db.queries.planner.overwrite_planner_tiles(planner_channel.id, tile_list, 24)
 
         await interaction.response.send_message(
             content="All done! The planner message will be updated in a bit...",
@@ -588,6 +732,7 @@ class PlannerCog(ErrorHandlerCog):
             return
 
         await bot.db.queries.planner.add_planner(channel.id)
+        await self.bot.member_cache.require(channel.guild)
         await interaction.response.send_message(
             content=f"<#{channel.id}> is now a planner channel!\n"
                     "*Make sure my permissions are set correctly and I can write, see & delete messages in that "
@@ -598,6 +743,28 @@ class PlannerCog(ErrorHandlerCog):
         )
         await self.send_planner_msg(channel.id)
 
+    async def get_tiles_presentation(self, tiles: list[str]) -> dict[str, tuple[str, str]]:
+        """Gets the emojis for the given tiles from the current season's presentation table.
+        Only the tiles that aren't in it yet are added, and it's emptied when a new season starts.
+
+        :param tiles: The tile codes.
+        :return: The presentation table.
+        """
+        season = bot.utils.bloons.get_current_ct_number()
+        if season != self.tile_presentation_season:
+            self.tile_presentation = {}
+            self.tile_presentation_season = season
+            self.planner_rows = {}
+            self.planner_chunks = {}
+
+        missing = [tile for tile in tiles if tile not in self.tile_presentation]
+        if len(missing) > 0:
+            season_tiles = await bot.utils.bloons.get_season_tiles()
+            for tile in missing:
+                if tile in season_tiles:
+                    self.tile_presentation[tile] = get_tile_presentation(season_tiles[tile])
+        return self.tile_presentation
+
     async def get_planner_msg(self, channel: int) -> list[tuple[str, discord.ui.View or None]]:
         """Generates the message to send in planner.
 
@@ -605,6 +772,7 @@ class PlannerCog(ErrorHandlerCog):
         """
         planner = await bot.db.queries.planner.get_planner(channel)
         if planner is None:
+            self.forget_planner(channel)
             return []
 
         planner_status = "🟢 ONLINE" if planner.is_active else "🔴 OFFLINE *(won't ping)*"
@@ -639,7 +807,6 @@ class PlannerCog(ErrorHandlerCog):
         ]
 
         now = datetime.now()
-        tile_table = PLANNER_TABLE_HEADER
         tile_list = await bot.db.queries.planner.get_planner_tracked_tiles(channel)
         ct_start, ct_end = bot.utils.bloons.get_current_ct_period()
         if now < ct_end:
@@ -655,12 +822,13 @@ class PlannerCog(ErrorHandlerCog):
         }
         banner_claims = []
 
-        tiles_data = []
-        for tile in tracked_tiles:
-            tiles_data.append(asyncio.to_thread(bot.utils.bloons.fetch_tile_data, tile.tile))
-        tiles_data = await asyncio.gather(*tiles_data)
+        tile_presentation = await self.get_tiles_presentation([tile.tile for tile in tracked_tiles])
+        cached_rows = self.planner_rows.get(channel, {})
+        rendered_rows = {}
+        row_keys = []
+        next_row_change = None
 
-        for tile, tile_data in zip(tracked_tiles, tiles_data):
+        for tile in tracked_tiles:
             expire_at = tile.claimed_at + timedelta(hours=tile.expires_in_hr)
             emoji_claim = EXPIRE_LATER
             if expire_at >= ct_end-timedelta(hours=12):
@@ -676,51 +844,37 @@ class PlannerCog(ErrorHandlerCog):
             elif expire_at-now < timedelta(hours=3):
                 emoji_claim = EXPIRE_3HR
 
-            emoji_tile = TILE_REGULAR
-            if tile_data['TileType'] == 'Banner':
-                emoji_tile = TILE_BANNER
-            elif tile_data['TileType'] == 'Relic':
-                emoji_tile = TILE_RELIC
-                relic = btd6.Relic.from_string(tile_data['RelicType'])
-                if relic in RELICS.keys():
-                    emoji_tile = RELICS[relic]
-
-            emoji_gametype = BLANK
-            if tile_data['GameData']['subGameType'] == 9:
-                emoji_gametype = LEAST_TIERS
-            elif tile_data['GameData']['subGameType'] == 8:
-                emoji_gametype = LEAST_CASH
-            elif tile_data['GameData']['subGameType'] == 2:
-                emoji_gametype = TIME_ATTACK
-            elif tile_data['GameData']['subGameType'] == 4:
-                if tile_data['GameData']['bossData']['bossBloon'] == 0:
-                    emoji_gametype = BLOONARIUS
-                elif tile_data['GameData']['bossData']['bossBloon'] == 1:
-                    emoji_gametype = LYCH
-                elif tile_data['GameData']['bossData']['bossBloon'] == 2:
-                    emoji_gametype = VORTEX
-                elif tile_data['GameData']['bossData']['bossBloon'] == 3:
-                    emoji_gametype = DREADBLOON
-                elif tile_data['GameData']['bossData']['bossBloon'] == 4:
-                    emoji_gametype = PHAYZE
-
-            row_second_part = PLANNER_TABLE_ROW_STALE if emoji_claim == EXPIRE_STALE else PLANNER_TABLE_ROW_TIME
-            new_row = PLANNER_TABLE_ROW.format(
-                emoji_claim=emoji_claim,
-                emoji_tile=emoji_tile,
-                emoji_gametype=emoji_gametype,
-                tile=tile.tile,
-            ) + row_second_part.format(
-                expire_at=int(expire_at.timestamp()),
-                claimer=f"   →  <@{tile.claimed_by}>" if tile.claimed_by is not None else ""
-            )
-
-            if len(new_row) + len(tile_table) > 2000:
-                messages.append((tile_table, None))
-                tile_table = ""
-            tile_table += new_row
+            # A second late, so the row has certainly changed when it's rendered
+            for change_at in (expire_at-timedelta(hours=3), expire_at-timedelta(hours=2), expire_at):
+                change_at += timedelta(seconds=1)
+                if now < change_at < ct_end-timedelta(hours=12) and \
+                        (next_row_change is None or change_at < next_row_change):
+                    next_row_change = change_at
+
+            # The expiry emoji is the only part of a row that changes with time
+            row_key = (tile.tile, expire_at, tile.claimed_by, emoji_claim)
+            new_row = cached_rows.get(row_key)
+            if new_row is None:
+                emoji_tile, emoji_gametype = tile_presentation.get(tile.tile, (TILE_REGULAR, BLANK))
+                row_second_part = PLANNER_TABLE_ROW_STALE if emoji_claim == EXPIRE_STALE else PLANNER_TABLE_ROW_TIME
+                new_row = PLANNER_TABLE_ROW.format(
+                    emoji_claim=emoji_claim,
+                    emoji_tile=emoji_tile,
+                    emoji_gametype=emoji_gametype,
+                    tile=tile.tile,
+                ) + row_second_part.format(
+                    expire_at=int(expire_at.timestamp()),
+                    claimer=f"   →  <@{tile.claimed_by}>" if tile.claimed_by is not None else ""
+                )
+            rendered_rows[row_key] = new_row
+            row_keys.append(row_key)
             banner_claims.append((tile.tile, tile.claimed_by is not None))
 
+        table_chunks = self.chunk_planner_table(channel, row_keys, rendered_rows)
+        for chunk in table_chunks[:-1]:
+            messages.append((chunk, None))
+        tile_table = table_chunks[-1]
+
         append_explanation = "\n"
         for emoji in emojis_explanations:
             if emojis_explanations[emoji] is not None:
@@ -732,13 +886,20 @@ class PlannerCog(ErrorHandlerCog):
             else:
                 tile_table += append_explanation
 
+        if planner.is_active:
+            self.planner_rows[channel] = rendered_rows
+            self.planner_next_row_change[channel] = next_row_change
+        else:
+            # Turned off planners are rarely looked at, don't keep them around
+            self.forget_planner(channel)
+
         if len(banner_claims) == 0:
             tile_table = PLANNER_TABLE_EMPTY
 
         messages.append((
             tile_table,
             PlannerUserView(banner_claims, channel,
-                            PlannerCog.switch_tile_claim, self.send_planner_msg)
+                            self.switch_tile_claim, self.send_planner_msg)
         ))
 
         # Makes the message always minimum 4 messages long
@@ -747,58 +908,86 @@ class PlannerCog(ErrorHandlerCog):
 
         return messages
 
-    async def get_views(self) -> list[None or PlannerUserView]:
-        views = []
-        channels = await bot.db.queries.planner.get_planners()
-        for channel in channels:
-            channel_id = channel.planner_channel
-            tile_codes = await bot.db.queries.planner.get_planner_tracked_tiles(channel_id)
-            tiles = await bot.db.queries.planner.get_planned_tiles(channel_id, tile_codes)
-            banner_claims = {}
-            for banner in tile_codes:
-                banner_claims[banner] = False
-            for banner in tiles:
-                if banner.claimed_by:
-                    banner_claims[banner.tile] = True
-
-            views.append(
-                PlannerUserView([(tile, banner_claims[tile]) for tile in banner_claims], channel_id,
-                                PlannerCog.switch_tile_claim, self.send_planner_msg)
-            )
-            views.append(
-                PlannerAdminView(channel_id,
-                                 self.send_planner_msg,
-                                 self.edit_tile_time,
-                                 self.force_unclaim,
-                                 self.add_planner_tile,
-                                 self.remove_planner_tile,
-                                 channel.is_active)
-            )
-
-        return views
+    def chunk_planner_table(self,
+                            channel: int,
+                            row_keys: list[tuple],
+                            rows: dict[tuple, str]) -> list[str]:
+        """Splits a planner's table into messages that fit Discord's limit. The chunks whose rows
+        are the same as the last render's are reused, only the ones around the rows that changed
+        are joined again.
 
-    async def send_planner_msg(self, channel_id: int) -> None:
+        :param channel: The ID of the Planner channel.
+        :param row_keys: The keys of the table's rows, in order.
+        :param rows: Row key -> the rendered row.
+        :return: The table, one message each. Never empty.
+        """
+        cached_chunks = self.planner_chunks.get(channel, {})
+        chunks = {}
+        table = []
+        start = 0
+        while start < len(row_keys) or start == 0:
+            is_first = start == 0
+            first_key = row_keys[start] if start < len(row_keys) else None
+            cached = cached_chunks.get((is_first, first_key))
+            if cached is not None:
+                keys, chunk = cached
+                end = start + len(keys)
+                # Splitting is greedy, so the chunk is the same if its rows are
+                # and the row after it still doesn't fit
+                if tuple(row_keys[start:end]) != keys or \
+                        end < len(row_keys) and len(chunk) + len(rows[row_keys[end]]) <= 2000:
+                    cached = None
+            if cached is None:
+                chunk = PLANNER_TABLE_HEADER if is_first else ""
+                end = start
+                while end < len(row_keys) and \
+                        (len(chunk) + len(rows[row_keys[end]]) <= 2000 or end == start and not is_first):
+                    chunk += rows[row_keys[end]]
+                    end += 1
+                keys = tuple(row_keys[start:end])
+
+            chunks[(is_first, first_key)] = (keys, chunk)
+            table.append(chunk)
+            start = end
+            if start == len(row_keys):
+                break
+
+        self.planner_chunks[channel] = chunks
+        return table
+
+    def forget_planner(self, channel: int) -> None:
+        """Drops what's cached to render a planner, e.g. when it's deleted or turned off."""
+        self.planner_rows.pop(channel, None)
+        self.planner_chunks.pop(channel, None)
+        self.planner_next_row_change.pop(channel, None)
+
+    async def send_planner_msg(self, channel_id: int, urgent: bool = True) -> None:
         """(Re)sends the planner message.
 
+        Only a few planners are rendered at once. Urgent renders (the default, since
+        it's usually someone waiting for their claim to show up) go before periodic ones.
+
         :param channel_id: The ID of the Planner channel.
+        :param urgent: If False, let other renders go first.
         """
-        channel = self.bot.get_channel(channel_id)
+        channel = await self.bot.resolver.channel(channel_id, on_missing=self.on_planner_channels_missing)
         if channel is None:
-            try:
-                channel = await self.bot.fetch_channel(channel_id)
-            except (discord.NotFound, discord.Forbidden):
-                await bot.db.queries.planner.del_planner(channel_id)
-                return
+            return
 
-        planner_content = await self.get_planner_msg(channel_id)
-        self.next_planner_refreshes[channel_id] = datetime.now() + timedelta(hours=1)
-        try:
-            await bot.utils.discordutils.update_messages(self.bot.user, planner_content, channel, tolerance=5)
-        except discord.Forbidden:
-            pass
+        priority = PlannerCog.RENDER_URGENT if urgent else PlannerCog.RENDER_BACKGROUND
+        async with self.render_slots.slot(priority):
+            planner_content = await self.get_planner_msg(channel_id)
+            self.schedule_refresh(channel_id, urgent_at=self.planner_next_row_change.get(channel_id))
+            try:
+                await bot.utils.discordutils.update_messages(
+                    self.bot.user, planner_content, channel, tolerance=5,
+                    outbound=self.bot.outbound,
+                    priority=Outbound.INTERACTION if urgent else Outbound.PLANNER,
+                )
+            except discord.Forbidden:
+                pass
 
-    @staticmethod
-    async def switch_tile_claim(user: discord.Member, planner_channel_id: int, tile: str, force_claim: bool = False) -> tuple[str, bool]:
+    async def switch_tile_claim(self, user: discord.Member, planner_channel_id: int, tile: str, force_claim: bool = False) -> tuple[str, bool]:
         """Claims or unclaims a tile for an user.
 
         :param user: The member who wants to claim the tile.
@@ -813,29 +1002,27 @@ class PlannerCog(ErrorHandlerCog):
                 discord.utils.get(user.roles, id=planner_info.ping_role) is None:
             return f"You need the <@&{planner_info.ping_role}> role to claim tiles!", False
 
-        tile_status = await bot.db.queries.planner.planner_get_tile_status(tile, planner_channel_id)
-        if tile_status is None:
+        result = await bot.db.queries.planner.planner_switch_tile_claim(
+            user.id, tile, planner_channel_id, force_claim=force_claim
+        )
+        if result == "NOT_PLANNED":
             return "That tile isn't in the planner...?", False
-        claimed_by_user = await bot.db.queries.planner.get_claims_by(user.id, planner_channel_id)
 
         response = "That tile's not claimed by you! Hands off! 💢"
         refresh = False
-        if tile_status.claimed_by == user.id:
-            if force_claim:
-                response = f"You have already claimed `{tile}`!"
-            else:
-                await bot.db.queries.planner.planner_unclaim_tile(tile, planner_channel_id)
-                response = f"You have unclaimed `{tile}`!"
-                refresh = True
-        elif len(claimed_by_user) >= 4:
+        if result == "ALREADY_CLAIMED":
+            response = f"You have already claimed `{tile}`!"
+        elif result == "UNCLAIMED":
+            response = f"You have unclaimed `{tile}`!"
+            refresh = True
+        elif result == "LIMIT_REACHED":
             response = "You already have 4 tiles claimed. You can't claim any more."
-        elif tile_status.claimed_by is None:
-            await bot.db.queries.planner.planner_claim_tile(user.id, tile, planner_channel_id)
+        elif result == "CLAIMED":
             response = f"You have claimed `{tile}`!\n*Select it again if you want to unclaim it.*"
             refresh = True
 
         if refresh:
-            await PlannerCog.check_has_tickets_role(user, planner_info)
+            await self.check_has_tickets_role(user, planner_info)
 
         return response, refresh
 
@@ -884,7 +1071,7 @@ class PlannerCog(ErrorHandlerCog):
         # Update planner if necessary
         tile_list = await bot.db.queries.planner.get_planner_tracked_tiles(planner_id)
         if tile in tile_list:
-            self.banner_decays = await bot.db.queries.planner.get_tile_closest_to_expire(datetime.now())
+            self.banner_decays_stale = True
             await self.send_planner_msg(planner_id)
 
     async def on_tile_claimed(self, tile: str, claim_channel: int, claimer: int) -> None:
@@ -921,7 +1108,7 @@ class PlannerCog(ErrorHandlerCog):
         success = await bot.db.queries.planner.edit_tile_capture_time(
             claims_channel, tile, new_time - timedelta(days=1)
         )
-        self.banner_decays = await bot.db.queries.planner.get_tile_closest_to_expire(datetime.now())
+        self.banner_decays_stale = True
         message = f"Got it! `{tile}` will decay at " \
                   f"<t:{int(new_time.timestamp())}:t> (<t:{int(new_time.timestamp())}:R>)"
         if not success:
@@ -966,7 +1153,7 @@ class PlannerCog(ErrorHandlerCog):
                     f"*Need to remove lots of tiles? Try using </planner overwrite:{overwrite_id}> instead!*",
             ephemeral=True
         )
-        self.banner_decays = await bot.db.queries.planner.get_tile_closest_to_expire(datetime.now())
+        self.banner_decays_stale = True
         await self.send_planner_msg(planner_id)
 
     async def add_planner_tile(self,
@@ -982,7 +1169,7 @@ class PlannerCog(ErrorHandlerCog):
                     f"*Need to add lots of tiles? Try using </planner overwrite:{overwrite_id}> instead!*",
             ephemeral=True
         )
-        self.banner_decays = await bot.db.queries.planner.get_tile_closest_to_expire(datetime.now())
+        self.banner_decays_stale = True
         await self.send_planner_msg(planner_id)
 
     async def create_ping_role(self, planner: bot.db.model.Planner.Planner) -> discord.Role or None:
@@ -992,17 +1179,15 @@ class PlannerCog(ErrorHandlerCog):
         :param planner: The planner channel's data.
         :return: The newly created role.
         """
-        channel = self.bot.get_channel(planner.planner_channel)
-        if channel is None:
-            try:
-                channel = await self.bot.fetch_channel(planner.planner_channel)
-            except (discord.NotFound, discord.Forbidden):
-                await bot.db.queries.planner.del_planner(planner.planner_channel)
-                return None
+        channel = await self.bot.resolver.channel(planner.planner_channel,
+                                                  on_missing=self.on_planner_channels_missing)
+        if channel is None or planner.ping_role is None:
+            return None
 
-        team_role = discord.utils.get(channel.guild.roles, id=planner.ping_role)
+        team_role = await self.bot.resolver.role(channel.guild, planner.ping_role)
         if team_role is None:
             return None
+        await self.bot.member_cache.require(channel.guild)
 
         new_role = await channel.guild.create_role(name=f"{team_role.name} (has tickets)")
 
@@ -1012,17 +1197,20 @@ class PlannerCog(ErrorHandlerCog):
 
         checks = []
         for member in team_role.members:
-            checks.append(self.check_has_tickets_role(member, planner))
+            checks.append(self.check_has_tickets_role(member, planner, priority=Outbound.MAINTENANCE))
         await asyncio.gather(*checks)
 
         return ret
 
-    @staticmethod
-    async def check_has_tickets_role(member: discord.Member, planner: bot.db.model.Planner.Planner) -> None:
+    async def check_has_tickets_role(self,
+                                     member: discord.Member,
+                                     planner: bot.db.model.Planner.Planner,
+                                     priority: int = Outbound.INTERACTION) -> None:
         """
         Checks if the "has tickets" role should be added or removed.
         :param member: The member to check.
         :param planner: The planner to check for.
+        :param priority: The Outbound priority class to change the role with.
         """
         if planner.ping_role_with_tickets is None:
             return
@@ -1046,11 +1234,14 @@ class PlannerCog(ErrorHandlerCog):
                 tickets_used += 1
 
         has_role = discord.utils.get(member.roles, id=planner.ping_role_with_tickets) is not None
+        if has_role and tickets_used >= 4:
+            request = functools.partial(member.remove_roles, ping_role)
+        elif not has_role and tickets_used < 4:
+            request = functools.partial(member.add_roles, ping_role)
+        else:
+            return
         try:
-            if has_role and tickets_used >= 4:
-                await member.remove_roles(ping_role)
-            elif not has_role and tickets_used < 4:
-                await member.add_roles(ping_role)
+            await self.bot.outbound.run(request, priority, route=("roles", member.guild.id), guild_id=member.guild.id)
         except discord.Forbidden:
             pass
 
@@ -1,11 +1,8 @@
-import asyncio
-import json
-import os
 from bloonspy import btd6
 import bot.utils.io
 import bot.utils.bloons
 import bot.utils.discordutils
-from bot.utils.Cache import Cache
+from bot.utils.Tile import TileType
 import discord
 from discord.ext import commands
 from bot.classes import ErrorHandlerCog
@@ -31,10 +28,6 @@ class TilesCog(ErrorHandlerCog):
         "raceregs": "Check how many race regs are on the map, and where they are.",
     }
 
-    def __init__(self, bot: commands.Bot) -> None:
-        super().__init__(bot)
-        self.raceregs: Cache or None = None
-
     @discord.app_commands.command(name="tile",
                                   description="Check a tile's challenge data")
     @discord.app_commands.describe(tile="The 3 letter tile code, or a relic name.",
@@ -43,18 +36,18 @@ class TilesCog(ErrorHandlerCog):
     @discord.app_commands.guild_only()
     async def cmd_tile(self, interaction: discord.Interaction, tile: str, season: None or int = None, hide: None or bool = False) -> None:
         tile = tile.upper()
-        challenge_data = await asyncio.to_thread(self.fetch_challenge_data, tile, season)
-        if challenge_data is None:
-            tile = await asyncio.to_thread(bot.utils.bloons.relic_to_tile_code, tile, season)
-            challenge_data = await asyncio.to_thread(self.fetch_challenge_data, tile, season)
-        if challenge_data is None:
+        challenge = await bot.utils.bloons.get_tile(tile, season)
+        if challenge is None:
+            tile = await bot.utils.bloons.relic_to_tile_code(tile, season)
+            challenge = await bot.utils.bloons.get_tile(tile, season)
+        if challenge is None:
             await interaction.response.send_message(
                 content="I don't have the challenge data for that tile!",
                 ephemeral=hide,
             )
             return
 
-        embed = bot.utils.bloons.raw_challenge_to_embed(challenge_data)
+        embed = bot.utils.bloons.get_tile_embed(challenge)
         await interaction.response.send_message(
             embed=embed,
             ephemeral=hide,
@@ -63,10 +56,9 @@ class TilesCog(ErrorHandlerCog):
     @discord.app_commands.command(name="raceregs",
                                   description="Get a list of all race regs.")
     async def cmd_raceregs(self, interaction: discord.Interaction) -> None:
-        tiles = await asyncio.to_thread(bot.utils.bloons.fetch_all_tiles)
         race_regs = [
-            tile['Code'] for tile in tiles
-            if tile['TileType'] == 'Regular' and tile['GameData']['subGameType'] == 2
+            tile.code for tile in (await bot.utils.bloons.get_season_tiles()).values()
+            if tile.tile_type == TileType.REGULAR and tile.is_race
         ]
 
         await interaction.response.send_message(
@@ -79,16 +71,18 @@ class TilesCog(ErrorHandlerCog):
                                    hide="Hide the output.")
     @discord.app_commands.guild_only()
     async def cmd_spawnlock(self, interaction: discord.Interaction, team: TeamColor, hide: bool = True) -> None:
-        tiles = spawn_tile_codes[team]
-
-        tiles_data = []
-        for tile in tiles:
-            tiles_data.append(asyncio.to_thread(self.fetch_challenge_data, tile))
-        tiles_data = await asyncio.gather(*tiles_data)
+        season_tiles = await bot.utils.bloons.get_season_tiles()
+        tiles = [season_tiles[code] for code in spawn_tile_codes[team] if code in season_tiles]
+        if len(tiles) == 0:
+            await interaction.response.send_message(
+                content="I don't have the challenge data for that team's spawn!",
+                ephemeral=hide,
+            )
+            return
 
         idx = 0
-        embed = bot.utils.bloons.raw_challenge_to_embed(tiles_data[idx])
-        view = SpawnlockPaginateView(tiles_data)
+        embed = bot.utils.bloons.get_tile_embed(tiles[idx])
+        view = SpawnlockPaginateView(tiles)
         await interaction.response.send_message(
             embed=embed,
             ephemeral=hide,
@@ -96,19 +90,6 @@ class TilesCog(ErrorHandlerCog):
         )
         view.set_original_interaction(interaction)
 
-    @staticmethod
-    def fetch_challenge_data(tile: str, season: None or int = None):
-        if season is None:
-            path = f"/ctmap/current/tiles/{tile}.json"
-        else:
-            path = f"/ctmap/{season}/tiles/{tile}.json"
-        if not os.path.exists(path):
-            return None
-        fin = open(path)
-        data = json.loads(fin.read())
-        fin.close()
-        return data
-
 
 async def setup(bot: commands.Bot) -> None:
     await bot.add_cog(TilesCog(bot))
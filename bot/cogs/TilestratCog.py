@@ -1,12 +1,14 @@
 import discord
+import functools
 from datetime import datetime, timedelta
-from discord.ext import commands, tasks
-import asyncio
+from discord.ext import commands
 import bot.db.queries.tilestrat
 import bot.utils.discordutils
 from bot.exceptions import UnknownTile
 from bot.classes import ErrorHandlerCog
+from bot.utils.Outbound import Outbound
 import bot.utils.bloons
+from bot.utils.Tile import Tile, GameType
 from bot.utils.emojis import LEAST_TIERS, LEAST_CASH, BLOONARIUS, VORTEX, LYCH, TIME_ATTACK, BLANK, DREADBLOON, \
     PHAYZE
 from bot.utils.images import IMG_LEAST_CASH, IMG_LEAST_TIERS, IMG_BLOONARIUS, IMG_VORTEX, IMG_LYCH, IMG_TIME_ATTACK, \
@@ -64,55 +66,40 @@ class TilestratCog(ErrorHandlerCog):
 
     def __init__(self, bot: commands.Bot) -> None:
         super().__init__(bot)
-        self.check_back: dict[int, datetime] = {}
 
     async def cog_load(self) -> None:
-        await self.load_state()
-        self.clean_raidlog.start()
+        self.bot.scheduler.register("tilestrat:clean", self.clean_raidlog)
+        await self.import_legacy_state()
 
-    async def cog_unload(self) -> None:
-        await self.load_state()
-        self.clean_raidlog.cancel()
+    def cog_unload(self) -> None:
+        self.bot.scheduler.unregister("tilestrat:clean")
 
-    async def load_state(self) -> None:
-        state = await asyncio.to_thread(bot.utils.io.get_cog_state, "raidlog")
-        if state is None:
+    async def import_legacy_state(self) -> None:
+        """Schedules the thread cleanups saved before they were scheduler jobs. Done only once,
+        by the process that runs the first shard, so every process doesn't schedule its own copy."""
+        if self.bot.shard_ids is not None and 0 not in self.bot.shard_ids:
             return
+        state = await self.bot.state.get("raidlog")
+        if state is None or "check_back" not in state["data"]:
+            return
+        for thread_id, delete_at in state["data"]["check_back"].items():
+            self.bot.scheduler.schedule(
+                "tilestrat:clean", int(thread_id),
+                datetime.fromtimestamp(delete_at),
+                durable=True,
+            )
+        self.bot.state.set("raidlog", {})
 
-        data = state["data"]
-        if "check_back" in data:
-            self.check_back = {}
-            for key in data["check_back"]:
-                self.check_back[int(key)] = datetime.fromtimestamp(data["check_back"][key])
-
-    async def save_state(self) -> None:
-        data = {
-            "check_back": {},
-        }
-        for key in self.check_back.keys():
-            data["check_back"][str(key)] = self.check_back[key].timestamp()
-        await asyncio.to_thread(bot.utils.io.save_cog_state, "raidlog", data)
-
-    @tasks.loop(seconds=3600)
-    async def clean_raidlog(self) -> None:
-        now = datetime.now()
-        thread_ids = self.check_back.keys()
-        to_delete = []
-        for thr_id in thread_ids:
-            delete_at = self.check_back[thr_id]
-            if delete_at > now:
-                continue
-            thread = self.bot.get_channel(thr_id)
-            if thread is None:
-                try:
-                    thread = await self.bot.fetch_channel(thr_id)
-                    await thread.delete()
-                except discord.NotFound:
-                    pass
-            to_delete.append(thr_id)
-
-        for thr_id in to_delete:
-            del self.check_back[thr_id]
+    async def clean_raidlog(self, thr_id: int, _payload: None) -> None:
+        """Deletes a strat thread nobody posted in."""
+        thread = await self.bot.resolver.channel(thr_id)
+        if thread is None:
+            return
+        try:
+            await self.bot.outbound.run(thread.delete, Outbound.MAINTENANCE,
+                                        route=thread.id, guild_id=thread.guild.id)
+        except discord.NotFound:
+            pass
 
     @discord.app_commands.command(name="raidlog", description="Alias for /tilestrat")
     @discord.app_commands.describe(tile_code="The tile code to look up.")
@@ -134,7 +121,7 @@ class TilestratCog(ErrorHandlerCog):
         tile_code = tile_code.strip().upper()
         tile_re = r"(?:M|[A-G])(?:R|[A-G])(?:X|[A-H])"
         if len(tile_code) != 3 or re.match(tile_re, tile_code) is None:
-            actual_tile_code = await asyncio.to_thread(bot.utils.bloons.relic_to_tile_code, tile_code)
+            actual_tile_code = await bot.utils.bloons.relic_to_tile_code(tile_code)
             if actual_tile_code is None:
                 raise UnknownTile(tile_code)
             tile_code = actual_tile_code
@@ -145,15 +132,15 @@ class TilestratCog(ErrorHandlerCog):
             await bot.db.queries.tilestrat.del_tile_strat_forum(interaction.guild_id)
             raise TilestratForumNotFound()
 
-        tile_info = await asyncio.to_thread(bot.utils.bloons.fetch_tile_data, tile_code)
-        if tile_info is None:
+        tile = await bot.utils.bloons.get_tile(tile_code)
+        if tile is None:
             raise UnknownTile(tile_code)
 
         strats = await bot.db.queries.tilestrat.get_tilestrats(tile_code, forum_id)
-        current = discord.utils.get(strats, event_num=tile_info["EventNumber"])
+        current = discord.utils.get(strats, event_num=tile.event_number)
         is_just_created = current is None
         if is_just_created:
-            thread = await self.create_tilestrat_thread(tile_info, forum_channel)
+            thread = await self.create_tilestrat_thread(tile, forum_channel)
             strats = await bot.db.queries.tilestrat.get_tilestrats(tile_code, forum_id)
         else:
             thread = interaction.guild.get_thread(current.thread_id)
@@ -161,17 +148,16 @@ class TilestratCog(ErrorHandlerCog):
                 thread = interaction.guild.fetch_channel(current.thread_id)
 
         await interaction.edit_original_response(
-            embed=self.get_raidlog_embed(thread, strats, is_just_created, tile_info["EventNumber"])
+            embed=self.get_raidlog_embed(thread, strats, is_just_created, tile.event_number)
         )
 
-    async def create_tilestrat_thread(self, tile_info: dict, forum_channel: discord.ForumChannel) -> discord.Thread:
-        tile_data = tile_info["GameData"]
+    async def create_tilestrat_thread(self, tile: Tile, forum_channel: discord.ForumChannel) -> discord.Thread:
         tile_type = "Boss"
-        if tile_data['subGameType'] == 9:
+        if tile.game_type == GameType.LEAST_TIERS:
             tile_type = "Least Tiers"
-        elif tile_data['subGameType'] == 8:
+        elif tile.game_type == GameType.LEAST_CASH:
             tile_type = "Least Cash"
-        elif tile_data['subGameType'] == 2:
+        elif tile.game_type == GameType.RACE:
             tile_type = "Race"
 
         tags = []
@@ -179,37 +165,29 @@ class TilestratCog(ErrorHandlerCog):
         if tile_type_tag is None:
             tile_type_tag = await forum_channel.create_tag(name=tile_type)
         tags.append(tile_type_tag)
-        if tile_type == "Boss":
-            boss_name = "Bloonarius"
-            if tile_data['bossData']['bossBloon'] == 1:
-                boss_name = "Lych"
-            elif tile_data['bossData']['bossBloon'] == 2:
-                boss_name = "Vortex"
-            elif tile_data['bossData']['bossBloon'] == 3:
-                boss_name = "Dreadbloon"
-            elif tile_data['bossData']['bossBloon'] == 4:
-                boss_name = "Phayze"
+        if tile_type == "Boss" and tile.boss is not None:
+            boss_name = tile.boss.title
             boss_name_tag = discord.utils.get(forum_channel.available_tags, name=boss_name)
             if boss_name_tag is None:
                 boss_name_tag = await forum_channel.create_tag(name=boss_name)
             tags.append(boss_name_tag)
 
-        map_name = bot.utils.bloons.add_spaces(tile_data["selectedMap"])
-        if map_name == "Adoras Temple":
-            map_name = "Adora's Temple"
-        elif map_name == "Pats Pond":
-            map_name = "Pat's Temple"
-        elif map_name == "Tutorial":
-            map_name = "Monkey Meadow"
+        map_name = bot.utils.bloons.add_spaces(tile.map)
 
         thread_template = "[Event {event_num}] [{map}] {tile_code}"
-        thread = (await forum_channel.create_thread(
-            name=thread_template.format(event_num=tile_info["EventNumber"], map=map_name, tile_code=tile_info["Code"]),
-            content=thread_init_message,
-            applied_tags=tags,
-            embed=bot.utils.bloons.raw_challenge_to_embed(tile_info),
+        thread = (await self.bot.outbound.run(
+            functools.partial(
+                forum_channel.create_thread,
+                name=thread_template.format(event_num=tile.event_number, map=map_name, tile_code=tile.code),
+                content=thread_init_message,
+                applied_tags=tags,
+                embed=bot.utils.bloons.get_tile_embed(tile),
+            ),
+            Outbound.INTERACTION,
+            route=forum_channel.id,
+            guild_id=forum_channel.guild.id,
         )).thread
-        await self.on_raidlog_created(thread, tile_info, forum_channel.id)
+        await self.on_raidlog_created(thread, tile, forum_channel.id)
         return thread
 
     @group_tilestratchannel.command(name="stats", description="Get the raid log stats of the current season!")
@@ -240,22 +218,22 @@ class TilestratCog(ErrorHandlerCog):
             "Regular": {"race": 0, "lc": 0, "lt": 0},
         }
 
-        tiles = await asyncio.to_thread(bot.utils.bloons.fetch_all_tiles)
+        tiles = list((await bot.utils.bloons.get_season_tiles()).values())
         logged_tiles = await bot.db.queries.tilestrat.get_tilestrats_by_season(season, forum_id)
         logged_tiles = [lt.tile_code for lt in logged_tiles]
 
         for tile in tiles:
-            tile_type = tile["TileType"]
+            tile_type = tile.tile_type.value
             tile_chal = "boss"
-            if tile["GameData"]['subGameType'] == 9:
+            if tile.game_type == GameType.LEAST_TIERS:
                 tile_chal = "lt"
-            elif tile["GameData"]['subGameType'] == 8:
+            elif tile.game_type == GameType.LEAST_CASH:
                 tile_chal = "lc"
-            elif tile["GameData"]['subGameType'] == 2:
+            elif tile.game_type == GameType.RACE:
                 tile_chal = "race"
             if tile_type in logged_count:
                 logged_total[tile_type][tile_chal] += 1
-                if tile["Code"] in logged_tiles:
+                if tile.code in logged_tiles:
                     logged_count[tile_type][tile_chal] += 1
 
         embed = discord.Embed(
@@ -302,16 +280,13 @@ class TilestratCog(ErrorHandlerCog):
 
     @staticmethod
     async def fetch_forum(interaction: discord.Interaction, forum_id: int) -> discord.ForumChannel or None:
-        try:
-            forum_channel = interaction.guild.get_channel(forum_id)
-            if forum_channel is None:
-                forum_channel = await interaction.guild.fetch_channel(forum_id)
-        except discord.errors.Forbidden:
+        forum_channel = await interaction.client.resolver.channel(forum_id)
+        if forum_channel is None:
             await interaction.edit_original_response(
                 content=f"I don't have permission to see that channel!"
             )
             return
-        except discord.errors.InvalidData:
+        if forum_channel.guild.id != interaction.guild_id:
             await interaction.edit_original_response(
                 content=f"That channel isn't even in this server!"
             )
@@ -348,9 +323,7 @@ class TilestratCog(ErrorHandlerCog):
 
     @discord.ext.commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
-        if message.channel.id in self.check_back:
-            del self.check_back[message.channel.id]
-            await self.save_state()
+        self.bot.scheduler.cancel("tilestrat:clean", message.channel.id)
 
     @discord.ext.commands.Cog.listener()
     async def on_raw_thread_delete(self, payload: discord.RawThreadDeleteEvent) -> None:
@@ -363,19 +336,21 @@ class TilestratCog(ErrorHandlerCog):
             await bot.db.queries.tilestrat.del_tile_strat_forum(channel.guild.id, soft_delete=False)
 
     async def on_raidlog_requested(self, thread: discord.Thread) -> None:
-        if thread.id in self.check_back:
-            self.check_back[thread.id] = datetime.now() + timedelta(hours=3)
-            await self.save_state()
+        if self.bot.scheduler.get("tilestrat:clean", thread.id) is not None:
+            self.schedule_clean(thread.id)
 
-    async def on_raidlog_created(self, thread: discord.Thread, tile_info: dict, forum_id: int) -> None:
-        self.check_back[thread.id] = datetime.now() + timedelta(hours=3)
-        await self.save_state()
+    async def on_raidlog_created(self, thread: discord.Thread, tile: Tile, forum_id: int) -> None:
+        self.schedule_clean(thread.id)
         await bot.db.queries.tilestrat.create_tilestrat(
-            forum_id, thread.id, tile_info["Code"], tile_info["EventNumber"], tile_info["GameData"]["subGameType"],
-            tile_info["GameData"]["bossData"]["bossBloon"] if "bossData" in tile_info["GameData"] else None
+            forum_id, thread.id, tile.code, tile.event_number, int(tile.game_type),
+            int(tile.boss) if tile.boss is not None else None
         )
 
+    def schedule_clean(self, thread_id: int) -> None:
+        self.bot.scheduler.schedule("tilestrat:clean", thread_id, datetime.now() + timedelta(hours=3), durable=True)
+
     async def on_raidlog_deleted(self, thread_id: int) -> None:
+        self.bot.scheduler.cancel("tilestrat:clean", thread_id)
         await bot.db.queries.tilestrat.del_tilestrat(thread_id)
 
     @staticmethod
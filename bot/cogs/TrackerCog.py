@@ -1,4 +1,3 @@
-import asyncio
 import datetime
 import discord
 from discord.ext import commands
@@ -63,7 +62,7 @@ class TrackerCog(ErrorHandlerCog):
                                channel: discord.TextChannel,
                                season: None or int = 0,
                                hide: None or bool = False) -> None:
-        if channel.id not in (await bot.db.queries.tickets.tracked_channels()):
+        if not await bot.db.queries.tickets.is_channel_tracked(channel.id):
             await interaction.response.send_message("That channel is not being tracked!", ephemeral=True)
             return
 
@@ -75,25 +74,18 @@ class TrackerCog(ErrorHandlerCog):
 
         claims = await bot.db.queries.tickets.get_ticket_overview(channel.id, season)
 
-        async def get_member(uid: int) -> discord.Member:
-            member = interaction.guild.get_member(uid)
-            if member is None:
-                member = await interaction.guild.fetch_member(uid)
-            return member
-
-        members = await asyncio.gather(*[
-            get_member(uid) for uid in claims
-        ], return_exceptions=True)
+        members = await self.bot.resolver.members(interaction.guild, list(claims.keys()))
         total_claims = [0] * 7
-        for member in members:
-            if type(member) is discord.NotFound:
+        for uid in claims:
+            member = members[uid]
+            if member is None:
                 continue
             message += row.format(
-                member.display_name if member else str(member.id),
-                *[len(day_claims) for day_claims in claims[member.id]]
+                member.display_name,
+                *[len(day_claims) for day_claims in claims[uid]]
             )
-            for i in range(len(claims[member.id])):
-                total_claims[i] += len(claims[member.id][i])
+            for i in range(len(claims[uid])):
+                total_claims[i] += len(claims[uid][i])
         message += row.format("Total", *total_claims)
 
         await interaction.edit_original_response(content=message)
@@ -108,7 +100,7 @@ class TrackerCog(ErrorHandlerCog):
     async def cmd_member_tickets(self, interaction: discord.Interaction, channel: discord.TextChannel,
                                  member: discord.Member, season: None or int = 0,
                                  hide: None or bool = False) -> None:
-        if channel.id not in (await bot.db.queries.tickets.tracked_channels()):
+        if not await bot.db.queries.tickets.is_channel_tracked(channel.id):
             await interaction.response.send_message("That channel is not being tracked!", ephemeral=True)
             return
 
@@ -147,13 +139,13 @@ class TrackerCog(ErrorHandlerCog):
                                tile: str,
                                season: None or int = 0,
                                hide: None or bool = False) -> None:
-        if channel.id not in (await bot.db.queries.tickets.tracked_channels()):
+        if not await bot.db.queries.tickets.is_channel_tracked(channel.id):
             await interaction.response.send_message("That channel is not being tracked!", ephemeral=True)
             return
 
         tile = tile.upper()
         tile_re = r"(?:[a-gA-G][a-gA-G][a-hA-H]|[Mm][Rr][Xx]|[Zz]{3})"
-        if re.search(tile_re, tile) is None or not bot.utils.bloons.is_tile_code_valid(tile):
+        if re.search(tile_re, tile) is None or not await bot.utils.bloons.is_tile_code_valid(tile):
             await interaction.response.send_message(f"`{tile}` is not a valid tile code!", ephemeral=True)
             return
 
@@ -196,7 +188,7 @@ class TrackerCog(ErrorHandlerCog):
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent) -> None:
         if str(payload.emoji) not in tracked_emojis or \
-                payload.channel_id not in (await bot.db.queries.tickets.tracked_channels()):
+                not await bot.db.queries.tickets.is_channel_tracked(payload.channel_id):
             return
 
         tile_re = r"\b(?:[a-gA-G][a-gA-G][a-hA-H]|[Mm][Rr][Xx]|[Zz]{3})\b"
@@ -207,7 +199,7 @@ class TrackerCog(ErrorHandlerCog):
             return
 
         tile = match.group(0).upper()
-        if not bot.utils.bloons.is_tile_code_valid(tile):
+        if not await bot.utils.bloons.is_tile_code_valid(tile):
             return
 
         await bot.db.queries.tickets.capture(payload.channel_id, message.author.id, tile, payload.message_id)
@@ -221,7 +213,7 @@ class TrackerCog(ErrorHandlerCog):
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent) -> None:
         if str(payload.emoji) not in tracked_emojis or \
-                payload.channel_id not in (await bot.db.queries.tickets.tracked_channels()):
+                not await bot.db.queries.tickets.is_channel_tracked(payload.channel_id):
             return
 
         channel = self.bot.get_channel(payload.channel_id)
@@ -246,7 +238,7 @@ class TrackerCog(ErrorHandlerCog):
             return
 
         tile = match.group(0).upper()
-        if not bot.utils.bloons.is_tile_code_valid(tile):
+        if not await bot.utils.bloons.is_tile_code_valid(tile):
             return
 
         for cog_name in self.bot.cogs:
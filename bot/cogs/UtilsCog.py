@@ -4,15 +4,29 @@ import bot.utils.io
 import bot.utils.bloons
 import bot.utils.discordutils
 from bot.classes.HelpMessageCog import HelpMessageCog
+from bot.utils.io import TAGS_PATH, get_race_rounds
+from bot.utils.TagIndex import TagIndex
+from bot.utils.RaceRounds import RaceRounds
 import discord
 from discord.ext import commands, tasks
 from bot.classes import ErrorHandlerCog
 
 
+def parse_send_time(send_time: str) -> int or None:
+    """Parses a time like "0:50" or "50" into seconds."""
+    send_time = send_time.strip()
+    if send_time.isnumeric():
+        return int(send_time)
+    minutes, _, seconds = send_time.partition(":")
+    if not minutes.isnumeric() or not seconds.isnumeric():
+        return None
+    return int(minutes)*60 + int(seconds)
+
+
 class UtilsCog(ErrorHandlerCog):
     help_descriptions = {
         "longestround": "Gives you info about a race's longest round, and the rounds that follow.",
-        # "mintime": "Tells you what time you'll get if you pclean a race after fullsending on a certain round.",
+        "mintime": "Tells you what time you'll get if you pclean a race after fullsending on a certain round.",
         "tag": "Sends a pre-written message associated to a tag. Usually for FAQs.\n"
                "Type the command with no parameters to see all available tags.",
         "github": "Get a link to the bot's repo. It's open source!",
@@ -23,7 +37,8 @@ class UtilsCog(ErrorHandlerCog):
 
     def __init__(self, bot: commands.Bot) -> None:
         super().__init__(bot)
-        self.tag_list: list[str] = []
+        self.tags = TagIndex(TAGS_PATH)
+        self.race_rounds = RaceRounds(get_race_rounds())
 
     def cog_load(self) -> None:
         self.update_tag_list.start()
@@ -33,9 +48,10 @@ class UtilsCog(ErrorHandlerCog):
         self.update_tag_list.cancel()
         self.update_status.cancel()
 
-    @tasks.loop(seconds=60*60)
+    @tasks.loop(seconds=30)
     async def update_tag_list(self) -> None:
-        self.tag_list = await asyncio.to_thread(bot.utils.io.get_tag_list)
+        """Reloads the tags if the file was edited."""
+        await asyncio.to_thread(self.tags.refresh)
 
     @tasks.loop(seconds=60*60)
     async def update_status(self) -> None:
@@ -48,18 +64,11 @@ class UtilsCog(ErrorHandlerCog):
                                   description="Get the longest round and its duration for races.")
     @discord.app_commands.describe(end_round="The last round of the race.")
     async def cmd_longestround(self, interaction: discord.Interaction, end_round: int) -> None:
-        if end_round <= 0:
+        if not 0 < end_round <= self.race_rounds.last_round:
             await interaction.response.send_message(f"{end_round} is not a valid round.")
             return
 
-        rounds = await asyncio.to_thread(bot.utils.io.get_race_rounds)
-        start_round = 0
-        round_checkpoints = []
-        while start_round < end_round:
-            check_rounds = sorted(rounds[start_round:end_round], key=lambda x: x["length"])
-            longest = check_rounds[-1]
-            start_round = longest["round"]
-            round_checkpoints.append(longest)
+        round_checkpoints = self.race_rounds.checkpoints(end_round)
 
         followup_rounds_template = "‣ Send **R{}** after max. **{:.2f}s**\n" \
                                    "   *({:.2f}s after R{})   (lasts {:.2f}s total)*\n\n"
@@ -78,35 +87,45 @@ class UtilsCog(ErrorHandlerCog):
                 f"(or a **{round_checkpoints[0]['last_bloon_reverse']}** if the race is on Reverse)."
         await interaction.response.send_message(reply)
 
-    # @discord.app_commands.command(name="mintime",
-    #                               description="Calculate the min time you can get on races when you fullsend.")
-    # @discord.app_commands.describe(from_round="The round you're fullsending from.",
-    #                                to_round="The last round of the race.",
-    #                                send_time_formatted="The time you fullsend at (e.g. 0:50). "
-    #                                                    "Don't include milliseconds.")
-    # @discord.app_commands.rename(send_time_formatted="send_time")
-    # async def cmd_mintime(self, interaction: discord.Interaction, from_round: int,
-    #                       to_round: int, send_time_formatted: str) -> None:
-    #     if send_time_formatted.isnumeric():
-    #         send_time = int(send_time_formatted)
-    #     else:
-    #         minutes, seconds = send_time_formatted.split(":")
-    #         send_time = int(minutes)*60 + int(seconds)
-    #
-    #     rounds = await asyncio.to_thread(ct_ticket_tracker.utils.io.get_race_rounds)
-    #     longest = sorted(rounds[from_round-1:to_round], key=lambda x: x["length"])[-1]
-    #     send_delay = (longest["round"]-from_round)*0.2
-    #     final_time = send_time + longest["length"] + send_delay
-    #     minutes = int(final_time/60)
-    #
-    #     message = f"The longest round {from_round}-{to_round} is **R{longest['round']}** *({longest['length']:.2f}s)*\n" \
-    #               f"With the round send delay, you'll get there in {send_delay:.2f}s\n\n" \
-    #               f"**Min time: {minutes}:{final_time - minutes * 60:05.2f}** *(if fullsent from {send_time}s)*.\n"
-    #
-    #     # message = f"If you are at R{from_round} and you fullsend at {send_time_formatted}, the longest round is " \
-    #     #           f"R{longest['round']} ({longest['length']:.2f}s), plus round send delay, if you pclean you'll get " \
-    #     #           f"**{minutes}:{final_time-minutes*60:.2f}**."
-    #     await interaction.response.send_message(message)
+    @discord.app_commands.command(name="mintime",
+                                  description="Calculate the min time you can get on races when you fullsend.")
+    @discord.app_commands.describe(from_round="The round you're fullsending from.",
+                                   to_round="The last round of the race.",
+                                   send_time_formatted="The time you fullsend at (e.g. 0:50). "
+                                                       "Don't include milliseconds.")
+    @discord.app_commands.rename(send_time_formatted="send_time")
+    async def cmd_mintime(self, interaction: discord.Interaction, from_round: int,
+                          to_round: int, send_time_formatted: str) -> None:
+        if not 0 < from_round <= to_round <= self.race_rounds.last_round:
+            await interaction.response.send_message(
+                f"R{from_round}-R{to_round} is not a valid range of rounds.", ephemeral=True
+            )
+            return
+
+        send_time = parse_send_time(send_time_formatted)
+        if send_time is None:
+            await interaction.response.send_message(
+                f"`{send_time_formatted}` is not a valid time. Write it like `0:50` or `50`.", ephemeral=True
+            )
+            return
+
+        last_rnd, fullsend_time = self.race_rounds.last_to_end(from_round, to_round)
+        longest = self.race_rounds.longest(from_round, to_round)
+        send_delay = (last_rnd["round"]-from_round) * RaceRounds.SEND_DELAY
+        final_time = send_time + fullsend_time
+        minutes = int(final_time/60)
+
+        message = f"The longest round {from_round}-{to_round} is **R{longest['round']}** " \
+                  f"*({longest['length']:.2f}s)*\n"
+        if last_rnd["round"] != longest["round"]:
+            message += f"With the round send delay, **R{last_rnd['round']}** *({last_rnd['length']:.2f}s)* " \
+                       f"ends last instead, since it's sent {send_delay:.2f}s later\n"
+        else:
+            message += f"With the round send delay, you'll get there in {send_delay:.2f}s\n"
+        message += f"\n**Min time: {minutes}:{final_time - minutes*60:05.2f}** *(if fullsent from {send_time}s)*.\n" \
+                   f"*Playing those rounds out without sending would take " \
+                   f"{self.race_rounds.duration(from_round, to_round):.2f}s.*"
+        await interaction.response.send_message(message)
 
     @discord.app_commands.command(name="help",
                                   description="Get info about the bot's commands.")
@@ -164,11 +183,10 @@ class UtilsCog(ErrorHandlerCog):
     async def cmd_send_tag(self, interaction: discord.Interaction, tag_name: str = None) -> None:
         await interaction.response.defer()
         if tag_name is None:
-            tags = await asyncio.to_thread(bot.utils.io.get_tag_list)
-            await interaction.edit_original_response(content=f"Tags: `{'` `'.join(tags)}`")
+            await interaction.edit_original_response(content=f"Tags: `{'` `'.join(self.tags.names)}`")
             return
 
-        tag_content = await asyncio.to_thread(bot.utils.io.get_tag, tag_name.lower())
+        tag_content = self.tags.get(tag_name)
         response_content = tag_content if tag_content else "No tag with that name!"
         await interaction.edit_original_response(content=response_content)
 
@@ -179,7 +197,7 @@ class UtilsCog(ErrorHandlerCog):
                                  ) -> list[discord.app_commands.Choice[str]]:
         return [
             discord.app_commands.Choice(name=tag, value=tag)
-            for tag in self.tag_list if current.lower() in tag.lower()
+            for tag in self.tags.complete(current)
         ]
 
     @discord.app_commands.command(name="github",
@@ -220,6 +238,7 @@ class UtilsCog(ErrorHandlerCog):
         }
         timezone_unknown = []
 
+        await self.bot.member_cache.require(interaction.guild)
         for member in team_role.members:
             found_timezone = False
             for role in member.roles:
@@ -1,10 +1,10 @@
 import string
+import functools
 import discord
-import asyncio
-import bot.utils.io
-from discord.ext import commands, tasks
+from discord.ext import commands
 from datetime import datetime, timedelta
 from bot.classes import ErrorHandlerCog
+from bot.utils.Outbound import Outbound
 
 
 class WelcomeCog(ErrorHandlerCog):
@@ -22,68 +22,68 @@ class WelcomeCog(ErrorHandlerCog):
 
     def __init__(self, bot: commands.Bot) -> None:
         super().__init__(bot)
-        self.waiting_rooms: dict[int, datetime] = {}
 
     async def cog_load(self) -> None:
-        await self.load_state()
-        self.check_inactive_rooms.start()
+        self.bot.scheduler.register("welcome:waiting-room", self.on_waiting_room_inactive)
+        await self.import_legacy_state()
+        # Needs its members to know who joins, leaves or should become a visitor
+        await self.bot.member_cache.always_cache(self.PANDEMONIUM_GID)
 
     def cog_unload(self) -> None:
-        self.check_inactive_rooms.cancel()
+        self.bot.scheduler.unregister("welcome:waiting-room")
 
-    async def load_state(self) -> None:
-        state = await asyncio.to_thread(bot.utils.io.get_cog_state, "welcome")
-        if state is None:
+    async def import_legacy_state(self) -> None:
+        """Schedules the waiting rooms saved before they were scheduler jobs. Done only once,
+        by the process that runs the guild's shard, since its scheduler is the one that fires them."""
+        if not self.bot.owns_guild(self.PANDEMONIUM_GID):
             return
-
-        data = state["data"]
-        if "waiting_rooms" in data:
-            self.waiting_rooms = {}
-            for wr in data["waiting_rooms"]:
-                self.waiting_rooms[wr["uid"]] = datetime.fromtimestamp(wr["expire"])
-
-    async def save_state(self) -> None:
-        data = {
-            "waiting_rooms": [
-                {"uid": uid, "expire": self.waiting_rooms[uid].timestamp()}
-                for uid in self.waiting_rooms
-            ],
-        }
-        await asyncio.to_thread(bot.utils.io.save_cog_state, "welcome", data)
-
-    @tasks.loop(seconds=10)
-    async def check_inactive_rooms(self) -> None:
-        now = datetime.now()
-        to_remove = []
-        for uid in self.waiting_rooms:
-            if self.waiting_rooms[uid] <= now:
-                to_remove.append(uid)
-
-        if len(to_remove) == 0:
+        state = await self.bot.state.get("welcome")
+        if state is None or "waiting_rooms" not in state["data"]:
             return
-
+        for wr in state["data"]["waiting_rooms"]:
+            self.bot.scheduler.schedule(
+                "welcome:waiting-room", wr["uid"],
+                datetime.fromtimestamp(wr["expire"]),
+                durable=True,
+            )
+        self.bot.state.set("welcome", {})
+
+    async def on_waiting_room_inactive(self, uid: int, _payload: None) -> None:
         pandemonium = await self.get_guild(self.PANDEMONIUM_GID)
+        if pandemonium is None:
+            return
         visitor_role = discord.utils.get(pandemonium.roles, id=self.VISITOR_ROLE_ID)
-        for uid in to_remove:
-            del self.waiting_rooms[uid]
-            member = pandemonium.get_member(uid)
-            if member is not None:
-                await member.add_roles(visitor_role)
-                try:
-                    await member.send(
-                        content="Hiiiii you haven't spoken in a week in the Juandemonium server (that one BTD6 team), "
-                                "so it's probably safe to assume you don't really wanna join the team.\n"
-                                "You've been assigned the Visitor role instead. Have fun!"
-                    )
-                except Exception as exc:
-                    print(exc)
+        await self.bot.member_cache.require(pandemonium)
+        member = pandemonium.get_member(uid)
+        if member is not None:
+            await self.bot.outbound.run(
+                functools.partial(member.add_roles, visitor_role),
+                Outbound.MAINTENANCE,
+                route=("roles", pandemonium.id),
+                guild_id=pandemonium.id,
+            )
+            try:
+                await member.send(
+                    content="Hiiiii you haven't spoken in a week in the Juandemonium server (that one BTD6 team), "
+                            "so it's probably safe to assume you don't really wanna join the team.\n"
+                            "You've been assigned the Visitor role instead. Have fun!"
+                )
+            except Exception as exc:
+                print(exc)
+
+    def schedule_waiting_room(self, uid: int) -> None:
+        self.bot.scheduler.schedule(
+            "welcome:waiting-room", uid,
+            datetime.now() + timedelta(seconds=self.VISITOR_AFTER),
+            durable=True,
+        )
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
         member = message.author
-        if member.id in self.waiting_rooms and message.channel.topic == str(member.id):
-            self.waiting_rooms[member.id] = datetime.now() + timedelta(seconds=self.VISITOR_AFTER)
-            await self.save_state()
+        if self.bot.scheduler.get("welcome:waiting-room", member.id) is not None and \
+                message.channel.topic == str(member.id):
+            self.schedule_waiting_room(member.id)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member) -> None:
@@ -119,9 +119,8 @@ class WelcomeCog(ErrorHandlerCog):
                 member: discord.PermissionOverwrite(read_messages=True),
             }
         )
-        self.waiting_rooms[member.id] = datetime.now() + timedelta(seconds=self.VISITOR_AFTER)
+        self.schedule_waiting_room(member.id)
         await new_ch.send(self.WELCOME_MSG.format(member.id))
-        await self.save_state()
 
     async def remove_waiting_room(self, member: discord.Member | discord.User, guild_id: int = None) -> None:
         if member.guild.id != self.PANDEMONIUM_GID:
@@ -131,6 +130,8 @@ class WelcomeCog(ErrorHandlerCog):
             pandemonium = member.guild
         elif guild_id is not None:
             pandemonium = await self.get_guild(guild_id)
+            if pandemonium is None:
+                return
         else:
             return
 
@@ -139,17 +140,13 @@ class WelcomeCog(ErrorHandlerCog):
             return
         for channel in recruitment_category.text_channels:
             if channel.topic == str(member.id):
-                await channel.delete()
-                if member.id in self.waiting_rooms:
-                    del self.waiting_rooms[member.id]
-                    await self.save_state()
+                await self.bot.outbound.run(channel.delete, Outbound.MAINTENANCE,
+                                            route=channel.id, guild_id=pandemonium.id)
+                self.bot.scheduler.cancel("welcome:waiting-room", member.id)
                 return
 
-    async def get_guild(self, guild_id: int) -> discord.Guild:
-        guild = self.bot.get_guild(guild_id)
-        if guild is None:
-            guild = await self.bot.fetch_guild(guild_id)
-        return guild
+    async def get_guild(self, guild_id: int) -> discord.Guild or None:
+        return await self.bot.resolver.guild(guild_id)
 
     @staticmethod
     def username_to_text_channel(username: str) -> str:
@@ -1,25 +1,126 @@
+import asyncio
 import asyncpg
+import contextlib
+import contextvars
+import functools
+import time
 import config
+import bot.db.stats
 
 connection = None
+# (Task, connection) pinned by the innermost transaction() block, if any. Tasks created
+# inside the block inherit the context, so the task is kept to tell them apart.
+pinned_connection = contextvars.ContextVar("pinned_connection", default=None)
+# Statements executed on every new pool connection, so they're already in its statement cache
+hot_statements: list[tuple[str, tuple]] = []
+
+DB_POOL_MIN_SIZE = getattr(config, "DB_POOL_MIN_SIZE", 2)
+DB_POOL_MAX_SIZE = getattr(config, "DB_POOL_MAX_SIZE", 10)
+DB_COMMAND_TIMEOUT = getattr(config, "DB_COMMAND_TIMEOUT", 30)
+DB_STATEMENT_TIMEOUT = getattr(config, "DB_STATEMENT_TIMEOUT", 30)
+DB_SLOW_QUERY_MS = getattr(config, "DB_SLOW_QUERY_MS", 250)
 
 
 async def start():
     global connection
+    # Imported here so they register their hot statements before the pool opens its connections
+    import bot.db.queries.planner
     try:
         connection = await asyncpg.create_pool(
             user=config.DB_USER, password=config.DB_PSWD,
-            database=config.DB_NAME, host=config.DB_HOST
+            database=config.DB_NAME, host=config.DB_HOST,
+            min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+            command_timeout=DB_COMMAND_TIMEOUT,
+            server_settings={"statement_timeout": str(int(DB_STATEMENT_TIMEOUT*1000))},
+            init=warm_up,
         )
-    except:
-        print("PGSQL CONNECTION IS NOT SET - ERROR CONNECTING")
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as exc:
+        print(f"PGSQL CONNECTION IS NOT SET - ERROR CONNECTING: {exc}")
+
+
+def prepare_on_connect(query: str, *sample_args) -> str:
+    """Registers a frequently used statement. It's run with the given (harmless) arguments
+    on every new connection, so it's parsed and cached before the first real call.
+
+    :param query: The SQL query. Functions must use the exact same string to hit the cache.
+    :param sample_args: Arguments to run it with. The query should do nothing with them.
+    :return: The query itself.
+    """
+    hot_statements.append((query, sample_args))
+    return query
+
+
+async def warm_up(conn: asyncpg.Connection) -> None:
+    for query, args in hot_statements:
+        try:
+            await conn.fetch(query, *args)
+        except asyncpg.PostgresError as exc:
+            print(f"Could not warm up statement: {exc}\n{query}")
+
+
+@contextlib.asynccontextmanager
+async def transaction():
+    """Acquires a single connection and opens a transaction on it. Every function
+    decorated with @postgres called inside the block runs on that connection, so
+    the whole block either commits or rolls back together. Nested blocks become savepoints.
+
+    Only the task that opened the block uses its connection. Tasks created inside it
+    (including by asyncio.gather) run their queries outside the transaction.
+
+    :raise RuntimeError: If there's no connection to the database. Check
+                         is_connected() first to do nothing instead, like @postgres functions.
+    """
+    if connection is None:
+        raise RuntimeError("PGSQL connection is not set, can't open a transaction")
+
+    conn = get_pinned_connection()
+    if conn is not None:
+        async with conn.transaction():
+            yield conn
+        return
+
+    async with connection.acquire() as conn:
+        async with conn.transaction():
+            token = pinned_connection.set((asyncio.current_task(), conn))
+            try:
+                yield conn
+            finally:
+                pinned_connection.reset(token)
+
+
+def get_pinned_connection() -> asyncpg.Connection or None:
+    """:return: The connection of the transaction() block the current task is in, if any."""
+    pinned = pinned_connection.get()
+    if pinned is None or pinned[0] is not asyncio.current_task():
+        return None
+    return pinned[1]
+
+
+def is_connected() -> bool:
+    return connection is not None
 
 
 def postgres(func):
+    name = f"{func.__module__.split('.')[-1]}.{func.__name__}"
+
+    @functools.wraps(func)
     async def inner(*args, **kwargs):
         if connection is None:
             return
-        return await func(*args, **kwargs, conn=connection)
+        conn = get_pinned_connection()
+        start_time = time.perf_counter()
+        result = None
+        error = False
+        try:
+            result = await func(*args, **kwargs, conn=conn if conn is not None else connection)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter()-start_time) * 1000
+            rows = len(result) if isinstance(result, list) else None
+            bot.db.stats.record(name, elapsed_ms, rows=rows, error=error)
+            if elapsed_ms >= DB_SLOW_QUERY_MS:
+                print(f"[SLOW QUERY] {name} took {elapsed_ms:.1f}ms")
     return inner
-
-
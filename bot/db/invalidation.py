@@ -0,0 +1,116 @@
+"""
+Keeps the caches of the bot's processes in sync.
+
+Query functions that change a cached table call notify(), which sends a small
+message through PostgreSQL's NOTIFY. Every process LISTENs for them and calls
+the functions subscribed to that table, which evict or reload what changed.
+Messages sent inside a transaction are only delivered if it commits.
+A process ignores its own messages, since it already updated its caches.
+"""
+import asyncio
+import inspect
+import uuid
+import traceback
+from typing import Any, Awaitable, Callable
+import asyncpg
+import config
+
+CHANNEL = "cache_invalidation"
+RECONNECT_EVERY = 5
+# Tells this process' messages apart from the others'
+process_id = uuid.uuid4().hex[:8]
+# Table -> functions called with the key of what changed, or None if anything might have
+subscribers: dict[str, list[Callable[[str or None], Awaitable[Any] or None]]] = {}
+listener: asyncpg.Connection or None = None
+listener_task: asyncio.Task or None = None
+# Coroutines returned by subscribers, kept so they aren't garbage collected while running
+pending_callbacks: set[asyncio.Future] = set()
+
+
+def subscribe(table: str, callback: Callable[[str or None], Awaitable[Any] or None]) -> None:
+    subscribers.setdefault(table, []).append(callback)
+
+
+def unsubscribe(table: str, callback: Callable[[str or None], Awaitable[Any] or None]) -> None:
+    if callback in subscribers.get(table, []):
+        subscribers[table].remove(callback)
+
+
+async def notify(conn, table: str, key: Any = None) -> None:
+    """Tells the other processes a table changed.
+
+    :param conn: The connection the change was made on, so the message is sent when it commits.
+    :param table: The table that changed.
+    :param key: What changed in it (usually a channel or guild ID). None if it might be anything.
+    """
+    await conn.execute("SELECT pg_notify($1, $2)", CHANNEL, f"{process_id}:{table}:{'' if key is None else key}")
+
+
+def dispatch(table: str, key: str or None) -> None:
+    for callback in list(subscribers.get(table, [])):
+        try:
+            result = callback(key)
+            if inspect.isawaitable(result):
+                future = asyncio.ensure_future(result)
+                pending_callbacks.add(future)
+                future.add_done_callback(callback_done)
+        except Exception:
+            traceback.print_exc()
+
+
+def callback_done(future: asyncio.Future) -> None:
+    pending_callbacks.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        exc = future.exception()
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+
+
+def on_notification(_conn, _pid: int, _channel: str, payload: str) -> None:
+    sender, table, key = payload.split(":", 2)
+    if sender == process_id:
+        return
+    dispatch(table, key if key else None)
+
+
+async def start() -> None:
+    global listener_task
+    if listener_task is None:
+        listener_task = asyncio.create_task(listen())
+
+
+async def stop() -> None:
+    global listener_task, listener
+    if listener_task is not None:
+        listener_task.cancel()
+        listener_task = None
+    if listener is not None:
+        listener.terminate()
+        listener = None
+
+
+async def listen() -> None:
+    global listener
+    connected_before = False
+    while True:
+        try:
+            if listener is None or listener.is_closed():
+                listener = await asyncpg.connect(
+                    user=config.DB_USER, password=config.DB_PSWD,
+                    database=config.DB_NAME, host=config.DB_HOST,
+                    timeout=RECONNECT_EVERY,
+                )
+                await listener.add_listener(CHANNEL, on_notification)
+                if connected_before:
+                    # Whatever was sent while disconnected is lost
+                    for table in list(subscribers.keys()):
+                        dispatch(table, None)
+                connected_before = True
+            await listener.fetchval("SELECT 1", timeout=RECONNECT_EVERY)
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as exc:
+            if listener is not None:
+                print(f"Lost the cache invalidation connection: {exc}")
+                listener.terminate()
+                listener = None
+            else:
+                print(f"Could not open the cache invalidation connection: {exc}")
+        await asyncio.sleep(RECONNECT_EVERY)
@@ -1,8 +1,21 @@
 import time
 import bot.db.connection
+import bot.db.invalidation
 import bot.utils.bloons
 from ..model.LeaderboardChannel import LeaderboardChannel
 postgres = bot.db.connection.postgres
+notify = bot.db.invalidation.notify
+
+# Rows of the lbchannels table. None until it's loaded, and again when it changes.
+leaderboard_channels_cache: list[LeaderboardChannel] or None = None
+
+
+def on_leaderboard_channels_changed(_key: str or None) -> None:
+    global leaderboard_channels_cache
+    leaderboard_channels_cache = None
+
+
+bot.db.invalidation.subscribe("lbchannels", on_leaderboard_channels_changed)
 
 
 @postgres
@@ -11,15 +24,22 @@ async def add_leaderboard_channel(guild: int, channel: int, conn=None) -> None:
                 INSERT INTO lbchannels (guild, channel) VALUES ($1, $2)
                     ON CONFLICT DO NOTHING
                 """, guild, channel)
+    on_leaderboard_channels_changed(None)
+    await notify(conn, "lbchannels", guild)
 
 
 @postgres
 async def remove_leaderboard_channel(guild: int, channel: int, conn=None) -> None:
     await conn.execute("DELETE FROM lbchannels WHERE guild=$1 AND channel=$2",
                        guild, channel)
+    on_leaderboard_channels_changed(None)
+    await notify(conn, "lbchannels", guild)
 
 
 @postgres
 async def leaderboard_channels(conn=None) -> list[LeaderboardChannel]:
-    payload = await conn.fetch("SELECT guild, channel FROM lbchannels")
-    return [LeaderboardChannel(row["guild"], row["channel"]) for row in payload]
+    global leaderboard_channels_cache
+    if leaderboard_channels_cache is None:
+        payload = await conn.fetch("SELECT guild, channel FROM lbchannels")
+        leaderboard_channels_cache = [LeaderboardChannel(row["guild"], row["channel"]) for row in payload]
+    return list(leaderboard_channels_cache)
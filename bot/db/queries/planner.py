@@ -1,41 +1,160 @@
 import time
 import datetime
 import bot.db.connection
+import bot.db.invalidation
 import bot.utils.bloons
 from typing import Any, Literal
 from ..model.Planner import Planner
 from ..model.PlannedTile import PlannedTile
 postgres = bot.db.connection.postgres
 bloons = bot.utils.bloons
+prepare_on_connect = bot.db.connection.prepare_on_connect
+notify = bot.db.invalidation.notify
+
+# The optional filters are always part of the query (and ignored when NULL/'ANY')
+# so the text never changes and the prepared statement can be reused.
+_TILE_CAPTURES = """
+    SELECT c.tile, c.claimed_at, ptc.user_id, p.claims_channel, p.ping_role, p.ping_channel, p.planner_channel,
+        ptt.expires_after_hr, c.claimed_at + MAKE_INTERVAL(hours => ptt.expires_after_hr) AS expires_at
+    FROM (
+        claims c JOIN planners p ON c.channel = p.claims_channel
+        JOIN plannertrackedtiles ptt
+            ON ptt.planner_channel = p.planner_channel
+                AND ptt.tile = c.tile
+        ) LEFT JOIN plannertileclaims ptc
+            ON p.planner_channel = ptc.planner_channel AND c.tile = ptc.tile
+    WHERE p.planner_channel = $3
+        AND c.claimed_at >= $1
+        AND c.tile = ANY($2::VARCHAR(3)[])
+    ORDER BY expires_at ASC
+"""
+PLANNED_TILES_QUERY = prepare_on_connect(f"""
+    SELECT *
+    FROM ({_TILE_CAPTURES}) tcap
+    WHERE claimed_at = (
+        SELECT MAX(claimed_at)
+        FROM ({_TILE_CAPTURES}) tcap2
+        WHERE tcap.tile = tcap2.tile
+    ) AND (
+        (SELECT clear_time FROM planners WHERE planner_channel = $3) IS NULL
+        OR claimed_at >= (SELECT clear_time FROM planners WHERE planner_channel = $3)
+    )
+    AND ($4::TIMESTAMP IS NULL OR expires_at >= $4::TIMESTAMP)
+    AND ($5::TIMESTAMP IS NULL OR expires_at < $5::TIMESTAMP)
+    AND (
+        $6::VARCHAR = 'ANY'
+        OR (tcap.user_id IS NULL) = ($6::VARCHAR = 'UNCLAIMED')
+    )
+""", datetime.datetime.max, [], 0, None, None, "ANY")
+TRACKED_TILES_QUERY = prepare_on_connect("""
+    SELECT tile FROM plannertrackedtiles WHERE planner_channel=$1
+""", 0)
+CLAIMS_BY_QUERY = prepare_on_connect("""
+    SELECT *
+    FROM plannertileclaims
+    WHERE user_id = $1
+        AND planner_channel = $2
+        AND claimed_at >= $3
+        AND (
+            (SELECT clear_time FROM planners WHERE planner_channel = $2) IS NULL OR
+            claimed_at >= (SELECT clear_time FROM planners WHERE planner_channel = $2)
+        )
+""", 0, 0, datetime.datetime.max)
+SWITCH_TILE_CLAIM_QUERY = prepare_on_connect("""
+    SELECT planner_switch_tile_claim($1, $2, $3, $4, $5, $6, $7)
+""", 0, 0, "", datetime.datetime.max, True, 0, datetime.datetime.max)
+
+
+# Write-through cache of the planners table. Loaded once, then every function
+# that changes a planner updates it with the row the database returns.
+# Changes made by other processes reload the rows they touched.
+planners_cache: dict[int, Planner] = {}
+planners_by_claims_channel: dict[int, int] = {}
+planners_cache_loaded = False
+# Planner ID -> tiles it tracks. Evicted when they change.
+tracked_tiles_cache: dict[int, list[str]] = {}
+
+
+def cache_planner(row) -> Planner:
+    planner = Planner(row["planner_channel"], row["claims_channel"], row["ping_role"], row["ping_role_with_tickets"],
+                      row["ping_channel"], row["clear_time"], row["is_active"])
+    uncache_planner(planner.planner_channel)
+    planners_cache[planner.planner_channel] = planner
+    if planner.claims_channel is not None:
+        planners_by_claims_channel[planner.claims_channel] = planner.planner_channel
+    return planner
+
+
+def uncache_planner(planner_id: int) -> None:
+    planner = planners_cache.pop(planner_id, None)
+    if planner is not None and planners_by_claims_channel.get(planner.claims_channel) == planner_id:
+        del planners_by_claims_channel[planner.claims_channel]
+
+
+async def load_planners_cache(conn) -> None:
+    global planners_cache_loaded
+    planners = await conn.fetch("SELECT * FROM planners")
+    planners_cache.clear()
+    planners_by_claims_channel.clear()
+    for row in planners:
+        cache_planner(row)
+    planners_cache_loaded = True
+
+
+@postgres
+async def reload_planner(planner_id: int, conn=None) -> None:
+    row = await conn.fetchrow("SELECT * FROM planners WHERE planner_channel=$1", planner_id)
+    if row is None:
+        uncache_planner(planner_id)
+    else:
+        cache_planner(row)
+
+
+async def on_planners_changed(key: str or None) -> None:
+    global planners_cache_loaded
+    if key is None:
+        planners_cache_loaded = False
+        tracked_tiles_cache.clear()
+        return
+    # Deleting a planner deletes its tracked tiles too
+    tracked_tiles_cache.pop(int(key), None)
+    if planners_cache_loaded:
+        await reload_planner(int(key))
+
+
+def on_tracked_tiles_changed(key: str or None) -> None:
+    if key is None:
+        tracked_tiles_cache.clear()
+    else:
+        tracked_tiles_cache.pop(int(key), None)
+
+
+bot.db.invalidation.subscribe("planners", on_planners_changed)
+bot.db.invalidation.subscribe("plannertrackedtiles", on_tracked_tiles_changed)
 
 
 @postgres
 async def get_planners(only_active: bool = False, conn=None) -> list[Planner]:
-    only_active_q = " WHERE is_active" if only_active else ""
-    planners = await conn.fetch("SELECT * FROM planners" + only_active_q)
-    return [Planner(row["planner_channel"], row["claims_channel"], row["ping_role"], row["ping_role_with_tickets"],
-                    row["ping_channel"], row["clear_time"], row["is_active"])
-            for row in planners]
+    if not planners_cache_loaded:
+        await load_planners_cache(conn)
+    return [planner for planner in planners_cache.values() if planner.is_active or not only_active]
 
 
 @postgres
 async def get_planner(planner_id: int, conn=None) -> Planner or None:
-    results = await conn.fetch("""
-        SELECT *
-        FROM planners
-        WHERE planner_channel=$1
-    """, planner_id)
-    return Planner(results[0]["planner_channel"], results[0]["claims_channel"], results[0]["ping_role"],
-                   results[0]["ping_role_with_tickets"], results[0]["ping_channel"], results[0]["clear_time"],
-                   results[0]["is_active"]) \
-        if len(results) else None
+    if not planners_cache_loaded:
+        await load_planners_cache(conn)
+    return planners_cache.get(planner_id)
 
 
 @postgres
 async def add_planner(planner_id: int, conn=None) -> None:
-    await conn.execute("""
+    row = await conn.fetchrow("""
         INSERT INTO planners(planner_channel) VALUES($1)
+        RETURNING *
     """, planner_id)
+    cache_planner(row)
+    await notify(conn, "planners", planner_id)
 
 
 @postgres
@@ -43,6 +162,9 @@ async def del_planner(planner_id: int, conn=None) -> None:
     await conn.execute("""
         DELETE FROM planners WHERE planner_channel=$1
     """, planner_id)
+    uncache_planner(planner_id)
+    tracked_tiles_cache.pop(planner_id, None)
+    await notify(conn, "planners", planner_id)
 
 
 @postgres
@@ -62,16 +184,18 @@ async def change_planner(
         ("is_active", is_active),
     ]
     fields_query = []
-    for i in range(len(fields)):
-        var_name, var_value = fields[i]
+    for var_name, var_value in fields:
         if var_value is None:
             continue
-        fields_query.append((f"{var_name}=${i+2}", var_value))
+        fields_query.append((f"{var_name}=${len(fields_query)+2}", var_value))
     if len(fields_query) == 0:
         return
 
-    q = f"UPDATE planners SET {', '.join([x for x, _ in fields_query])} WHERE planner_id=$1"
-    await conn.execute(q, planner_id, *[x for _, x in fields_query])
+    q = f"UPDATE planners SET {', '.join([x for x, _ in fields_query])} WHERE planner_channel=$1 RETURNING *"
+    row = await conn.fetchrow(q, planner_id, *[x for _, x in fields_query])
+    if row is not None:
+        cache_planner(row)
+        await notify(conn, "planners", planner_id)
 
 
 @postgres
@@ -81,51 +205,9 @@ async def get_planned_tiles(planner_channel: int,
                             claimed_status: Literal["UNCLAIMED", "CLAIMED", "ANY"] = "ANY",
                             conn=None) -> list[PlannedTile]:
     event_start, _event_end = bloons.get_current_ct_period()
-    tile_captures = """
-        SELECT c.tile, c.claimed_at, ptc.user_id, p.claims_channel, p.ping_role, p.ping_channel, p.planner_channel,
-            ptt.expires_after_hr, c.claimed_at + MAKE_INTERVAL(hours => ptt.expires_after_hr) AS expires_at
-        FROM (
-            claims c JOIN planners p ON c.channel = p.claims_channel
-            JOIN plannertrackedtiles ptt
-                ON ptt.planner_channel = p.planner_channel
-                    AND ptt.tile = c.tile
-            ) LEFT JOIN plannertileclaims ptc
-                ON p.planner_channel = ptc.planner_channel AND c.tile = ptc.tile
-        WHERE p.planner_channel = $3
-            AND c.claimed_at >= $1
-            AND c.tile = ANY($2::VARCHAR(3)[])
-        ORDER BY expires_at ASC
-    """
-
-    extra_args = []
-    q_between = ""
-    if expire_between is not None:
-        q_between = f"""
-            AND expires_at >= ${len(extra_args) + 4}
-            AND expires_at < ${len(extra_args) + 5}
-        """
-        extra_args.append(expire_between[0])
-        extra_args.append(expire_between[1])
-    q_claim = ""
-    if claimed_status == "UNCLAIMED":
-        q_claim = "AND tcap.user_id IS NULL"
-    elif claimed_status == "CLAIMED":
-        q_claim = "AND tcap.user_id IS NOT NULL"
-
-    banners = await conn.fetch(f"""
-        SELECT *
-        FROM ({tile_captures}) tcap
-        WHERE claimed_at = (
-            SELECT MAX(claimed_at)
-            FROM ({tile_captures}) tcap2
-            WHERE tcap.tile = tcap2.tile
-        ) AND (
-            (SELECT clear_time FROM planners WHERE planner_channel = $3) IS NULL
-            OR claimed_at >= (SELECT clear_time FROM planners WHERE planner_channel = $3)
-        )
-        {q_between}
-        {q_claim}
-    """, event_start, tile_codes, planner_channel, *extra_args)
+    expire_from, expire_to = expire_between if expire_between is not None else (None, None)
+    banners = await conn.fetch(PLANNED_TILES_QUERY,
+                               event_start, tile_codes, planner_channel, expire_from, expire_to, claimed_status)
     return [PlannedTile(row["tile"], row["claimed_at"], row["user_id"], row["planner_channel"], row["claims_channel"],
                         row["ping_role"], row["ping_channel"], row["expires_after_hr"])
             for row in banners]
@@ -194,6 +276,34 @@ async def planner_claim_tile(user: int, tile: str, planner_channel: int, conn=No
         INSERT INTO plannertileclaims(user_id, planner_channel, tile, claimed_at)
         VALUES($1, $2, $3, $4)
     """, user, planner_channel, tile, datetime.datetime.now())
+    await notify(conn, "plannertileclaims", planner_channel)
+
+
+@postgres
+async def planner_switch_tile_claim(
+        user: int,
+        tile: str,
+        planner_channel: int,
+        force_claim: bool = False,
+        max_claims: int = 4,
+        conn=None) -> Literal["NOT_PLANNED", "UNCLAIMED", "ALREADY_CLAIMED", "LIMIT_REACHED", "TAKEN", "CLAIMED"]:
+    """Claims a tile for an user, or unclaims it if they had already claimed it.
+    Checks and changes happen in a single call while holding a lock on the planner,
+    so two members can't claim the same tile at once.
+
+    :param user: The ID of the user.
+    :param tile: The tile code.
+    :param planner_channel: The ID of the planner.
+    :param force_claim: If True, never unclaims the tile.
+    :param max_claims: How many tiles an user can have claimed at once.
+    :return: What happened.
+    """
+    event_start, _ee = bloons.get_current_ct_period()
+    result = await conn.fetchval(SWITCH_TILE_CLAIM_QUERY, user, planner_channel, tile, event_start,
+                                 force_claim, max_claims, datetime.datetime.now())
+    if result in ("UNCLAIMED", "CLAIMED"):
+        await notify(conn, "plannertileclaims", planner_channel)
+    return result
 
 
 @postgres
@@ -201,6 +311,7 @@ async def planner_unclaim_tile(tile: str, planner_channel: int, conn=None) -> No
     await conn.execute("""
         DELETE FROM plannertileclaims WHERE planner_channel = $1 AND tile = $2
     """, planner_channel, tile)
+    await notify(conn, "plannertileclaims", planner_channel)
 
 
 async def planner_get_tile_status(tile: str, planner_channel: int) -> PlannedTile or None:
@@ -233,9 +344,13 @@ async def planner_update_config(
 
     if len(fields) == 0:
         return
-    await conn.execute(f"""
+    row = await conn.fetchrow(f"""
         UPDATE planners SET {', '.join(fields)} WHERE planner_channel = $1
+        RETURNING *
     """, planner, *values)
+    if row is not None:
+        cache_planner(row)
+        await notify(conn, "planners", planner)
 
 
 @postgres
@@ -247,56 +362,54 @@ async def planner_delete_config(
         tile_claim_ch: bool = False,
         conn=None) -> None:
     fields = []
-    if ping_ch is not None:
+    if ping_ch:
         fields.append(f"ping_channel=$2")
-    if ping_role is not None:
+    if ping_role:
         fields.append(f"ping_role=$2")
-    if tile_claim_ch is not None:
+    if tile_claim_ch:
         fields.append(f"claims_channel=$2")
-    if ping_role_with_tickets is not None:
+    if ping_role_with_tickets:
         fields.append(f"ping_role_with_tickets=$2")
 
     if len(fields) == 0:
         return
-    await conn.execute(f"""
+    row = await conn.fetchrow(f"""
         UPDATE planners SET {', '.join(fields)} WHERE planner_channel = $1
+        RETURNING *
     """, planner, None)
+    if row is not None:
+        cache_planner(row)
+        await notify(conn, "planners", planner)
 
 
 @postgres
 async def get_planner_linked_to(tile_claim_ch: int, conn=None) -> int:
-    channel = await conn.fetch("""
-        SELECT planner_channel
-        FROM planners
-        WHERE claims_channel = $1
-    """, tile_claim_ch)
-    return channel[0]["planner_channel"] if len(channel) > 0 else None
+    if not planners_cache_loaded:
+        await load_planners_cache(conn)
+    return planners_by_claims_channel.get(tile_claim_ch)
 
 
 @postgres
 async def get_claims_by(user: int, planner_channel: int, conn=None) -> list[dict[str, Any]]:
     event_start, _ee = bot.utils.bloons.get_current_ct_period()
-    return await conn.fetch("""
-        SELECT *
-        FROM plannertileclaims
-        WHERE user_id = $1
-            AND planner_channel = $2
-            AND claimed_at >= $3
-            AND (
-                (SELECT clear_time FROM planners WHERE planner_channel = $2) IS NULL OR
-                claimed_at >= (SELECT clear_time FROM planners WHERE planner_channel = $2)
-            )
-    """, user, planner_channel, event_start)
+    return await conn.fetch(CLAIMS_BY_QUERY, user, planner_channel, event_start)
 
 
 @postgres
 async def turn_planner(planner: int, active: bool, conn=None) -> None:
-    await conn.execute("UPDATE planners SET is_active=$1 WHERE planner_channel=$2", active, planner)
+    row = await conn.fetchrow("UPDATE planners SET is_active=$1 WHERE planner_channel=$2 RETURNING *", active, planner)
+    if row is not None:
+        cache_planner(row)
+        await notify(conn, "planners", planner)
 
 
 @postgres
 async def set_clear_time(planner: int, clear_time: datetime.datetime, conn=None) -> None:
-    await conn.execute("UPDATE planners SET clear_time=$1 WHERE planner_channel=$2", clear_time, planner)
+    row = await conn.fetchrow("UPDATE planners SET clear_time=$1 WHERE planner_channel=$2 RETURNING *",
+                              clear_time, planner)
+    if row is not None:
+        cache_planner(row)
+        await notify(conn, "planners", planner)
 
 
 @postgres
@@ -307,20 +420,24 @@ async def edit_tile_capture_time(channel_id: int,
                                  conn=None) -> bool:
     event_start, _event_end = bloons.get_current_ct_period()
     min_time_to_edit = event_start if planner_clear_time is None else max(event_start, planner_clear_time)
-    updated = await conn.execute("""
-        UPDATE claims
-        SET claimed_at = $1
-        WHERE tile = $2
-            AND channel = $3
-            AND claimed_at = (
-                SELECT MAX(claimed_at)
-                FROM claims
-                WHERE tile = $2
-                    AND channel = $3
-            )
-            AND claimed_at >= $4
-    """, new_time, tile, channel_id, min_time_to_edit)
-    updated_rows = int(updated[7:])
+    # On a single connection, so the notification is only sent if the edit commits
+    async with bot.db.connection.transaction() as conn:
+        updated = await conn.execute("""
+            UPDATE claims
+            SET claimed_at = $1
+            WHERE tile = $2
+                AND channel = $3
+                AND claimed_at = (
+                    SELECT MAX(claimed_at)
+                    FROM claims
+                    WHERE tile = $2
+                        AND channel = $3
+                )
+                AND claimed_at >= $4
+        """, new_time, tile, channel_id, min_time_to_edit)
+        updated_rows = int(updated[7:])
+        if updated_rows > 0:
+            await notify(conn, "claims", channel_id)
     return updated_rows > 0
 
 
@@ -329,20 +446,132 @@ async def remove_tile_from_planner(planner_id: int, tile: str, conn=None) -> Non
     await conn.execute("""
         DELETE FROM plannertrackedtiles WHERE planner_channel=$2 AND tile=$1
     """, tile, planner_id)
+    tracked_tiles_cache.pop(planner_id, None)
+    await notify(conn, "plannertrackedtiles", planner_id)
 
 
 @postgres
 async def add_tile_to_planner(planner_id: int, tile: str, recap_after: int, conn=None) -> None:
-    await remove_tile_from_planner(planner_id, tile)
     await conn.execute("""
         INSERT INTO plannertrackedtiles (tile, expires_after_hr, registered_at, planner_channel)
         VALUES ($1, $2, $3, $4)
+        ON CONFLICT (tile, planner_channel) DO UPDATE
+            SET expires_after_hr = EXCLUDED.expires_after_hr,
+                registered_at = EXCLUDED.registered_at
     """, tile, recap_after, datetime.datetime.now(), planner_id)
+    tracked_tiles_cache.pop(planner_id, None)
+    await notify(conn, "plannertrackedtiles", planner_id)
 
 
 @postgres
-async def get_planner_tracked_tiles(planner_id: int, conn=None) -> list[str]:
-    result = await conn.fetch("""
-        SELECT tile FROM plannertrackedtiles WHERE planner_channel=$1
+async def add_tiles_to_planner(planner_id: int, tiles: list[str], recap_after: int, conn=None) -> None:
+    await conn.execute("""
+        INSERT INTO plannertrackedtiles (tile, expires_after_hr, registered_at, planner_channel)
+        SELECT DISTINCT tile, $2, $3, $4
+        FROM UNNEST($1::VARCHAR(3)[]) AS tile
+        ON CONFLICT (tile, planner_channel) DO UPDATE
+            SET expires_after_hr = EXCLUDED.expires_after_hr,
+                registered_at = EXCLUDED.registered_at
+    """, tiles, recap_after, datetime.datetime.now(), planner_id)
+    tracked_tiles_cache.pop(planner_id, None)
+    await notify(conn, "plannertrackedtiles", planner_id)
+
+
+@postgres
+async def clear_planner_tiles(planner_id: int, conn=None) -> None:
+    await conn.execute("""
+        DELETE FROM plannertrackedtiles WHERE planner_channel=$1
     """, planner_id)
-    return [r["tile"] for r in result]
+    tracked_tiles_cache.pop(planner_id, None)
+    await notify(conn, "plannertrackedtiles", planner_id)
+
+
+async def overwrite_planner_tiles(planner_id: int, tiles: list[str], recap_after: int) -> None:
+    """Replaces all tiles tracked by a planner in a single transaction."""
+    if not bot.db.connection.is_connected():
+        return
+    async with bot.db.connection.transaction():
+        await clear_planner_tiles(planner_id)
+        await add_tiles_to_planner(planner_id, tiles, recap_after)
+    # It might have been read again before the transaction committed
+    tracked_tiles_cache.pop(planner_id, None)
+
+
+@postgres
+async def clear_all_planner_tiles(conn=None) -> None:
+    await conn.execute("DELETE FROM plannertrackedtiles")
+    tracked_tiles_cache.clear()
+    await notify(conn, "plannertrackedtiles")
+
+
+@postgres
+async def add_tiles_to_all_planners(tiles: list[str], recap_after: int, conn=None) -> list[int]:
+    planners = await conn.fetch("""
+        INSERT INTO plannertrackedtiles (tile, expires_after_hr, registered_at, planner_channel)
+        SELECT DISTINCT t.tile, $2, $3, p.planner_channel
+        FROM planners p CROSS JOIN UNNEST($1::VARCHAR(3)[]) AS t(tile)
+        ON CONFLICT (tile, planner_channel) DO NOTHING
+        RETURNING planner_channel
+    """, tiles, recap_after, datetime.datetime.now())
+    tracked_tiles_cache.clear()
+    await notify(conn, "plannertrackedtiles")
+    return list({row["planner_channel"] for row in planners})
+
+
+@postgres
+async def claim_rollover(event: int, conn=None) -> bool:
+    """Marks an event's rollover as done.
+
+    :return: False if it already was.
+    """
+    claimed = await conn.fetchval("""
+        INSERT INTO plannerrollovers (event_num, rolled_over_at) VALUES ($1, $2)
+        ON CONFLICT (event_num) DO NOTHING
+        RETURNING event_num
+    """, event, datetime.datetime.now())
+    return claimed is not None
+
+
+@postgres
+async def get_ping_marks(conn=None) -> dict[str, datetime.datetime]:
+    """:return: Kind of ping -> up to when it was handled, shared by every process that can lead the pings."""
+    rows = await conn.fetch("SELECT kind, mark FROM plannerpingmarks")
+    return {row["kind"]: row["mark"] for row in rows}
+
+
+@postgres
+async def advance_ping_marks(marks: dict[str, datetime.datetime], conn=None) -> None:
+    """Moves ping marks forward. A mark is never moved back.
+
+    :param marks: Kind of ping -> up to when it was handled.
+    """
+    await conn.executemany("""
+        INSERT INTO plannerpingmarks (kind, mark) VALUES ($1, $2)
+        ON CONFLICT (kind) DO UPDATE SET mark = GREATEST(plannerpingmarks.mark, EXCLUDED.mark)
+    """, list(marks.items()))
+
+
+async def rollover_planner_tiles(event: int, tiles: list[str], recap_after: int) -> list[int] or None:
+    """Replaces the tracked tiles of every planner with an event's tiles, in a single transaction.
+    Each event is rolled over only once, so it's safe to call it again.
+
+    :return: The IDs of the planners that track the new tiles, or None if there's no connection
+             or the event was already rolled over.
+    """
+    if not bot.db.connection.is_connected():
+        return None
+    async with bot.db.connection.transaction():
+        if not await claim_rollover(event):
+            return None
+        await clear_all_planner_tiles()
+        planners = await add_tiles_to_all_planners(tiles, recap_after)
+    tracked_tiles_cache.clear()
+    return planners
+
+
+@postgres
+async def get_planner_tracked_tiles(planner_id: int, conn=None) -> list[str]:
+    if planner_id not in tracked_tiles_cache:
+        result = await conn.fetch(TRACKED_TILES_QUERY, planner_id)
+        tracked_tiles_cache[planner_id] = [r["tile"] for r in result]
+    return list(tracked_tiles_cache[planner_id])
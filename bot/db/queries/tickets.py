@@ -1,10 +1,23 @@
 import time
 import datetime
 import bot.db.connection
+import bot.db.invalidation
 import bot.utils.bloons
 from ..model.TileCapture import TileCapture
 postgres = bot.db.connection.postgres
 bloons = bot.utils.bloons
+notify = bot.db.invalidation.notify
+
+# Channels in the teams table. None until it's loaded, and again when another process changes it.
+tracked_channels_cache: set[int] or None = None
+
+
+def on_teams_changed(_key: str or None) -> None:
+    global tracked_channels_cache
+    tracked_channels_cache = None
+
+
+bot.db.invalidation.subscribe("teams", on_teams_changed)
 
 
 @postgres
@@ -13,12 +26,18 @@ async def track_channel(channel: int, conn=None) -> None:
             INSERT INTO teams (channel) VALUES ($1)
                 ON CONFLICT DO NOTHING
             """, channel)
+    if tracked_channels_cache is not None:
+        tracked_channels_cache.add(channel)
+    await notify(conn, "teams", channel)
 
 
 @postgres
 async def untrack_channel(channel: int, conn=None) -> None:
     await conn.execute("DELETE FROM teams WHERE channel=$1",
                        channel)
+    if tracked_channels_cache is not None:
+        tracked_channels_cache.discard(channel)
+    await notify(conn, "teams", channel)
 
 
 @postgres
@@ -74,16 +93,17 @@ async def get_tickets_from(member_id: int, channel: int, event: int = 0, conn=No
 
 
 @postgres
-async def tracked_channels(conn=None) -> list[int]:
+async def load_tracked_channels(conn=None) -> None:
+    global tracked_channels_cache
     payload = await conn.fetch("SELECT channel FROM teams")
-    channels = [row["channel"] for row in payload]
-    return channels
+    tracked_channels_cache = {row["channel"] for row in payload}
 
 
-@postgres
-async def is_channel_tracked(channel_id: int, conn=None) -> bool:
-    payload = await conn.fetch("SELECT channel FROM teams WHERE channel = $1", channel_id)
-    return len(payload) > 0
+async def is_channel_tracked(channel_id: int) -> bool:
+    if tracked_channels_cache is None:
+        await load_tracked_channels()
+    # Still None if there's no connection
+    return tracked_channels_cache is not None and channel_id in tracked_channels_cache
 
 
 @postgres
@@ -92,11 +112,13 @@ async def capture(channel: int, user: int, tile: str, message: int, conn=None) -
             INSERT INTO claims (userid, tile, channel, message, claimed_at) VALUES ($1, $2, $3, $4, $5)
                 ON CONFLICT DO NOTHING
         """, user, tile, channel, message, datetime.datetime.now())
+    await notify(conn, "claims", channel)
 
 
 @postgres
 async def uncapture(message: int, conn=None) -> None:
     await conn.execute("DELETE FROM claims WHERE message=$1", message)
+    await notify(conn, "claims")
 
 
 @postgres
@@ -1,23 +1,41 @@
 import time
 import bot.db.connection
+import bot.db.invalidation
 from bot.db.model.Tilestrat import Tilestrat
 import bot.utils.bloons
 postgres = bot.db.connection.postgres
+notify = bot.db.invalidation.notify
+
+# Guild ID -> its tile strat forum, or None if it doesn't have one
+forums_cache: dict[int, int or None] = {}
+
+
+def on_forums_changed(key: str or None) -> None:
+    if key is None:
+        forums_cache.clear()
+    else:
+        forums_cache.pop(int(key), None)
+
+
+bot.db.invalidation.subscribe("tilestratforums", on_forums_changed)
 
 
 @postgres
 async def get_tile_strat_forum(guild_id: int, conn=None) -> int:
-    payload = await conn.fetch("SELECT forumid FROM tilestratforums WHERE guildid=$1", guild_id)
-    return payload[0]["forumid"] if len(payload) > 0 else None
+    if guild_id not in forums_cache:
+        payload = await conn.fetch("SELECT forumid FROM tilestratforums WHERE guildid=$1", guild_id)
+        forums_cache[guild_id] = payload[0]["forumid"] if len(payload) > 0 else None
+    return forums_cache[guild_id]
 
 
 @postgres
 async def set_tile_strat_forum(guild_id: int, forum_id: int, conn=None) -> None:
-    saved_forum_id = await get_tile_strat_forum(guild_id)
-    if saved_forum_id:
-        await conn.execute("UPDATE tilestratforums SET forumid=$2 WHERE guildid=$1", guild_id, forum_id)
-    else:
-        await conn.execute("INSERT INTO tilestratforums(guildid, forumid) VALUES ($1, $2)", guild_id, forum_id)
+    await conn.execute("""
+        INSERT INTO tilestratforums(guildid, forumid) VALUES ($1, $2)
+        ON CONFLICT (guildid) DO UPDATE SET forumid=EXCLUDED.forumid
+    """, guild_id, forum_id)
+    forums_cache[guild_id] = forum_id
+    await notify(conn, "tilestratforums", guild_id)
 
 
 @postgres
@@ -27,6 +45,8 @@ async def del_tile_strat_forum(guild_id: int, soft_delete: bool = True, conn=Non
             "DELETE FROM tilestratthreads "
             "WHERE forum_id=(SELECT forumid FROM tilestratforums WHERE guildid=$1)", guild_id)
     await conn.execute("DELETE FROM tilestratforums WHERE guildid=$1", guild_id)
+    forums_cache[guild_id] = None
+    await notify(conn, "tilestratforums", guild_id)
 
 
 @postgres
@@ -0,0 +1,60 @@
+from dataclasses import dataclass, field
+
+# Upper bounds of the latency histogram buckets, in milliseconds. The last bucket catches everything else.
+LATENCY_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+
+@dataclass
+class QueryStats:
+    name: str
+    calls: int = 0
+    errors: int = 0
+    rows: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS)+1), repr=False)
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def percentile_ms(self, percentile: float) -> float:
+        """Upper bound of the bucket the given percentile falls in. Infinite if it's in the last one."""
+        target = self.calls * percentile
+        seen = 0
+        for i in range(len(self.buckets)):
+            seen += self.buckets[i]
+            if seen >= target and seen > 0:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else float("inf")
+        return 0.0
+
+    def record(self, elapsed_ms: float, rows: int or None, error: bool) -> None:
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if error:
+            self.errors += 1
+        if rows is not None:
+            self.rows += rows
+        i = 0
+        while i < len(LATENCY_BUCKETS_MS) and elapsed_ms > LATENCY_BUCKETS_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+
+
+query_stats: dict[str, QueryStats] = {}
+
+
+def record(name: str, elapsed_ms: float, rows: int or None = None, error: bool = False) -> None:
+    if name not in query_stats:
+        query_stats[name] = QueryStats(name)
+    query_stats[name].record(elapsed_ms, rows, error)
+
+
+def get_stats() -> list[QueryStats]:
+    """All recorded stats, the ones that took the most DB time first."""
+    return sorted(query_stats.values(), key=lambda qs: qs.total_ms, reverse=True)
+
+
+def reset() -> None:
+    query_stats.clear()
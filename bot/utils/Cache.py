@@ -1,16 +1,177 @@
-from datetime import datetime
-from typing import Any
+import asyncio
+import functools
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+
+Loader = Callable[[], Awaitable[Any]]
 
 
 class Cache:
-    def __init__(self, value: Any, expire: datetime):
-        self._value = value
-        self._expire = expire
+    """
+    An in-memory cache for values that are slow to get.
+
+    - Entries expire after a TTL, and the least recently used ones are evicted
+      when there are more than max_size.
+    - Expired entries can still be served for stale_ttl more seconds while they
+      get reloaded in the background.
+    - Only one load per key runs at a time, everyone else asking for it waits for that one.
+    - A load returning None is cached for negative_ttl seconds, if set.
+
+    Every cache is kept in Cache.registry by name, so they can be inspected and flushed.
+    """
+    registry: dict[str, "Cache"] = {}
+
+    def __init__(self,
+                 name: str,
+                 ttl: float or None = None,
+                 max_size: int or None = None,
+                 stale_ttl: float = 0,
+                 negative_ttl: float or None = None):
+        """
+        :param name: Name to find it by in the registry.
+        :param ttl: Seconds an entry is fresh for. None to never expire.
+        :param max_size: Max entries kept. None for no limit.
+        :param stale_ttl: Seconds an expired entry can still be served while it's reloaded.
+        :param negative_ttl: Seconds a None result is cached for. None to not cache them.
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        # Key -> (value, fresh until, servable until), least recently used first
+        self._entries: OrderedDict[Hashable, tuple[Any, float, float]] = OrderedDict()
+        self._loading: dict[Hashable, asyncio.Task] = {}
+        # Bumped by every delete and clear. A load only stores its value if what it
+        # loads wasn't deleted or cleared since it started, so it can't bring it back.
+        self._generation = 0
+        self._cleared_at = 0
+        # Key being loaded -> generation it was deleted at
+        self._deleted_at: dict[Hashable, int] = {}
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "loads": 0, "load_errors": 0, "evictions": 0}
+        Cache.registry[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() < entry[1]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Gets a fresh entry, without loading it if it's missing."""
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() >= entry[1]:
+            self.stats["misses"] += 1
+            return default
+        self.stats["hits"] += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float or None = None) -> None:
+        """
+        :param ttl: Overrides the cache's TTL for this entry.
+        """
+        if value is None:
+            if self.negative_ttl is None:
+                self._entries.pop(key, None)
+                return
+            ttl = self.negative_ttl
+        elif ttl is None:
+            ttl = self.ttl
+
+        now = time.monotonic()
+        fresh_until = float("inf") if ttl is None else now + ttl
+        self._entries[key] = (value, fresh_until, fresh_until + self.stale_ttl)
+        self._entries.move_to_end(key)
+        while self.max_size is not None and len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def delete(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+        self._generation += 1
+        if key in self._loading:
+            self._deleted_at[key] = self._generation
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._generation += 1
+        self._cleared_at = self._generation
+
+    async def get_or_load(self, key: Hashable, loader: Loader) -> Any:
+        """Gets an entry, loading it if it's missing or expired.
+
+        :param key: The key of the entry.
+        :param loader: Returns the value, called only if it has to be loaded.
+        :return: The value.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            now = time.monotonic()
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self.stats["hits"] += 1
+                self._entries.move_to_end(key)
+                return value
+            if now < stale_until:
+                self.stats["stale_hits"] += 1
+                self._entries.move_to_end(key)
+                if key not in self._loading:
+                    self._start_load(key, loader).add_done_callback(self._log_background_error)
+                return value
+            del self._entries[key]
+
+        self.stats["misses"] += 1
+        # Shielded so one caller giving up doesn't cancel the load for everyone else
+        return await asyncio.shield(self._start_load(key, loader))
+
+    def _start_load(self, key: Hashable, loader: Loader) -> asyncio.Task:
+        if key not in self._loading:
+            self._loading[key] = asyncio.create_task(self._load(key, loader))
+        return self._loading[key]
+
+    async def _load(self, key: Hashable, loader: Loader) -> Any:
+        self.stats["loads"] += 1
+        started_at = self._generation
+        try:
+            value = await loader()
+        except Exception:
+            self.stats["load_errors"] += 1
+            raise
+        finally:
+            del self._loading[key]
+            deleted_at = self._deleted_at.pop(key, 0)
+        if max(self._cleared_at, deleted_at) <= started_at:
+            self.set(key, value)
+        return value
+
+    @staticmethod
+    def _log_background_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            traceback.print_exception(task.exception())
+
+    @staticmethod
+    def flush_all() -> None:
+        for cache in Cache.registry.values():
+            cache.clear()
+
+
+def cached(cache: Cache, key: Callable[..., Hashable] or None = None):
+    """Caches the results of an async function.
 
-    @property
-    def value(self) -> Any:
-        return self._value
+    :param cache: The cache to keep them in.
+    :param key: Makes the key from the function's arguments. Defaults to all of them.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def inner(*args, **kwargs):
+            cache_key = key(*args, **kwargs) if key is not None else (args, tuple(sorted(kwargs.items())))
+            return await cache.get_or_load(cache_key, lambda: func(*args, **kwargs))
+        inner.cache = cache
+        return inner
+    return decorator
 
-    @property
-    def valid(self) -> bool:
-        return self._expire >= datetime.now()
@@ -0,0 +1,116 @@
+import asyncio
+import time
+import asyncpg
+import config
+
+
+class LeaderElection:
+    """
+    Makes sure background jobs run in only one of the bot's processes at a time, even
+    when several instances are up (e.g. during a deploy).
+
+    Every job declares a key. The process holding the key's Postgres advisory lock is the
+    leader for that job. Locks live on a dedicated connection, which is checked every few
+    seconds; Postgres closes it when it's idle for longer than the lease, releasing its
+    locks, so if a process dies or hangs another one takes over within a lease.
+
+    Each time leadership is acquired it gets a new token, identifying that term. Tokens are
+    only meaningful within this process: jobs that take a while can check they're still in the
+    same term before doing their writes, and notice when a new term starts to pick up whatever
+    the last leader left in the database. They don't fence off writes from other processes.
+    """
+    LOCK_NAMESPACE = 1928  # First half of every lock's key, so they don't clash with other locks
+
+    def __init__(self, lease: int = 30, renew_every: int = 5):
+        """
+        :param lease: Seconds leadership lasts without being renewed.
+        :param renew_every: Seconds between renewals. Also how often followers try to take over.
+        """
+        self.lease = lease
+        self.renew_every = renew_every
+        self._conn: asyncpg.Connection or None = None
+        self._keys: set[str] = set()
+        self._held: dict[str, int] = {}
+        self._counter = 0
+        self._last_renewal: float or None = None
+        self._failing = False
+        self._task: asyncio.Task or None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._drop()
+
+    def declare(self, key: str) -> None:
+        """Makes this process a candidate to lead a job."""
+        self._keys.add(key)
+
+    @property
+    def keys(self) -> list[str]:
+        return sorted(self._keys)
+
+    def is_leader(self, key: str) -> bool:
+        return key in self._held and self._lease_valid()
+
+    def token(self, key: str) -> int or None:
+        """The token of the current leadership term for a job, or None if not the leader."""
+        return self._held[key] if self.is_leader(key) else None
+
+    def holds(self, key: str, token: int or None) -> bool:
+        """Whether leadership for a job is still the one the token was taken from."""
+        return token is not None and self.token(key) == token
+
+    def _lease_valid(self) -> bool:
+        return self._last_renewal is not None and time.monotonic() - self._last_renewal < self.lease
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._renew()
+                self._failing = False
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as exc:
+                if not self._failing:
+                    print(f"Leader election failed, giving up leadership: {exc}")
+                self._failing = True
+                await self._drop()
+            await asyncio.sleep(self.renew_every)
+
+    async def _renew(self) -> None:
+        if self._conn is None or self._conn.is_closed():
+            self._held.clear()
+            self._conn = await asyncpg.connect(
+                user=config.DB_USER, password=config.DB_PSWD,
+                database=config.DB_NAME, host=config.DB_HOST,
+                timeout=self.renew_every,
+            )
+            try:
+                # Only on PostgreSQL 14+. Without it a hung process keeps its locks until it's killed.
+                await self._conn.execute(f"SET idle_session_timeout = {int(self.lease*1000)}")
+            except asyncpg.PostgresError:
+                pass
+
+        await self._conn.fetchval("SELECT 1", timeout=self.renew_every)
+        self._last_renewal = time.monotonic()
+        for key in self._keys - self._held.keys():
+            acquired = await self._conn.fetchval(
+                "SELECT pg_try_advisory_lock($1, hashtext($2))",
+                LeaderElection.LOCK_NAMESPACE, key,
+                timeout=self.renew_every,
+            )
+            if acquired:
+                self._counter += 1
+                self._held[key] = self._counter
+                print(f"Became the leader for {key}")
+
+    async def _drop(self) -> None:
+        self._held.clear()
+        self._last_renewal = None
+        if self._conn is not None:
+            # Closing the session releases all of its locks
+            self._conn.terminate()
+            self._conn = None
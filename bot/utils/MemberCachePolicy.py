@@ -0,0 +1,93 @@
+import asyncio
+import discord
+import config
+import bot.db.queries.planner
+
+
+class MemberCachePolicy:
+    """
+    Decides which guilds have their members cached.
+
+    With the "all" policy every member of every guild is cached, which is discord.py's
+    default. With the "features" policy only guilds with an active planner (plus the ones
+    in config.MEMBER_CACHE_GUILDS and the ones cogs ask for with always_cache) are: their
+    members are requested the first time they're needed, and dropped once the guild has
+    no active planner anymore.
+
+    discord.py can't cache some guilds' members and not others', so members are
+    added and removed from its cache by hand here.
+    """
+    ALL = "all"
+    FEATURES = "features"
+
+    def __init__(self, client: discord.Client):
+        self.client = client
+        self.policy = getattr(config, "MEMBER_CACHE_POLICY", MemberCachePolicy.ALL)
+        self.always_cached = set(getattr(config, "MEMBER_CACHE_GUILDS", []))
+        self.cached_guilds: set[int] = set()
+        self._chunk_locks: dict[int, asyncio.Lock] = {}
+
+    @property
+    def member_cache_flags(self) -> discord.MemberCacheFlags or None:
+        """The flags to start the client with. None means discord.py's default."""
+        if self.policy == MemberCachePolicy.ALL:
+            return None
+        # Nothing gets cached on its own, only what's chunked or added in on_member_join
+        return discord.MemberCacheFlags.none()
+
+    @property
+    def chunk_guilds_at_startup(self) -> bool:
+        return self.policy == MemberCachePolicy.ALL
+
+    async def require(self, guild: discord.Guild) -> None:
+        """Makes sure a guild's members are cached, requesting them if they aren't."""
+        if self.policy == MemberCachePolicy.ALL:
+            return
+        self.cached_guilds.add(guild.id)
+        if guild.chunked:
+            return
+        if guild.id not in self._chunk_locks:
+            self._chunk_locks[guild.id] = asyncio.Lock()
+        async with self._chunk_locks[guild.id]:
+            if not guild.chunked:
+                await guild.chunk(cache=True)
+
+    async def always_cache(self, guild_id: int) -> None:
+        """Keeps a guild's members cached, whether it has a planner or not."""
+        self.always_cached.add(guild_id)
+        # Before the client is ready, refresh takes care of it once it is
+        guild = self.client.get_guild(guild_id)
+        if guild is not None:
+            await self.require(guild)
+
+    def evict(self, guild: discord.Guild) -> None:
+        """Drops a guild's members from the cache, except for the bot's own."""
+        self.cached_guilds.discard(guild.id)
+        for member in list(guild.members):
+            if member.id != self.client.user.id:
+                guild._remove_member(member)
+
+    async def refresh(self) -> None:
+        """Caches the members of every guild with an active planner, and evicts the
+        ones of the guilds that don't have one anymore.
+        """
+        if self.policy == MemberCachePolicy.ALL:
+            return
+        feature_guilds = set(self.always_cached)
+        for planner in await bot.db.queries.planner.get_planners(only_active=True):
+            channel = self.client.get_channel(planner.planner_channel)
+            if channel is not None:
+                feature_guilds.add(channel.guild.id)
+
+        for guild_id in self.cached_guilds - feature_guilds:
+            guild = self.client.get_guild(guild_id)
+            if guild is not None:
+                self.evict(guild)
+        for guild_id in feature_guilds - self.cached_guilds:
+            guild = self.client.get_guild(guild_id)
+            if guild is not None:
+                await self.require(guild)
+
+    async def on_member_join(self, member: discord.Member) -> None:
+        if self.policy != MemberCachePolicy.ALL and member.guild.id in self.cached_guilds:
+            member.guild._add_member(member)
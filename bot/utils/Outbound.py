@@ -0,0 +1,171 @@
+import asyncio
+import time
+import traceback
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Hashable
+
+
+Request = Callable[[], Awaitable[Any]]
+
+
+class Outbound:
+    """
+    Queues requests that write to Discord, so the important ones go first when lots
+    of them are due at the same time.
+
+    - Requests of a higher priority class always go before lower ones.
+    - Within a class, guilds take turns, so one guild with lots of channels can't
+      hold up the others.
+    - Each route (usually a channel) is allowed a few requests every few seconds, like
+      Discord's own limits. Requests for a route that is used up wait in the queue
+      without blocking the others, instead of being sent and getting a 429.
+    """
+    PING = 0
+    INTERACTION = 1
+    PLANNER = 2
+    LEADERBOARD = 3
+    MAINTENANCE = 4  # Role sweeps and cleanups nobody is waiting for
+    PRIORITY_NAMES = ["ping", "interaction", "planner", "leaderboard", "maintenance"]
+
+    ROUTE_LIMIT = 5  # Requests allowed per route...
+    ROUTE_WINDOW = 5  # ...every this many seconds
+
+    def __init__(self, max_concurrent: int = 8):
+        self.max_concurrent = max_concurrent
+        # One queue per priority: guild ID -> requests for that guild, in arrival order
+        self._queues: list[OrderedDict[int or None, deque[dict]]] = [OrderedDict() for _ in Outbound.PRIORITY_NAMES]
+        self._route_usage: dict[Hashable, deque[float]] = {}
+        self._workers: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        #: Priority name -> requests sent, total & max seconds spent in the queue,
+        #: and requests held back by a used up route.
+        self.stats: dict[str, dict[str, float]] = {
+            name: {"sent": 0, "total_wait": 0.0, "max_wait": 0.0, "deferred": 0}
+            for name in Outbound.PRIORITY_NAMES
+        }
+
+    @property
+    def pending(self) -> int:
+        return sum(len(requests) for queue in self._queues for requests in queue.values())
+
+    def start(self) -> None:
+        for _ in range(self.max_concurrent - len(self._workers)):
+            self._workers.append(asyncio.create_task(self._work()))
+
+    def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    async def run(self,
+                  request: Request,
+                  priority: int,
+                  route: Hashable = None,
+                  guild_id: int or None = None) -> Any:
+        """Queues a request and waits for it to be sent.
+
+        :param request: Makes the request, e.g. functools.partial(channel.send, content="hi").
+        :param priority: One of the priority classes.
+        :param route: What the request counts against for rate limits, usually a channel ID.
+        :param guild_id: The guild the request is for, so guilds can take turns.
+        :return: Whatever the request returns.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        job = {
+            "request": request,
+            "priority": priority,
+            "route": route,
+            "queued_at": time.monotonic(),
+            "deferred": False,
+            "future": future,
+        }
+        queue = self._queues[priority]
+        if guild_id not in queue:
+            queue[guild_id] = deque()
+        queue[guild_id].append(job)
+        self._wakeup.set()
+        return await future
+
+    def _route_free_in(self, route: Hashable, now: float) -> float:
+        """How many seconds until the route can be used again. 0 if it can right now."""
+        if route is None or route not in self._route_usage:
+            return 0
+        usage = self._route_usage[route]
+        while len(usage) > 0 and usage[0] <= now - Outbound.ROUTE_WINDOW:
+            usage.popleft()
+        if len(usage) == 0:
+            del self._route_usage[route]
+            return 0
+        if len(usage) < Outbound.ROUTE_LIMIT:
+            return 0
+        return usage[0] + Outbound.ROUTE_WINDOW - now
+
+    def _pop(self) -> tuple[dict or None, float or None]:
+        """Gets the next request to send.
+
+        :return: The request, or None and how long until a held back one can go.
+        """
+        now = time.monotonic()
+        retry_in = None
+        for queue in self._queues:
+            for guild_id in list(queue.keys()):
+                requests = queue[guild_id]
+                job = requests[0]
+                if job["future"].done():
+                    # Whoever queued it stopped waiting
+                    requests.popleft()
+                    if len(requests) == 0:
+                        del queue[guild_id]
+                    continue
+
+                free_in = self._route_free_in(job["route"], now)
+                if free_in > 0:
+                    if not job["deferred"]:
+                        job["deferred"] = True
+                        self.stats[Outbound.PRIORITY_NAMES[job["priority"]]]["deferred"] += 1
+                    retry_in = free_in if retry_in is None else min(retry_in, free_in)
+                    continue
+
+                requests.popleft()
+                if len(requests) == 0:
+                    del queue[guild_id]
+                else:
+                    queue.move_to_end(guild_id)
+                if job["route"] is not None:
+                    self._route_usage.setdefault(job["route"], deque()).append(now)
+                return job, None
+        return None, retry_in
+
+    async def _work(self) -> None:
+        while True:
+            self._wakeup.clear()
+            job, retry_in = self._pop()
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=retry_in)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            # There might be more for the other workers
+            self._wakeup.set()
+            await self._send(job)
+
+    async def _send(self, job: dict) -> None:
+        stats = self.stats[Outbound.PRIORITY_NAMES[job["priority"]]]
+        wait = time.monotonic() - job["queued_at"]
+        stats["sent"] += 1
+        stats["total_wait"] += wait
+        stats["max_wait"] = max(stats["max_wait"], wait)
+
+        future = job["future"]
+        try:
+            result = await job["request"]()
+        except Exception as exc:
+            if not future.done():
+                future.set_exception(exc)
+            else:
+                traceback.print_exc()
+            return
+        if not future.done():
+            future.set_result(result)
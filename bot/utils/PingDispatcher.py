@@ -0,0 +1,104 @@
+import asyncio
+import functools
+import heapq
+import traceback
+import discord
+from datetime import datetime
+from bot.utils.Resolver import Resolver, MissingCallback
+from bot.utils.Outbound import Outbound
+
+
+class PingDispatcher:
+    """
+    Sends messages in the background, a few at a time, the ones with the earliest
+    deadline first. Used for pings that must arrive on time even when lots of them
+    are due together.
+
+    Records how late each message was compared to the moment it was due.
+    """
+    def __init__(self, resolver: Resolver, outbound: Outbound, max_concurrent: int = 5):
+        self.resolver = resolver
+        self.outbound = outbound
+        self.max_concurrent = max_concurrent
+        self._queue: list[tuple[float, int, dict]] = []
+        self._counter = 0
+        self._workers: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        #: Kind of message -> sent & failed counts, total & max seconds late
+        self.latency: dict[str, dict[str, float]] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def start(self) -> None:
+        for _ in range(self.max_concurrent - len(self._workers)):
+            self._workers.append(asyncio.create_task(self._work()))
+
+    def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    def send(self,
+             channel_id: int,
+             content: str,
+             due_at: datetime,
+             kind: str = "message",
+             deadline: datetime or None = None,
+             on_channel_missing: MissingCallback or None = None) -> None:
+        """Queues a message.
+
+        :param channel_id: The ID of the channel to send it in.
+        :param content: The message.
+        :param due_at: When the message should have been sent. Its latency is measured from this.
+        :param kind: What kind of message it is, to group latency stats.
+        :param deadline: Messages with earlier deadlines are sent first. Defaults to due_at.
+        :param on_channel_missing: Called with the IDs of channels that don't exist or can't be seen.
+        """
+        if deadline is None:
+            deadline = due_at
+        self._counter += 1
+        heapq.heappush(self._queue, (deadline.timestamp(), self._counter, {
+            "channel_id": channel_id,
+            "content": content,
+            "due_at": due_at,
+            "kind": kind,
+            "on_channel_missing": on_channel_missing,
+        }))
+        self._wakeup.set()
+
+    async def _work(self) -> None:
+        while True:
+            if len(self._queue) == 0:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            _deadline, _c, message = heapq.heappop(self._queue)
+            try:
+                await self._send(message)
+            except Exception:
+                traceback.print_exc()
+
+    async def _send(self, message: dict) -> None:
+        stats = self.latency.setdefault(message["kind"], {"sent": 0, "failed": 0, "total_late": 0.0, "max_late": 0.0})
+        channel = await self.resolver.channel(message["channel_id"], on_missing=message["on_channel_missing"])
+        if channel is None:
+            stats["failed"] += 1
+            return
+
+        try:
+            await self.outbound.run(
+                functools.partial(channel.send, content=message["content"]),
+                Outbound.PING,
+                route=channel.id,
+                guild_id=channel.guild.id,
+            )
+        except discord.HTTPException:
+            stats["failed"] += 1
+            raise
+
+        late = (datetime.now() - message["due_at"]).total_seconds()
+        stats["sent"] += 1
+        stats["total_late"] += late
+        stats["max_late"] = max(stats["max_late"], late)
@@ -0,0 +1,54 @@
+import asyncio
+import contextlib
+import heapq
+
+
+class PrioritySemaphore:
+    """
+    A semaphore where waiters with a lower priority number get the next free slot
+    first. Waiters with the same priority are served in arrival order.
+    """
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, priority: int = 0) -> None:
+        if self._value > 0 and len(self._waiters) == 0:
+            self._value -= 1
+            return
+
+        self._counter += 1
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, self._counter, future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Got the slot right as it was cancelled, pass it on
+                self.release()
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def release(self) -> None:
+        while len(self._waiters) > 0:
+            _p, _c, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: int = 0):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,92 @@
+from typing import Any
+
+
+class RaceRounds:
+    """
+    Race round data, indexed for range queries.
+
+    Sparse tables answer "what's the longest round between these two" and "which round
+    ends last when they're all sent at once" in O(1), prefix sums give how long a range of
+    rounds lasts when played normally, and the chain of checkpoints /longestround shows
+    is computed for every possible last round upfront.
+    """
+    SEND_DELAY = 0.2  # Seconds between rounds when fullsending
+
+    def __init__(self, rounds: list[dict[str, Any]]):
+        """
+        :param rounds: Data of every round, from round 1 onwards, as in rounds-race.json.
+        """
+        self.rounds = rounds
+        self._lengths = [rnd["length"] for rnd in rounds]
+        # When each round would end if round 1 was sent at 0s and every round after it right away.
+        # Sending from a later round shifts them all by the same amount, so the max doesn't move.
+        self._fullsend_ends = [rnd["length"] + i*RaceRounds.SEND_DELAY for i, rnd in enumerate(rounds)]
+        self._sparse = RaceRounds._build_sparse(self._lengths)
+        self._fullsend_sparse = RaceRounds._build_sparse(self._fullsend_ends)
+        # _prefix[n] is how long the first n rounds last in total
+        self._prefix = [0.0]
+        for length in self._lengths:
+            self._prefix.append(self._prefix[-1] + length)
+        # _log2[n] is the floor of log2(n)
+        self._log2 = [0, 0]
+        for n in range(2, len(rounds)+1):
+            self._log2.append(self._log2[n//2] + 1)
+
+        self._checkpoints = [[]] + [self._build_checkpoints(last) for last in range(1, len(rounds)+1)]
+
+    @property
+    def last_round(self) -> int:
+        return len(self.rounds)
+
+    @staticmethod
+    def _build_sparse(values: list[float]) -> list[list[int]]:
+        """sparse[k][i] is the index of the max value in values[i:i+2**k] (the later one on ties)."""
+        sparse = [list(range(len(values)))]
+        k = 1
+        while 2**k <= len(values):
+            prev = sparse[k-1]
+            half = 2**(k-1)
+            sparse.append([
+                prev[i+half] if values[prev[i+half]] >= values[prev[i]] else prev[i]
+                for i in range(len(values) - 2**k + 1)
+            ])
+            k += 1
+        return sparse
+
+    def _range_max(self, sparse: list[list[int]], values: list[float], first_round: int, last_round: int) -> int:
+        """The index of the max value between two rounds, both included."""
+        start, end = first_round-1, last_round
+        k = self._log2[end-start]
+        i, j = sparse[k][start], sparse[k][end - 2**k]
+        return j if values[j] >= values[i] else i
+
+    def longest(self, first_round: int, last_round: int) -> dict[str, Any]:
+        """The longest round between two rounds, both included.
+        If more than one is the longest, it's the latest of them.
+        """
+        return self.rounds[self._range_max(self._sparse, self._lengths, first_round, last_round)]
+
+    def last_to_end(self, first_round: int, last_round: int) -> tuple[dict[str, Any], float]:
+        """Which round ends last when fullsending from one round to another, and when.
+
+        :return: The round, and how many seconds after sending the first one it ends.
+        """
+        i = self._range_max(self._fullsend_sparse, self._fullsend_ends, first_round, last_round)
+        return self.rounds[i], self._fullsend_ends[i] - (first_round-1)*RaceRounds.SEND_DELAY
+
+    def duration(self, first_round: int, last_round: int) -> float:
+        """How long the rounds between two rounds (both included) last, played one after the other."""
+        return self._prefix[last_round] - self._prefix[first_round-1]
+
+    def _build_checkpoints(self, last_round: int) -> list[dict[str, Any]]:
+        checkpoints = []
+        first_round = 1
+        while first_round <= last_round:
+            longest = self.longest(first_round, last_round)
+            checkpoints.append(longest)
+            first_round = longest["round"] + 1
+        return checkpoints
+
+    def checkpoints(self, last_round: int) -> list[dict[str, Any]]:
+        """The longest round of a race, then the longest one after it, and so on until the last round."""
+        return self._checkpoints[last_round]
@@ -0,0 +1,178 @@
+import asyncio
+import traceback
+import discord
+from typing import Any, Awaitable, Callable, Hashable
+from bot.utils.Cache import Cache
+
+
+MissingCallback = Callable[[list[int]], Awaitable[None]]
+# Cached for what exists (or might) but the bot can't get, so it isn't cleaned up as missing
+UNAVAILABLE = object()
+
+
+class Resolver:
+    """
+    Looks up channels, guilds, roles and members, falling back to the API when they're not in
+    discord.py's cache. What the API returned is cached for a while, and so is the fact
+    that something doesn't exist or can't be seen, so dead IDs don't cost an HTTP request
+    on every loop. Concurrent lookups of the same ID share a single request.
+
+    Callers can pass a cleanup callback, which gets called once with all the IDs found
+    missing in the last few seconds instead of once per ID. Only what the API says doesn't
+    exist is missing: what the bot isn't allowed to see returns None without a cleanup.
+    """
+    FOUND_TTL = 10*60  # Seconds
+    MISSING_TTL = 30*60
+    MAX_SIZE = 10_000  # Entries kept, the least recently used ones are dropped first
+    CLEANUP_DELAY = 2  # Seconds missing IDs are batched for before calling the cleanup callbacks
+    MEMBER_QUERY_SIZE = 100  # Most user IDs the gateway accepts in a single member request
+
+    def __init__(self, client: discord.Client):
+        self.client = client
+        # What the API returned, None for what doesn't exist, UNAVAILABLE for what can't be seen
+        self.cache = Cache("resolver", ttl=Resolver.FOUND_TTL, max_size=Resolver.MAX_SIZE,
+                           negative_ttl=Resolver.MISSING_TTL)
+        self._cleanups: dict[MissingCallback, list[int]] = {}
+        # Kept so they aren't garbage collected while running
+        self._cleanup_tasks: set[asyncio.Task] = set()
+
+    async def channel(self,
+                      channel_id: int,
+                      on_missing: MissingCallback or None = None) -> discord.abc.GuildChannel or discord.Thread or None:
+        """Gets a channel or thread.
+
+        :param channel_id: The ID of the channel.
+        :param on_missing: Called with the IDs of missing channels, if this one is.
+        :return: The channel, or None if it doesn't exist or the bot can't see it.
+        """
+        channel = self.client.get_channel(channel_id)
+        if channel is not None:
+            return channel
+        return await self._resolve(("channel", channel_id), lambda: self.client.fetch_channel(channel_id),
+                                   channel_id, on_missing)
+
+    async def guild(self, guild_id: int, on_missing: MissingCallback or None = None) -> discord.Guild or None:
+        """Gets a guild.
+
+        :param guild_id: The ID of the guild.
+        :param on_missing: Called with the IDs of missing guilds, if this one is.
+        :return: The guild, or None if it doesn't exist or the bot isn't in it.
+        """
+        guild = self.client.get_guild(guild_id)
+        if guild is not None:
+            return guild
+        return await self._resolve(("guild", guild_id), lambda: self.client.fetch_guild(guild_id),
+                                   guild_id, on_missing)
+
+    async def role(self,
+                   guild: discord.Guild,
+                   role_id: int,
+                   on_missing: MissingCallback or None = None) -> discord.Role or None:
+        """Gets a role in a guild.
+
+        :param guild: The guild the role is in.
+        :param role_id: The ID of the role.
+        :param on_missing: Called with the IDs of missing roles, if this one is.
+        :return: The role, or None if it doesn't exist or the bot can't see it.
+        """
+        role = guild.get_role(role_id)
+        if role is not None:
+            return role
+
+        async def fetch_role() -> discord.Role or None:
+            # All of a guild's roles come in one request, so every role lookup in it shares it
+            roles = await self._lookup(("roles", guild.id), guild.fetch_roles)
+            if roles is None or roles is UNAVAILABLE:
+                return roles
+            return discord.utils.get(roles, id=role_id)
+
+        return await self._resolve(("role", role_id), fetch_role, role_id, on_missing)
+
+    async def members(self, guild: discord.Guild, user_ids: list[int]) -> dict[int, discord.Member or None]:
+        """Gets many members of a guild at once. The ones that aren't cached are requested
+        through the gateway in batches, instead of with one HTTP request each.
+
+        :param guild: The guild they're in.
+        :param user_ids: The IDs of the users.
+        :return: Each user's member, or None if they're not in the guild.
+        """
+        members = {}
+        to_query = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id)
+            key = ("member", guild.id, user_id)
+            if member is not None:
+                members[user_id] = member
+            elif key in self.cache:
+                members[user_id] = self.cache.get(key)
+            else:
+                to_query.append(user_id)
+
+        for i in range(0, len(to_query), Resolver.MEMBER_QUERY_SIZE):
+            batch = to_query[i:i+Resolver.MEMBER_QUERY_SIZE]
+            try:
+                found = await guild.query_members(user_ids=batch, limit=len(batch), cache=False)
+            except asyncio.TimeoutError:
+                # Not cached either way, they'll be asked again next time
+                for user_id in batch:
+                    members[user_id] = None
+                continue
+            found_by_id = {member.id: member for member in found}
+            for user_id in batch:
+                members[user_id] = found_by_id.get(user_id)
+                self.cache.set(("member", guild.id, user_id), members[user_id])
+        return members
+
+    def forget(self, object_id: int) -> None:
+        """Forgets everything cached about an ID, e.g. after it has been configured again."""
+        for kind in ("channel", "guild", "role", "roles"):
+            self.cache.delete((kind, object_id))
+
+    async def _resolve(self,
+                       key: Hashable,
+                       fetch: Callable[[], Awaitable[Any]],
+                       object_id: int,
+                       on_missing: MissingCallback or None) -> Any:
+        # Known to be missing, it was already cleaned up when it was fetched
+        if key in self.cache:
+            value = self.cache.get(key)
+            return value if value is not UNAVAILABLE else None
+
+        value = await self._lookup(key, fetch)
+        if value is UNAVAILABLE:
+            return None
+        if value is None and on_missing is not None:
+            self._cleanup_later(on_missing, object_id)
+        return value
+
+    async def _lookup(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        async def load() -> Any:
+            try:
+                return await fetch()
+            except discord.NotFound:
+                return None
+            except discord.Forbidden:
+                return UNAVAILABLE
+            except discord.InvalidData:
+                traceback.print_exc()
+                return UNAVAILABLE
+
+        return await self.cache.get_or_load(key, load)
+
+    def _cleanup_later(self, callback: MissingCallback, object_id: int) -> None:
+        if callback in self._cleanups:
+            if object_id not in self._cleanups[callback]:
+                self._cleanups[callback].append(object_id)
+            return
+        self._cleanups[callback] = [object_id]
+        task = asyncio.create_task(self._cleanup_soon(callback))
+        self._cleanup_tasks.add(task)
+        task.add_done_callback(self._cleanup_tasks.discard)
+
+    async def _cleanup_soon(self, callback: MissingCallback) -> None:
+        await asyncio.sleep(Resolver.CLEANUP_DELAY)
+        object_ids = self._cleanups.pop(callback)
+        try:
+            await callback(object_ids)
+        except Exception:
+            traceback.print_exc()
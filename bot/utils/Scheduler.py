@@ -0,0 +1,214 @@
+import asyncio
+import heapq
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Callable, Awaitable, Hashable
+from bot.utils.StateStore import StateStore
+
+
+JobCallback = Callable[[Hashable, Any], Awaitable[None]]
+
+
+class Scheduler:
+    """
+    Runs callbacks at given deadlines. Jobs are identified by a (name, key) pair: the name
+    selects which callback runs, the key tells apart jobs with the same callback (e.g. a
+    planner's channel ID). Scheduling a job that already exists moves its deadline.
+
+    A single task sleeps until the earliest deadline instead of every cog polling on its own.
+    Durable jobs are saved in the state store and survive restarts, so their
+    keys and payloads must be serializable by it.
+    """
+    def __init__(self, state: StateStore, state_name: str = "scheduler"):
+        self.state = state
+        self.state_name = state_name
+        self._heap: list[tuple[float, int, tuple[str, Hashable]]] = []
+        self._jobs: dict[tuple[str, Hashable], dict[str, Any]] = {}
+        self._handlers: dict[str, JobCallback] = {}
+        self._parked: dict[str, list[tuple[str, Hashable]]] = {}
+        self._counter = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task or None = None
+        # Kept so they aren't garbage collected while running
+        self._running: set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def register(self, name: str, callback: JobCallback) -> None:
+        """Sets the callback for all jobs with a certain name. Jobs that came due
+        while no callback was registered (e.g. restored before their cog loaded) run right away.
+        """
+        self._handlers[name] = callback
+        for job_id in self._parked.pop(name, []):
+            if job_id in self._jobs:
+                self._push(job_id, self._jobs[job_id])
+        self._wakeup.set()
+
+    def unregister(self, name: str) -> None:
+        """Removes a callback. Its jobs are kept and will run once it's registered again."""
+        if name in self._handlers:
+            del self._handlers[name]
+
+    def schedule(self,
+                 name: str,
+                 key: Hashable,
+                 due_at: datetime,
+                 payload: Any = None,
+                 every: timedelta or None = None,
+                 durable: bool = False) -> None:
+        """Schedules a job, or moves it if it already exists.
+
+        :param name: The name of the callback to run.
+        :param key: Identifies the job among the ones with the same name.
+        :param due_at: When to run the job.
+        :param payload: Passed to the callback.
+        :param every: If set, the job will be rescheduled this much later every time it runs.
+        :param durable: If True, the job is saved to disk and restored on restart.
+        """
+        job = {
+            "due_at": due_at,
+            "payload": payload,
+            "every": every,
+            "durable": durable,
+        }
+        self._jobs[(name, key)] = job
+        self._push((name, key), job)
+        self._wakeup.set()
+        if durable:
+            self.save_state()
+
+    def cancel(self, name: str, key: Hashable) -> bool:
+        """Removes a job. The heap entry is discarded lazily once it comes due.
+
+        :return: True if a job was removed.
+        """
+        job = self._jobs.pop((name, key), None)
+        if job is None:
+            return False
+        if job["durable"]:
+            self.save_state()
+        return True
+
+    def cancel_all(self, name: str) -> None:
+        for job_id in [jid for jid in self._jobs if jid[0] == name]:
+            self.cancel(*job_id)
+
+    def get(self, name: str, key: Hashable) -> datetime or None:
+        """Returns when a job is due, or None if it's not scheduled."""
+        job = self._jobs.get((name, key))
+        return job["due_at"] if job else None
+
+    def keys(self, name: str) -> list[Hashable]:
+        return [key for jname, key in self._jobs if jname == name]
+
+    def _push(self, job_id: tuple[str, Hashable], job: dict[str, Any]) -> None:
+        """Adds a heap entry for the job. Any older entry for it becomes stale."""
+        self._counter += 1
+        job["seq"] = self._counter
+        heapq.heappush(self._heap, (job["due_at"].timestamp(), self._counter, job_id))
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            timeout = None
+            while len(self._heap) > 0:
+                due_ts, seq, job_id = self._heap[0]
+                job = self._jobs.get(job_id)
+                if job is None or job["seq"] != seq:
+                    heapq.heappop(self._heap)
+                    continue
+                name, key = job_id
+                if name not in self._handlers:
+                    # Parked until the callback is registered
+                    heapq.heappop(self._heap)
+                    self._parked.setdefault(name, []).append(job_id)
+                    continue
+
+                timeout = due_ts - datetime.now().timestamp()
+                if timeout > 0:
+                    break
+                heapq.heappop(self._heap)
+                self._fire(job_id, job)
+                timeout = None
+
+            if self._wakeup.is_set():
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _fire(self, job_id: tuple[str, Hashable], job: dict[str, Any]) -> None:
+        name, key = job_id
+        callback = self._handlers[name]
+        if job["every"] is None:
+            del self._jobs[job_id]
+        else:
+            now = datetime.now()
+            next_due = job["due_at"]
+            while next_due <= now:
+                next_due += job["every"]
+            job["due_at"] = next_due
+            self._push(job_id, job)
+        if job["durable"]:
+            self.save_state()
+        self._spawn(self._call(callback, key, job["payload"]))
+
+    @staticmethod
+    async def _call(callback: JobCallback, key: Hashable, payload: Any) -> None:
+        try:
+            await callback(key, payload)
+        except Exception:
+            traceback.print_exc()
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.create_task(coro)
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def load_state(self) -> None:
+        state = await self.state.get(self.state_name)
+        if state is None:
+            return
+
+        data = state["data"]
+        for job in data.get("jobs", []):
+            key, due_at, every = job["key"], job["due_at"], job["every"]
+            # Jobs saved in the old JSON state files have lists and numbers instead
+            if isinstance(key, list):
+                key = tuple(key)
+            if not isinstance(due_at, datetime):
+                due_at = datetime.fromtimestamp(due_at)
+            if every is not None and not isinstance(every, timedelta):
+                every = timedelta(seconds=every)
+            # Not through schedule(), there's nothing new to save
+            job_id = (job["name"], key)
+            self._jobs[job_id] = {"due_at": due_at, "payload": job["payload"], "every": every, "durable": True}
+            self._push(job_id, self._jobs[job_id])
+        self._wakeup.set()
+
+    def save_state(self) -> None:
+        """Saves durable jobs. The store writes them shortly after, together with any other change,
+        and they're only serialized then, however many of them changed in the meantime."""
+        self.state.set_later(self.state_name, self._state_data)
+
+    def _state_data(self) -> dict[str, Any]:
+        return {
+            "jobs": [
+                {
+                    "name": name,
+                    "key": key,
+                    "due_at": job["due_at"],
+                    "payload": job["payload"],
+                    "every": job["every"],
+                }
+                for (name, key), job in self._jobs.items() if job["durable"]
+            ],
+        }
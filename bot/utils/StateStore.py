@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+
+class StateStore:
+    """
+    Keeps the state cogs want to survive restarts, in a single SQLite database in WAL mode.
+
+    Each cog saves under its own name. Saving only updates the value in memory, and
+    changes are written a moment later all together in a single transaction, so a save
+    is cheap and a crash can never leave half-written state behind.
+
+    Several processes can use the same database, and a name means the same state in all
+    of them, with the last write winning. State only one process needs goes under a name
+    of its own (like each scheduler's "scheduler-<first shard>"), and state shared between
+    them must only be written by one process at a time: the elected leader of the job
+    it belongs to, or the process that runs the guild it's about.
+
+    Values are JSON, plus datetimes, timedeltas, tuples and sets, which come back as
+    what they were saved as.
+    """
+    FLUSH_DELAY = 1  # Seconds changes are held for before being written
+    LEGACY_STATE_PATH = "bot/files/cache/state-{}.json"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pending: dict[str, tuple[float, str]] = {}
+        # Changed states whose data is only made when they're written, see set_later
+        self._dirty: dict[str, Callable[[], Any]] = {}
+        # Changes being written right now
+        self._flushing: dict[str, tuple[float, str]] = {}
+        self._flush_task: asyncio.Task or None = None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS state (
+                    name TEXT PRIMARY KEY,
+                    saved_at REAL NOT NULL,
+                    data TEXT NOT NULL
+                )
+            """)
+            self._db.commit()
+
+    async def get(self, name: str) -> dict[str, Any] or None:
+        """Gets a saved state.
+
+        :param name: The name it was saved under.
+        :return: A dict with "saved_at" (a timestamp) and "data", or None if it was never saved.
+        """
+        if name in self._dirty:
+            self._collect_dirty()
+        if name in self._pending:
+            saved_at, data = self._pending[name]
+        elif name in self._flushing:
+            saved_at, data = self._flushing[name]
+        else:
+            row = await asyncio.to_thread(self._read, name)
+            if row is None:
+                return await asyncio.to_thread(self._migrate_legacy, name)
+            saved_at, data = row
+        return {"saved_at": saved_at, "data": json.loads(data, object_hook=StateStore._decode)}
+
+    def set(self, name: str, data: Any) -> None:
+        """Saves a state. It's written to disk shortly after."""
+        self._dirty.pop(name, None)
+        self._pending[name] = (time.time(), json.dumps(StateStore._encode(data)))
+        self._flush_soon()
+
+    def set_later(self, name: str, build: Callable[[], Any]) -> None:
+        """Marks a state as changed without making its data yet. It's made with build
+        only once, when it's written, however many times it changed in the meantime.
+
+        :param name: The name to save it under.
+        :param build: Returns the data to save.
+        """
+        self._dirty[name] = build
+        self._flush_soon()
+
+    async def flush(self) -> None:
+        """Writes all pending changes right away."""
+        self._collect_dirty()
+        if len(self._pending) == 0:
+            return
+        pending = self._pending
+        self._pending = {}
+        self._flushing = {**self._flushing, **pending}
+        try:
+            await asyncio.to_thread(self._write, pending)
+        except sqlite3.Error:
+            traceback.print_exc()
+            # Retried with the next flush, unless they've been overwritten since
+            self._pending = {**pending, **self._pending}
+        finally:
+            for name in pending:
+                if self._flushing.get(name) is pending[name]:
+                    del self._flushing[name]
+
+    async def close(self) -> None:
+        await self.flush()
+        with self._lock:
+            self._db.close()
+
+    def _flush_soon(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    def _collect_dirty(self) -> None:
+        dirty = self._dirty
+        self._dirty = {}
+        for name, build in dirty.items():
+            try:
+                self._pending[name] = (time.time(), json.dumps(StateStore._encode(build())))
+            except Exception:
+                traceback.print_exc()
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(StateStore.FLUSH_DELAY)
+        await self.flush()
+
+    def _read(self, name: str) -> tuple[float, str] or None:
+        with self._lock:
+            return self._db.execute("SELECT saved_at, data FROM state WHERE name=?", (name,)).fetchone()
+
+    def _write(self, pending: dict[str, tuple[float, str]]) -> None:
+        with self._lock, self._db:
+            self._db.executemany("""
+                INSERT INTO state (name, saved_at, data) VALUES (?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET saved_at=excluded.saved_at, data=excluded.data
+            """, [(name, saved_at, data) for name, (saved_at, data) in pending.items()])
+
+    def _migrate_legacy(self, name: str) -> dict[str, Any] or None:
+        """Reads the state a cog saved in its own JSON file, before there was a store."""
+        path = StateStore.LEGACY_STATE_PATH.format(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as fin:
+                state = json.load(fin)
+        except (OSError, ValueError):
+            return None
+        self._write({name: (state["saved_at"], json.dumps(state["data"]))})
+        return state
+
+    @staticmethod
+    def _encode(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return {"$type": "datetime", "value": value.timestamp()}
+        if isinstance(value, timedelta):
+            return {"$type": "timedelta", "value": value.total_seconds()}
+        if isinstance(value, tuple):
+            return {"$type": "tuple", "value": [StateStore._encode(x) for x in value]}
+        if isinstance(value, (set, frozenset)):
+            return {"$type": "set", "value": [StateStore._encode(x) for x in value]}
+        if isinstance(value, list):
+            return [StateStore._encode(x) for x in value]
+        if isinstance(value, dict):
+            return {k: StateStore._encode(v) for k, v in value.items()}
+        return value
+
+    @staticmethod
+    def _decode(obj: dict[str, Any]) -> Any:
+        if obj.keys() != {"$type", "value"}:
+            return obj
+        if obj["$type"] == "datetime":
+            return datetime.fromtimestamp(obj["value"])
+        if obj["$type"] == "timedelta":
+            return timedelta(seconds=obj["value"])
+        if obj["$type"] == "tuple":
+            return tuple(obj["value"])
+        if obj["$type"] == "set":
+            return set(obj["value"])
+        return obj
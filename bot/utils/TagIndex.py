@@ -0,0 +1,109 @@
+import os
+import bot.utils.io
+from bot.utils.Cache import Cache
+
+
+class TagIndex:
+    """
+    Keeps the tags in memory, indexed for autocomplete.
+
+    Tags are reloaded by refresh() only if the file changed. Completions come from a
+    prefix trie where each node already has the (sorted) tags below it, topped up with
+    fuzzy matches when there are too few. Results are cached until the next reload.
+    """
+    MAX_RESULTS = 25  # Discord shows at most 25 autocomplete choices
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tags: dict[str, str] = {}
+        self.names: list[str] = []
+        self._trie: dict = {"tags": []}
+        self._version: tuple[int, int] or None = None
+        self._completions = Cache("tag-autocomplete", max_size=1024)
+
+    def refresh(self) -> bool:
+        """Reloads the tags if the file changed.
+
+        :return: True if they were reloaded.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self._version:
+            return False
+
+        self.load(bot.utils.io.get_tags(self.path))
+        self._version = version
+        return True
+
+    def load(self, tags: dict[str, str]) -> None:
+        self.tags = {name.lower(): content for name, content in tags.items()}
+        self.names = sorted(self.tags.keys())
+        trie = {"tags": self.names}
+        for name in self.names:
+            node = trie
+            for char in name:
+                if char not in node:
+                    node[char] = {"tags": []}
+                node = node[char]
+                # Names are added in order, so every node's list is sorted
+                node["tags"].append(name)
+        self._trie = trie
+        self._completions.clear()
+
+    def get(self, name: str) -> str or None:
+        return self.tags.get(name.lower())
+
+    def complete(self, current: str) -> list[str]:
+        """The tags that best match what's been typed so far."""
+        current = current.lower()
+        completions = self._completions.get(current)
+        if completions is None:
+            completions = self._complete(current)
+            self._completions.set(current, completions)
+        return completions
+
+    def _complete(self, current: str) -> list[str]:
+        node = self._trie
+        for char in current:
+            node = node.get(char)
+            if node is None:
+                break
+        completions = node["tags"][:TagIndex.MAX_RESULTS] if node is not None else []
+        if len(completions) == TagIndex.MAX_RESULTS:
+            return completions
+
+        found = set(completions)
+        fuzzy = []
+        for name in self.names:
+            if name in found:
+                continue
+            score = TagIndex.fuzzy_score(current, name)
+            if score is not None:
+                fuzzy.append((score, len(name), name))
+        fuzzy.sort()
+        return completions + [name for _s, _l, name in fuzzy[:TagIndex.MAX_RESULTS-len(completions)]]
+
+    @staticmethod
+    def fuzzy_score(query: str, name: str) -> tuple[int, int] or None:
+        """How well a name matches a query that isn't its prefix. Lower is better.
+
+        :return: Substring matches first, by where they are, then names that have the
+                 query's letters in order, by how spread out they are. None if it doesn't match.
+        """
+        position = name.find(query)
+        if position != -1:
+            return 0, position
+
+        spread = 0
+        last = -1
+        for char in query:
+            i = name.find(char, last+1)
+            if i == -1:
+                return None
+            if last != -1:
+                spread += i - last - 1
+            last = i
+        return 1, spread
@@ -0,0 +1,164 @@
+from enum import Enum, IntEnum
+from typing import Any
+from bloonspy import btd6
+
+
+class TileType(Enum):
+    REGULAR = "Regular"
+    BANNER = "Banner"
+    RELIC = "Relic"
+    OTHER = "Other"  # Spawns, team first captures, ...
+
+    @classmethod
+    def _missing_(cls, _value: Any) -> "TileType":
+        return cls.OTHER
+
+
+class GameType(IntEnum):
+    """The subGameType of a tile."""
+    OTHER = 0
+    RACE = 2
+    BOSS = 4
+    LEAST_CASH = 8
+    LEAST_TIERS = 9
+
+    @classmethod
+    def _missing_(cls, _value: Any) -> "GameType":
+        return cls.OTHER
+
+
+class Boss(IntEnum):
+    BLOONARIUS = 0
+    LYCH = 1
+    VORTEX = 2
+    DREADBLOON = 3
+    PHAYZE = 4
+
+    @property
+    def title(self) -> str:
+        return self.name.title()
+
+
+# Map names in tile data -> their actual name, without spaces like the rest
+MAP_NAME_FIXES = {
+    "AdorasTemple": "Adora'sTemple",
+    "PatsPond": "Pat'sPond",
+    "Tutorial": "MonkeyMeadow",
+}
+
+
+class TowerLimit:
+    """How many of a tower can be placed in a tile. -1 if there's no limit."""
+    __slots__ = ("tower", "max", "is_hero")
+
+    def __init__(self, tower: str, max_amount: int, is_hero: bool):
+        object.__setattr__(self, "tower", tower)
+        object.__setattr__(self, "max", max_amount)
+        object.__setattr__(self, "is_hero", is_hero)
+
+    def __setattr__(self, _name: str, _value: Any) -> None:
+        raise AttributeError("TowerLimit is immutable")
+
+
+class Tile:
+    """
+    A tile's challenge, parsed once from its JSON data. Immutable.
+    """
+    __slots__ = (
+        "code", "event_number", "tile_type", "relic_type", "relic", "game_type", "boss", "boss_tiers",
+        "map", "difficulty", "mode", "cash", "lives", "start_round", "end_round", "max_towers",
+        "knowledge_disabled", "selling_disabled", "bloon_speed", "moab_speed", "ceramic_health",
+        "moab_health", "regrow_rate", "towers", "all_heroes_enabled",
+    )
+
+    def __init__(self, **fields):
+        for name in Tile.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, _name: str, _value: Any) -> None:
+        raise AttributeError("Tile is immutable")
+
+    def __repr__(self) -> str:
+        return f"Tile({self.code}, season={self.event_number}, {self.tile_type.name}, {self.game_type.name})"
+
+    @property
+    def is_race(self) -> bool:
+        return self.game_type == GameType.RACE
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "Tile":
+        """
+        :param data: The tile's data, as in /ctmap/<season>/tiles/<tile>.json.
+        """
+        game = data["GameData"]
+        dc_model = game["dcModel"]
+        start_rules = dc_model["startRules"]
+        bloon_modifiers = dc_model["bloonModifiers"]
+
+        tile_type = TileType(data["TileType"])
+        relic_type = data.get("RelicType") if tile_type == TileType.RELIC else None
+        boss = None
+        boss_tiers = None
+        if "bossData" in game:
+            boss = Boss._value2member_map_.get(game["bossData"]["bossBloon"])
+            boss_tiers = game["bossData"]["TierCount"]
+
+        towers = []
+        all_heroes_enabled = False
+        for twr in dc_model["towers"]["_items"]:
+            if twr is None:
+                continue
+            if twr["tower"] == "ChosenPrimaryHero":
+                all_heroes_enabled = twr["max"] == 1
+                continue
+            towers.append(TowerLimit(twr["tower"], twr["max"], twr["isHero"]))
+
+        return cls(
+            code=data["Code"],
+            event_number=data["EventNumber"],
+            tile_type=tile_type,
+            relic_type=relic_type,
+            relic=btd6.Relic.from_string(relic_type) if relic_type is not None else None,
+            game_type=GameType(game["subGameType"]),
+            boss=boss,
+            boss_tiers=boss_tiers,
+            map=MAP_NAME_FIXES.get(game["selectedMap"], game["selectedMap"]),
+            difficulty=game["selectedDifficulty"],
+            mode=game["selectedMode"],
+            cash=start_rules["cash"],
+            lives=start_rules["lives"],
+            start_round=start_rules["round"],
+            end_round=start_rules["endRound"],
+            max_towers=dc_model["maxTowers"],
+            knowledge_disabled=dc_model["disableMK"],
+            selling_disabled=dc_model["disableSelling"],
+            bloon_speed=bloon_modifiers["speedMultiplier"],
+            moab_speed=bloon_modifiers["moabSpeedMultiplier"],
+            ceramic_health=bloon_modifiers["healthMultipliers"]["bloons"],
+            moab_health=bloon_modifiers["healthMultipliers"]["moabs"],
+            regrow_rate=bloon_modifiers["regrowRateMultiplier"],
+            towers=tuple(towers),
+            all_heroes_enabled=all_heroes_enabled,
+        )
+
+    def to_record(self) -> tuple:
+        """The tile as a tuple of plain values, in the order of __slots__, for TileSnapshot."""
+        fields = {name: getattr(self, name) for name in Tile.__slots__}
+        fields["tile_type"] = self.tile_type.value
+        fields["relic"] = None
+        fields["game_type"] = int(self.game_type)
+        fields["boss"] = int(self.boss) if self.boss is not None else None
+        fields["towers"] = tuple((twr.tower, twr.max, twr.is_hero) for twr in self.towers)
+        return tuple(fields[name] for name in Tile.__slots__)
+
+    @classmethod
+    def from_record(cls, record: tuple) -> "Tile":
+        fields = dict(zip(Tile.__slots__, record))
+        fields["tile_type"] = TileType(fields["tile_type"])
+        if fields["relic_type"] is not None:
+            fields["relic"] = btd6.Relic.from_string(fields["relic_type"])
+        fields["game_type"] = GameType(fields["game_type"])
+        if fields["boss"] is not None:
+            fields["boss"] = Boss(fields["boss"])
+        fields["towers"] = tuple(TowerLimit(*twr) for twr in fields["towers"])
+        return cls(**fields)
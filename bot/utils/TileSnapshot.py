@@ -0,0 +1,157 @@
+import marshal
+import mmap
+import os
+import struct
+import tempfile
+from .Tile import Tile
+
+
+class TileSnapshot:
+    """
+    A season's tiles compiled into a single binary file, so they can be loaded
+    without reading and parsing every tile's JSON.
+
+    The file is a fixed header, an index with every tile code and where its data
+    is, then the tiles one after the other, each a marshalled Tile.to_record().
+    It's memory-mapped and records are decoded straight from the mapping.
+
+    The header keeps a fingerprint of the tiles folder it was compiled from (how many
+    files, their total size and the latest modification time), and a snapshot
+    that doesn't match the folder anymore is stale.
+    """
+    MAGIC = b"CTTS"
+    VERSION = 1  # Bump when the layout or Tile's record changes
+    # Magic, version, marshal version, tile count, files, total size, latest mtime (ns)
+    HEADER = struct.Struct("<4sHHIIQQ")
+    # Tile code, offset of its record from the start of the payload, record length
+    INDEX_ENTRY = struct.Struct("<3sxII")
+
+    def __init__(self, path: str):
+        """Opens a snapshot. Use TileSnapshot.open to check it's valid and up to date first.
+
+        :param path: Path to the snapshot.
+        :raise ValueError: If it's not a snapshot this version can read.
+        """
+        self.path = path
+        with open(path, "rb") as fin:
+            self._mmap = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        try:
+            if len(self._view) < TileSnapshot.HEADER.size:
+                raise ValueError("Snapshot is truncated")
+            magic, version, marshal_version, count, *fingerprint = TileSnapshot.HEADER.unpack_from(self._view)
+            if magic != TileSnapshot.MAGIC or version != TileSnapshot.VERSION or \
+                    marshal_version != marshal.version:
+                raise ValueError("Not a snapshot in the current format")
+            self.fingerprint = tuple(fingerprint)
+
+            payload_start = TileSnapshot.HEADER.size + count*TileSnapshot.INDEX_ENTRY.size
+            self._index: dict[str, tuple[int, int]] = {}
+            for i in range(count):
+                code, offset, length = TileSnapshot.INDEX_ENTRY.unpack_from(
+                    self._view, TileSnapshot.HEADER.size + i*TileSnapshot.INDEX_ENTRY.size
+                )
+                if payload_start + offset + length > len(self._view):
+                    raise ValueError("Snapshot is truncated")
+                self._index[code.decode()] = (payload_start + offset, length)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self) -> "TileSnapshot":
+        return self
+
+    def __exit__(self, *_args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._index
+
+    def close(self) -> None:
+        self._view.release()
+        self._mmap.close()
+
+    @property
+    def codes(self) -> list[str]:
+        return list(self._index.keys())
+
+    def get(self, code: str) -> Tile or None:
+        if code not in self._index:
+            return None
+        start, length = self._index[code]
+        with self._view[start:start+length] as record:
+            return Tile.from_record(marshal.loads(record))
+
+    def tiles(self) -> dict[str, Tile]:
+        """Decodes every tile in the snapshot."""
+        return {code: self.get(code) for code in self._index}
+
+    @staticmethod
+    def open(path: str, tiles_dir: str) -> "TileSnapshot" or None:
+        """Opens a snapshot, if it's there and up to date.
+
+        :param path: Path to the snapshot.
+        :param tiles_dir: The tiles folder it was compiled from.
+        :return: The snapshot, or None if it's missing, unreadable or stale.
+        """
+        try:
+            snapshot = TileSnapshot(path)
+        except (OSError, ValueError):
+            return None
+        try:
+            if snapshot.fingerprint == TileSnapshot.folder_fingerprint(tiles_dir):
+                return snapshot
+        except OSError:
+            pass
+        snapshot.close()
+        return None
+
+    @staticmethod
+    def folder_fingerprint(tiles_dir: str) -> tuple[int, int, int]:
+        """:return: How many files are in a folder, their total size and their latest mtime in ns."""
+        files = 0
+        size = 0
+        latest_mtime = 0
+        with os.scandir(tiles_dir) as entries:
+            for entry in entries:
+                stat = entry.stat()
+                files += 1
+                size += stat.st_size
+                latest_mtime = max(latest_mtime, stat.st_mtime_ns)
+        return files, size, latest_mtime
+
+    @staticmethod
+    def write(path: str, tiles: dict[str, Tile], fingerprint: tuple[int, int, int]) -> None:
+        """Writes a snapshot. The file is replaced all at once, so it's never read half-written,
+        and processes writing the same one at the same time each write their own copy.
+
+        :param path: Where to write it.
+        :param tiles: Tile code -> tile.
+        :param fingerprint: The fingerprint of the folder the tiles were read from.
+        """
+        index = b""
+        payload = b""
+        for code, tile in tiles.items():
+            record = marshal.dumps(tile.to_record())
+            index += TileSnapshot.INDEX_ENTRY.pack(code.encode(), len(payload), len(record))
+            payload += record
+        header = TileSnapshot.HEADER.pack(
+            TileSnapshot.MAGIC, TileSnapshot.VERSION, marshal.version, len(tiles), *fingerprint
+        )
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tiles-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fout:
+                fout.write(header + index + payload)
+                fout.flush()
+                os.fsync(fout.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
@@ -1,10 +1,16 @@
 from datetime import datetime, timedelta
+import asyncio
 import discord
 from bloonspy import Client, btd6
 import re
 import os
 import json
-from .Cache import Cache
+import traceback
+from typing import Any
+import bot.utils.io
+from .Cache import Cache, cached
+from .Tile import Tile, TileType, GameType, Boss
+from .TileSnapshot import TileSnapshot
 from bot.utils.emojis import NO_SELLING, NO_KNOWLEDGE, CERAM_HEALTH, MOAB_HEALTH, MOAB_SPEED, BLOON_SPEED, \
     MAX_TOWERS, REGROW_RATE, CASH
 from bot.utils.images import BANNER_IMG, REGULAR_IMG, RELICS_IMG, RELIC_IMG, MAPS, IMG_BLOONARIUS, \
@@ -18,7 +24,9 @@ EVENT_EPOCHS = [
 ]
 
 CT_DATA_CACHE_HR = 12
-tiles_cache = Cache([], datetime.now())
+# Tiles of the current event. Once expired they're served while being fetched again,
+# and if there's no event it's checked again every few minutes.
+tiles_cache = Cache("ct-tiles", ttl=CT_DATA_CACHE_HR*3600, stale_ttl=CT_DATA_CACHE_HR*3600, negative_ttl=300)
 
 EVENT_DURATION = 7
 DEFAULT_STARTING_LIVES = {
@@ -118,88 +126,67 @@ def get_current_ct_day() -> int:
     return get_ct_day_during(datetime.now())
 
 
-def raw_challenge_to_embed(challenge) -> discord.Embed or None:
-    event_number = challenge["EventNumber"]
-    # event_number = get_current_ct_number()
+BOSS_IMAGES = {
+    Boss.BLOONARIUS: IMG_BLOONARIUS,
+    Boss.LYCH: IMG_LYCH,
+    Boss.VORTEX: IMG_VORTEX,
+    Boss.DREADBLOON: IMG_DREADBLOON,
+    Boss.PHAYZE: IMG_PHAYZE,
+}
+GAME_TYPE_IMAGES = {
+    GameType.LEAST_TIERS: IMG_LEAST_TIERS,
+    GameType.LEAST_CASH: IMG_LEAST_CASH,
+    GameType.RACE: IMG_TIME_ATTACK,
+}
 
-    tile = challenge["Code"]
+
+def tile_to_embed(tile: Tile) -> discord.Embed:
     tile_type_url = REGULAR_IMG
-    # if challenge['TileType'] == "TeamFirstCapture":
-    #     return None
-    if challenge['TileType'] == "Banner":
+    if tile.tile_type == TileType.BANNER:
         tile_type_url = BANNER_IMG
-    elif challenge['TileType'] == "Relic":
-        if challenge['RelicType'] in RELICS_IMG:
-            tile_type_url = RELICS_IMG[challenge['RelicType']]
-        else:
-            tile_type_url = RELIC_IMG
+    elif tile.tile_type == TileType.RELIC:
+        tile_type_url = RELICS_IMG.get(tile.relic_type, RELIC_IMG)
 
-    challenge = challenge["GameData"]
+    challenge_thmb = GAME_TYPE_IMAGES.get(tile.game_type, BOSS_IMAGES.get(tile.boss, ""))
 
-    if challenge["selectedMap"] == "AdorasTemple":
-        challenge["selectedMap"] = "Adora'sTemple"
-    elif challenge["selectedMap"] == "PatsPond":
-        challenge["selectedMap"] = "Pat'sTemple"
-    elif challenge["selectedMap"] == "Tutorial":
-        challenge["selectedMap"] = "MonkeyMeadow"
-
-    boss = None
-    challenge_thmb = ""
-    boss_data = [("Bloonarius", IMG_BLOONARIUS), ("Lych", IMG_LYCH), ("Vortex", IMG_VORTEX),
-                 ("Dreadbloon", IMG_DREADBLOON), ("Phayze", IMG_PHAYZE)]
-    if "bossData" in challenge:
-        boss, challenge_thmb = boss_data[challenge['bossData']['bossBloon']]
-
-    mode = challenge['selectedMode']
+    mode = tile.mode
     if mode == "DoubleMoabHealth":
         mode = "Double HP MOABs"
-    if boss:
-        mode = f"{boss} {challenge['bossData']['TierCount']} Tier{'s' if challenge['bossData']['TierCount'] > 1 else ''}"
-
-    if challenge['subGameType'] == 9:
-        challenge_thmb = IMG_LEAST_TIERS
-    elif challenge['subGameType'] == 8:
-        challenge_thmb = IMG_LEAST_CASH
-    elif challenge['subGameType'] == 2:
-        challenge_thmb = IMG_TIME_ATTACK
+    if tile.boss is not None:
+        mode = f"{tile.boss.title} {tile.boss_tiers} Tier{'s' if tile.boss_tiers > 1 else ''}"
 
-    title = f"{add_spaces(challenge['selectedMap'])} — {challenge['selectedDifficulty']} {mode}"
+    title = f"{add_spaces(tile.map)} — {tile.difficulty} {mode}"
 
-    starting_lives = challenge['dcModel']['startRules']['lives']
+    starting_lives = tile.lives
     if starting_lives == -1:
-        starting_lives = DEFAULT_STARTING_LIVES[challenge['selectedDifficulty']]
-    end_round = challenge['dcModel']['startRules']['endRound']
+        starting_lives = DEFAULT_STARTING_LIVES[tile.difficulty]
+    end_round = tile.end_round
     if end_round == -1:
-        end_round = f"{challenge['bossData']['TierCount'] * 20 + 20}+"
-    description = f"{CASH} ${challenge['dcModel']['startRules']['cash']} — ♥️ {starting_lives} — " \
-                  f"Rounds {challenge['dcModel']['startRules']['round']}/{end_round}\n\n"
+        end_round = f"{tile.boss_tiers * 20 + 20}+"
+    description = f"{CASH} ${tile.cash} — ♥️ {starting_lives} — " \
+                  f"Rounds {tile.start_round}/{end_round}\n\n"
 
-    if challenge['dcModel']['maxTowers'] > -1:
-        description += f"{MAX_TOWERS} Max Towers: {challenge['dcModel']['maxTowers']}\n"
-    if challenge['dcModel']['disableMK']:
+    if tile.max_towers > -1:
+        description += f"{MAX_TOWERS} Max Towers: {tile.max_towers}\n"
+    if tile.knowledge_disabled:
         description += f"{NO_KNOWLEDGE} Knowledge Disabled\n"
-    if challenge['dcModel']['disableSelling']:
+    if tile.selling_disabled:
         description += f"{NO_SELLING} Selling Disabled\n"
-    # if challenge['dcModel']['abilityCooldownReductionMultiplier'] != 1.0:
-    #     description += f"- **Ability cooldown:** {int(challenge['dcModel']['abilityCooldownReductionMultiplier']*100)}%\n"
-    # if challenge['dcModel']['removeableCostMultiplier'] != 1.0:
-    #     description += f"- **Removable cost:** {int(challenge['dcModel']['removeableCostMultiplier']*100)}%\n"
     bloon_modifiers = []
-    if challenge['dcModel']['bloonModifiers']['speedMultiplier'] != 1.0:
-        bloon_modifiers.append(f"{BLOON_SPEED} Bloon Speed: {int(challenge['dcModel']['bloonModifiers']['speedMultiplier']*100)}%\n")
-    if challenge['dcModel']['bloonModifiers']['moabSpeedMultiplier'] != 1.0:
-        bloon_modifiers.append(f"{MOAB_SPEED} MOAB Speed: {int(challenge['dcModel']['bloonModifiers']['moabSpeedMultiplier']*100)}%\n")
-    if challenge['dcModel']['bloonModifiers']['healthMultipliers']['bloons'] != 1.0:
-        bloon_modifiers.append(f"{CERAM_HEALTH} Ceramic Health: {int(challenge['dcModel']['bloonModifiers']['healthMultipliers']['bloons']*100)}%\n")
-    if challenge['dcModel']['bloonModifiers']['healthMultipliers']['moabs'] != 1.0:
-        bloon_modifiers.append(f"{MOAB_HEALTH} MOAB Health: {int(challenge['dcModel']['bloonModifiers']['healthMultipliers']['moabs']*100)}%\n")
-    if challenge['dcModel']['bloonModifiers']['regrowRateMultiplier'] != 1.0:
-        bloon_modifiers.append(f"{REGROW_RATE} Regrow Rate: {int(challenge['dcModel']['bloonModifiers']['regrowRateMultiplier']*100)}%\n")
+    if tile.bloon_speed != 1.0:
+        bloon_modifiers.append(f"{BLOON_SPEED} Bloon Speed: {int(tile.bloon_speed*100)}%\n")
+    if tile.moab_speed != 1.0:
+        bloon_modifiers.append(f"{MOAB_SPEED} MOAB Speed: {int(tile.moab_speed*100)}%\n")
+    if tile.ceramic_health != 1.0:
+        bloon_modifiers.append(f"{CERAM_HEALTH} Ceramic Health: {int(tile.ceramic_health*100)}%\n")
+    if tile.moab_health != 1.0:
+        bloon_modifiers.append(f"{MOAB_HEALTH} MOAB Health: {int(tile.moab_health*100)}%\n")
+    if tile.regrow_rate != 1.0:
+        bloon_modifiers.append(f"{REGROW_RATE} Regrow Rate: {int(tile.regrow_rate*100)}%\n")
     if len(bloon_modifiers) > 0:
         description += "Bloon modifiers:\n" + "".join(bloon_modifiers)
 
     heroes_excluded = []
-    all_heros_enabled = False
     towers = {
         "Heroes": [],
         "Primary": [],
@@ -207,22 +194,15 @@ def raw_challenge_to_embed(challenge) -> discord.Embed or None:
         "Magic": [],
         "Support": [],
     }
-    for twr in challenge['dcModel']['towers']['_items']:
-        if twr is None:
+    for twr in tile.towers:
+        if twr.is_hero and twr.max == 0:
+            heroes_excluded.append(add_spaces(twr.tower))
+        if twr.max == 0:
             continue
-        if twr['tower'] == "ChosenPrimaryHero":
-            if twr["max"] == 1:
-                all_heros_enabled = True
-            continue
-
-        if twr["isHero"] and twr["max"] == 0:
-            heroes_excluded.append(add_spaces(twr['tower']))
-        if twr['max'] == 0:
-            continue
-        if twr['isHero']:
-            towers["Heroes"].append(add_spaces(twr['tower']))
+        if twr.is_hero:
+            towers["Heroes"].append(add_spaces(twr.tower))
         else:
-            towers[TOWER_CATEGORY[twr['tower']]].append((twr['tower'], twr['max']))
+            towers[TOWER_CATEGORY[twr.tower]].append((twr.tower, twr.max))
 
     embed = discord.Embed(
         title=title,
@@ -231,17 +211,14 @@ def raw_challenge_to_embed(challenge) -> discord.Embed or None:
     )
 
     embed.set_author(
-        name=f"Contested Territory #{event_number} — Tile {tile}",
+        name=f"Contested Territory #{tile.event_number} — Tile {tile.code}",
         icon_url=tile_type_url,
     )
-    map_key = challenge["selectedMap"] if challenge["selectedMap"] in MAPS else None
+    map_key = tile.map if tile.map in MAPS else None
     embed.set_image(url=MAPS[map_key])
     embed.set_thumbnail(url=challenge_thmb)
-#    embed.set_footer(text="⚠️ Note: This command might have outdated info since the way we gather data for it is "
-#                          "finnicky. If you want this command to work reliably, let the Open Data NinjaKiwi API know "
-#                          "that you'd like tile data to be provided by their official API.")
 
-    if all_heros_enabled:
+    if tile.all_heroes_enabled:
         embed.add_field(name="Heroes", value="All Heroes Enabled!")
     if len(towers["Heroes"]) > 0:
         content = ""
@@ -290,11 +267,27 @@ def fetch_tile_data(tile: str, season: None or int = None):
     return data
 
 
-def fetch_all_tiles(season: None or int = None):
+def get_tiles_dir(season: None or int = None) -> str:
     if season is None:
-        path = f"/ctmap/current/tiles"
-    else:
-        path = f"/ctmap/{season}/tiles"
+        return f"/ctmap/current/tiles"
+    return f"/ctmap/{season}/tiles"
+
+
+def get_current_tiles_version() -> tuple[int, int] or None:
+    """Changes when /ctmap/current/tiles is swapped for another folder, or tiles are added to or removed from it."""
+    try:
+        stat = os.stat(get_tiles_dir())
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def get_snapshot_path(season: None or int = None) -> str:
+    return os.path.join(bot.utils.io.CACHE_DIR, f"tiles-{season if season is not None else 'current'}.snapshot")
+
+
+def fetch_all_tiles(season: None or int = None):
+    path = get_tiles_dir(season)
     tiles = []
     for file in os.listdir(path):
         data = fetch_tile_data(file[:3], season)
@@ -303,7 +296,99 @@ def fetch_all_tiles(season: None or int = None):
     return tiles
 
 
-def relic_to_tile_code(relic: str, season: None or int = None) -> str or None:
+# Season, or "current" and the version of its folder -> tile code -> tile
+season_tiles_cache = Cache("season-tiles", ttl=3600, max_size=4)
+# ID of a tile -> (the tile, its embed as a dict). Keeping the tile in the entry
+# makes sure its ID isn't reused while it's cached.
+tile_embeds_cache = Cache("tile-embeds", max_size=1024)
+_warming_tasks: set[asyncio.Task] = set()
+
+
+def load_season_tiles(season: None or int = None) -> dict[str, Tile] or None:
+    """Loads a season's tiles from its snapshot, or from the JSON files if the snapshot
+    is missing or stale. In that case, the snapshot is compiled again for next time.
+    """
+    tiles_dir = get_tiles_dir(season)
+    snapshot = TileSnapshot.open(get_snapshot_path(season), tiles_dir)
+    if snapshot is not None:
+        with snapshot:
+            return snapshot.tiles()
+
+    try:
+        tiles = compile_season_snapshot(season)
+    except FileNotFoundError:
+        return None
+    return tiles
+
+
+def compile_season_snapshot(season: None or int = None) -> dict[str, Tile]:
+    """Compiles a season's tiles into a snapshot, from the JSON files.
+
+    :param season: The season's number. None for the one in /ctmap/current.
+    :return: The tiles that were compiled.
+    :raise FileNotFoundError: If the season's tiles aren't there.
+    """
+    tiles_dir = get_tiles_dir(season)
+    # Taken before reading them, so files changing in the meantime make the snapshot stale
+    fingerprint = TileSnapshot.folder_fingerprint(tiles_dir)
+    tiles = {data["Code"]: Tile.from_json(data) for data in fetch_all_tiles(season)}
+    try:
+        TileSnapshot.write(get_snapshot_path(season), tiles, fingerprint)
+    except OSError:
+        traceback.print_exc()
+    return tiles
+
+
+async def get_season_tiles(season: None or int = None) -> dict[str, Tile]:
+    """Gets every tile of a season, parsed.
+
+    :param season: The season's number. None for the one in /ctmap/current.
+    :return: Tile code -> tile. Empty if the season's tiles aren't there (yet).
+    """
+    # The current tiles are replaced when a new season's are downloaded, whenever that is
+    key = season if season is not None else ("current", get_current_tiles_version())
+    tiles = await season_tiles_cache.get_or_load(key, lambda: _load_season_tiles(season))
+    return tiles if tiles is not None else {}
+
+
+async def _load_season_tiles(season: None or int) -> dict[str, Tile] or None:
+    tiles = await asyncio.to_thread(load_season_tiles, season)
+    if tiles is not None:
+        task = asyncio.create_task(warm_tile_embeds(list(tiles.values())))
+        _warming_tasks.add(task)
+        task.add_done_callback(_warming_tasks.discard)
+    return tiles
+
+
+def _cached_tile_embed(tile: Tile) -> dict[str, Any] or None:
+    # Reloading a season makes new tiles, so the old ones' embeds aren't used anymore
+    entry = tile_embeds_cache.get(id(tile))
+    return entry[1] if entry is not None else None
+
+
+async def warm_tile_embeds(tiles: list[Tile]) -> None:
+    """Makes the embeds of the given tiles that aren't cached yet."""
+    missing = [tile for tile in tiles if _cached_tile_embed(tile) is None]
+    embeds = await asyncio.to_thread(lambda: [tile_to_embed(tile).to_dict() for tile in missing])
+    for tile, embed in zip(missing, embeds):
+        tile_embeds_cache.set(id(tile), (tile, embed))
+
+
+def get_tile_embed(tile: Tile) -> discord.Embed:
+    """Same as tile_to_embed, but made only once per tile."""
+    embed = _cached_tile_embed(tile)
+    if embed is None:
+        embed = tile_to_embed(tile).to_dict()
+        tile_embeds_cache.set(id(tile), (tile, embed))
+    # A new one every time, so whoever gets it can edit it
+    return discord.Embed.from_dict(embed)
+
+
+async def get_tile(tile: str, season: None or int = None) -> Tile or None:
+    return (await get_season_tiles(season)).get(tile)
+
+
+async def relic_to_tile_code(relic: str, season: None or int = None) -> str or None:
     relic = relic.lower().replace(" ", "_")
     relics = {
         'AirAndSea': ['aas', 'airandsea', 'air_and_sea', "ans"],
@@ -344,10 +429,9 @@ def relic_to_tile_code(relic: str, season: None or int = None) -> str or None:
     }
     for key in relics:
         if relic in relics[key]:
-            tiles = fetch_all_tiles(season)
-            for tile in tiles:
-                if tile["RelicType"] == key:
-                    return tile["Code"]
+            for tile in (await get_season_tiles(season)).values():
+                if tile.relic_type == key:
+                    return tile.code
     return None
 
 
@@ -360,16 +444,22 @@ def get_current_ct_event() -> btd6.ContestedTerritoryEvent or None:
     return None
 
 
-def get_current_ct_tiles() -> list[btd6.CtTile]:
-    """This is supposed to be awaited and turned into a thread but it's only blocking once every 12 hours so idc"""
-    global tiles_cache
-    if not tiles_cache.valid:
-        ct = get_current_ct_event()
-        if ct is None:
-            return []
-        tiles_cache = Cache(ct.tiles(), datetime.now() + timedelta(hours=CT_DATA_CACHE_HR))
-    return tiles_cache.value
+def fetch_current_ct_tiles() -> list[btd6.CtTile] or None:
+    ct = get_current_ct_event()
+    if ct is None:
+        return None
+    return ct.tiles()
+
+
+@cached(tiles_cache, key=lambda: "current")
+async def load_current_ct_tiles() -> list[btd6.CtTile] or None:
+    return await asyncio.to_thread(fetch_current_ct_tiles)
+
+
+async def get_current_ct_tiles() -> list[btd6.CtTile]:
+    tiles = await load_current_ct_tiles()
+    return tiles if tiles is not None else []
 
 
-def is_tile_code_valid(tile: str) -> bool:
-    return tile in [t.id for t in get_current_ct_tiles()]
+async def is_tile_code_valid(tile: str) -> bool:
+    return tile in [t.id for t in await get_current_ct_tiles()]
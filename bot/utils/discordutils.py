@@ -1,7 +1,10 @@
 import bot.exceptions
 import discord
 import asyncio
+import functools
+from typing import Any, Awaitable, Callable
 from discord.ext import commands
+from bot.utils.Outbound import Outbound
 
 
 async def update_messages(
@@ -9,7 +12,9 @@ async def update_messages(
         content: list[tuple[str, discord.ui.View or None]],
         channel: discord.TextChannel,
         tolerance: int = 10,
-        delete_user_messages: bool = True) -> None:
+        delete_user_messages: bool = True,
+        outbound: Outbound or None = None,
+        priority: int = Outbound.PLANNER) -> None:
     """Edits a bunch of messages to reflect some new content. If other users
     sent messages in the channel in the meanwhile, it deletes its own old messages
     and send the whole thing again, to make sure it's always the newest message sent.
@@ -21,7 +26,15 @@ async def update_messages(
     :param delete_user_messages: If True, it will delete user messages in the way. Only does so if it updates
                                  (so NOT if it resends) and will only delete the messages it "tolerated". So setting
                                  tolerance=0 turns this off as well.
+    :param outbound: If set, edits, deletions and new messages are queued there.
+    :param priority: The Outbound priority class to queue them with.
     """
+    async def send(request: Callable[[], Awaitable[Any]]) -> Any:
+        if outbound is None:
+            return await request()
+        guild = getattr(channel, "guild", None)
+        return await outbound.run(request, priority, route=channel.id, guild_id=guild.id if guild else None)
+
     messages_to_change = []
     bot_messages = []
     user_messages_delete = []
@@ -49,24 +62,24 @@ async def update_messages(
         modify = False
 
     if modify:
-        coros = [m.delete() for m in user_messages_delete]
+        coros = [send(m.delete) for m in user_messages_delete]
         for i in range(len(content)):
             new_content, new_view = content[i]
             if new_view is None:
                 new_view = discord.ui.View()
             if messages_to_change[i].content != new_content or not \
                     (len(messages_to_change[i].components) == len(new_view.to_components()) == 0):
-                coros.append(messages_to_change[i].edit(content=new_content, view=new_view))
+                coros.append(send(functools.partial(messages_to_change[i].edit, content=new_content, view=new_view)))
         await asyncio.gather(*coros)
         return
 
     coros = []
     for msg in bot_messages:
-        coros.append(msg.delete())
+        coros.append(send(msg.delete))
     await asyncio.gather(*coros)
 
     for msg, view in content:
-        await channel.send(content=msg, view=view)
+        await send(functools.partial(channel.send, content=msg, view=view))
 
 
 def gatekeep():
@@ -1,5 +1,4 @@
 from typing import Any
-from datetime import datetime
 import json
 import os
 
@@ -16,41 +15,11 @@ def get_race_rounds() -> list[dict[str, Any]]:
     return data
 
 
-def get_tag_list() -> list[str]:
-    fin = open("bot/files/json/tags.json")
-    data = json.loads(fin.read())
-    fin.close()
-    return data.keys()
-
-
-def get_tag(tag_name: str) -> str or None:
-    fin = open("bot/files/json/tags.json")
-    data = json.loads(fin.read())
-    if tag_name not in data.keys():
-        return None
-    fin.close()
-    return data[tag_name]
+TAGS_PATH = "bot/files/json/tags.json"
 
 
-def save_cog_state(cog_name: str, state: dict[str, Any]) -> None:
-    data = json.dumps({
-        "saved_at": datetime.now().timestamp(),
-        "data": state,
-    })
-    fout = open(state_path(cog_name), "w")
-    fout.write(data)
-    fout.close()
-
-
-def get_cog_state(cog_name: str) -> dict[str, Any] or None:
-    if not os.path.exists(state_path(cog_name)):
-        return None
-    fin = open(state_path(cog_name))
-    data = json.loads(fin.read())
-    fin.close()
-    return data
-
+def get_tags(path: str = TAGS_PATH) -> dict[str, str]:
+    with open(path) as fin:
+        return json.load(fin)
 
-def state_path(cog_name: str) -> str:
-    return f"{CACHE_DIR}/state-{cog_name}.json"
 
@@ -5,7 +5,6 @@ from typing import Callable, Any, Awaitable
 
 RefreshPlannerCallback = Callable[[int], Awaitable[None]]
 InteractionCallback = Callable[[discord.Interaction], Awaitable[None]]
-SwitchPlannerCallback = Callable[[discord.Interaction, bool], Awaitable[None]]
 EditTimeCallback = Callable[[discord.Interaction, int, str, datetime], Awaitable[None]]
 AddTileCallback = Callable[[discord.Interaction, int, str, int], Awaitable[None]]
 TileSelectCallback = Callable[[discord.Interaction, int, str], Awaitable[None]]
@@ -23,19 +22,37 @@ def check_manage_guild(wrapped: Callable):
     return _wrapper
 
 
-class SwitchPlannerButton(discord.ui.Button):
-    def __init__(self, switch_callback: SwitchPlannerCallback, is_active: bool, planner_id: int):
+class SwitchPlannerButton(discord.ui.DynamicItem[discord.ui.Button],
+                          template=r"planner:admin:turn:(?P<planner_id>[0-9]+)"):
+    def __init__(self, refresh_planner: RefreshPlannerCallback, is_active: bool, planner_id: int):
         self.is_active = is_active
-        self.switch_callback = switch_callback
-        super().__init__(
+        self.refresh_planner = refresh_planner
+        self.planner_id = planner_id
+        super().__init__(discord.ui.Button(
             label=f"Turn {'Off' if self.is_active else 'On'}",
             custom_id=f"planner:admin:turn:{planner_id}"[:100],
             style=discord.ButtonStyle.red if self.is_active else discord.ButtonStyle.green
-        )
+        ))
+
+    @classmethod
+    async def from_custom_id(cls,
+                             interaction: discord.Interaction,
+                             item: discord.ui.Button,
+                             match) -> "SwitchPlannerButton":
+        planner_id = int(match["planner_id"])
+        planner = await bot.db.queries.planner.get_planner(planner_id)
+        cog = interaction.client.get_cog("PlannerCog")
+        return cls(cog.send_planner_msg, planner is not None and planner.is_active, planner_id)
 
     @check_manage_guild
     async def callback(self, interaction: discord.Interaction) -> Any:
-        await self.switch_callback(interaction, not self.is_active)
+        new_active = not self.is_active
+        await bot.db.queries.planner.turn_planner(self.planner_id, new_active)
+        await interaction.response.send_message(
+            content=f"The planner has been turned {'on' if new_active else 'off'}!",
+            ephemeral=True
+        )
+        await self.refresh_planner(self.planner_id)
 
 
 class ClearPlannerButton(discord.ui.Button):
@@ -65,15 +82,24 @@ class ForceUnclaimModal(discord.ui.Modal, title="Force a tile to be unclaimed"):
         await self.force_unclaim_callback(interaction, self.planner_id, tile_code)
 
 
-class ForceUnclaimButton(discord.ui.Button):
+class ForceUnclaimButton(discord.ui.DynamicItem[discord.ui.Button],
+                         template=r"planner:admin:unclaim:(?P<planner_id>[0-9]+)"):
     def __init__(self, unclaim_callback: TileSelectCallback, planner_id: int):
         self.unclaim_callback = unclaim_callback
         self.planner_id = planner_id
-        super().__init__(
+        super().__init__(discord.ui.Button(
             label="Force Unclaim",
             custom_id=f"planner:admin:unclaim:{planner_id}"[:100],
             style=discord.ButtonStyle.gray
-        )
+        ))
+
+    @classmethod
+    async def from_custom_id(cls,
+                             interaction: discord.Interaction,
+                             item: discord.ui.Button,
+                             match) -> "ForceUnclaimButton":
+        cog = interaction.client.get_cog("PlannerCog")
+        return cls(cog.force_unclaim, int(match["planner_id"]))
 
     @check_manage_guild
     async def callback(self, interaction: discord.Interaction) -> Any:
@@ -123,15 +149,24 @@ class TimeEditModal(discord.ui.Modal, title="Edit a Tile's Expiration Time"):
         await self.edit_tile_callback(interaction, self.planner_id, tile_code, decay_time)
 
 
-class EditTimeButton(discord.ui.Button):
+class EditTimeButton(discord.ui.DynamicItem[discord.ui.Button],
+                     template=r"planner:admin:edit-time:(?P<planner_id>[0-9]+)"):
     def __init__(self, edit_time_callback: EditTimeCallback, planner_id: int):
         self.edit_time_callback = edit_time_callback
         self.planner_id = planner_id
-        super().__init__(
+        super().__init__(discord.ui.Button(
             label="Edit Tile Expiry",
             custom_id=f"planner:admin:edit-time:{planner_id}"[:100],
             style=discord.ButtonStyle.gray
-        )
+        ))
+
+    @classmethod
+    async def from_custom_id(cls,
+                             interaction: discord.Interaction,
+                             item: discord.ui.Button,
+                             match) -> "EditTimeButton":
+        cog = interaction.client.get_cog("PlannerCog")
+        return cls(cog.edit_tile_time, int(match["planner_id"]))
 
     @check_manage_guild
     async def callback(self, interaction: discord.Interaction) -> Any:
@@ -173,7 +208,8 @@ class AddRemoveTileModal(discord.ui.Modal, title="Add or Remove a Tile"):
             await self.add_callback(interaction, self.planner_id, tile_code, int(self.recap_after.value))
 
 
-class AddRemoveTileButton(discord.ui.Button):
+class AddRemoveTileButton(discord.ui.DynamicItem[discord.ui.Button],
+                          template=r"planner:admin:addrm-tile:(?P<planner_id>[0-9]+)"):
     def __init__(self,
                  add_callback: AddTileCallback,
                  remove_callback: TileSelectCallback,
@@ -181,11 +217,19 @@ class AddRemoveTileButton(discord.ui.Button):
         self.add_callback = add_callback
         self.remove_callback = remove_callback
         self.planner_id = planner_id
-        super().__init__(
+        super().__init__(discord.ui.Button(
             label="Add/Remove Tile",
             custom_id=f"planner:admin:addrm-tile:{planner_id}"[:100],
             style=discord.ButtonStyle.gray
-        )
+        ))
+
+    @classmethod
+    async def from_custom_id(cls,
+                             interaction: discord.Interaction,
+                             item: discord.ui.Button,
+                             match) -> "AddRemoveTileButton":
+        cog = interaction.client.get_cog("PlannerCog")
+        return cls(cog.add_planner_tile, cog.remove_planner_tile, int(match["planner_id"]))
 
     @check_manage_guild
     async def callback(self, interaction: discord.Interaction) -> Any:
@@ -209,7 +253,7 @@ class PlannerAdminView(discord.ui.View):
         self.planner_id = planner_channel_id
         self.refresh_planner = refresh_planner
         self.add_item(
-            SwitchPlannerButton(self.switch_planner, planner_active, self.planner_id)
+            SwitchPlannerButton(refresh_planner, planner_active, self.planner_id)
         )
         # self.add_item(
         #     ClearPlannerButton(self.clear_planner, self.planner_id)
@@ -224,14 +268,6 @@ class PlannerAdminView(discord.ui.View):
             AddRemoveTileButton(add_planner_tile, remove_planner_tile, self.planner_id)
         )
 
-    async def switch_planner(self, interaction: discord.Interaction, new_active: bool) -> None:
-        await bot.db.queries.planner.turn_planner(self.planner_id, new_active)
-        await interaction.response.send_message(
-            content=f"The planner has been turned {'on' if new_active else 'off'}!",
-            ephemeral=True
-        )
-        await self.refresh_planner(self.planner_id)
-
     async def clear_planner(self, interaction: discord.Interaction):
         await bot.db.queries.planner.set_clear_time(self.planner_id, datetime.now())
         await interaction.response.send_message(
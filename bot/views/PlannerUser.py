@@ -8,18 +8,34 @@ SwitchTileCallback = Callable[[discord.User, int, str], Awaitable[tuple[str, boo
 RefreshPlannerCallback = Callable[[int], Awaitable[None]]
 
 
-class BannerSelect(discord.ui.Select):
+class BannerSelect(discord.ui.DynamicItem[discord.ui.Select],
+                   template=r"planner:user:banner-select:(?P<planner_id>[0-9]+)-(?P<idx>[0-9]+)"):
+    """
+    Routed by custom_id, so it works on any planner message without a view
+    being registered for it. The planner's state is loaded when a tile is selected.
+    """
     def __init__(self,
-                 banners: list[tuple[str, bool]],
+                 item: discord.ui.Select,
                  planner_id: int,
-                 select_idx: int = 0,
-                 preview_list: bool = False,
-                 callback: Callable = None):
+                 switch_tile_callback: SwitchTileCallback,
+                 refresh_planner: RefreshPlannerCallback):
+        super().__init__(item)
+        self.planner_id = planner_id
+        self.switch_tile_callback = switch_tile_callback
+        self.refresh_planner = refresh_planner
+
+    @classmethod
+    def from_banners(cls,
+                     banners: list[tuple[str, bool]],
+                     planner_id: int,
+                     switch_tile_callback: SwitchTileCallback,
+                     refresh_planner: RefreshPlannerCallback,
+                     select_idx: int = 0,
+                     preview_list: bool = False) -> "BannerSelect":
         options = [
             discord.SelectOption(label=code, emoji=X if claimed else ARROW_RIGHT)
             for code, claimed in banners
         ]
-        self.callback_func = callback
 
         placeholder = "Claim a tile"
         if preview_list:
@@ -28,15 +44,34 @@ class BannerSelect(discord.ui.Select):
             else:
                 placeholder = f"Claim {banners[0][0]}"
 
-        super().__init__(
-            placeholder=placeholder,
-            options=options,
-            custom_id=f"planner:user:banner-select:{planner_id}-{select_idx}"[:100]
+        return cls(
+            discord.ui.Select(
+                placeholder=placeholder,
+                options=options,
+                custom_id=f"planner:user:banner-select:{planner_id}-{select_idx}"[:100]
+            ),
+            planner_id,
+            switch_tile_callback,
+            refresh_planner,
         )
 
+    @classmethod
+    async def from_custom_id(cls,
+                             interaction: discord.Interaction,
+                             item: discord.ui.Select,
+                             match) -> "BannerSelect":
+        cog = interaction.client.get_cog("PlannerCog")
+        return cls(item, int(match["planner_id"]), cog.switch_tile_claim, cog.send_planner_msg)
+
     async def callback(self, interaction: discord.Interaction) -> None:
-        if self.callback_func:
-            await self.callback_func(interaction, self.values[0])
+        tile = self.item.values[0]
+        response_content, should_refresh = await self.switch_tile_callback(interaction.user, self.planner_id, tile)
+        await interaction.response.send_message(
+            content=response_content,
+            ephemeral=True
+        )
+        if should_refresh:
+            await self.refresh_planner(self.planner_id)
 
 
 class PlannerUserView(discord.ui.View):
@@ -51,25 +86,15 @@ class PlannerUserView(discord.ui.View):
         banners = sorted(banners, key=lambda x: x[0])
         self.banners = banners
         self.planner_channel_id = planner_channel_id
-        self.refresh_planner = refresh_planner
-        self.switch_tile_callback = switch_tile_callback
 
         banner_idx = 0
         while banner_idx < len(banners):
-            select = BannerSelect(
+            select = BannerSelect.from_banners(
                 banners[banner_idx:banner_idx+25],
                 planner_channel_id,
+                switch_tile_callback,
+                refresh_planner,
                 select_idx=int(banner_idx/25),
-                preview_list=(len(banners) > 25),
-                callback=self.switch_tile)
+                preview_list=(len(banners) > 25))
             self.add_item(select)
             banner_idx += 25
-
-    async def switch_tile(self, interaction: discord.Interaction, tile: str) -> None:
-        response_content, should_refresh = await self.switch_tile_callback(interaction.user, self.planner_channel_id, tile)
-        await interaction.response.send_message(
-            content=response_content,
-            ephemeral=True
-        )
-        if should_refresh:
-            await self.refresh_planner(self.planner_channel_id)
@@ -1,6 +1,7 @@
 import discord
 from typing import Any, Callable, Awaitable
 import bot.utils.bloons
+from bot.utils.Tile import Tile
 
 
 SelectPageCallback = Callable[[discord.Interaction, int], Awaitable[None]]
@@ -22,7 +23,7 @@ class TileButton(discord.ui.Button):
 class SpawnlockPaginateView(discord.ui.View):
     """A list of actions usable by every user in the team."""
     def __init__(self,
-                 tile_data: list[dict[str, Any]],
+                 tile_data: list[Tile],
                  original_interaction: discord.Interaction = None,
                  timeout: float = 180,
                  current: int = 0):
@@ -32,7 +33,7 @@ class SpawnlockPaginateView(discord.ui.View):
         self.original_interaction = original_interaction
 
         for i in range(len(tile_data)):
-            self.add_item(TileButton(tile_data[i]["Code"], i, self.edit_embed, i == self.current))
+            self.add_item(TileButton(tile_data[i].code, i, self.edit_embed, i == self.current))
 
     def set_original_interaction(self, original_interaction: discord.Interaction) -> None:
         self.original_interaction = original_interaction
@@ -53,11 +54,11 @@ class SpawnlockPaginateView(discord.ui.View):
             return
 
         await interaction.response.send_message(
-            content=f"ⓘ Showing tile **{self.tile_data[tile_idx]['Code']}**!",
+            content=f"ⓘ Showing tile **{self.tile_data[tile_idx].code}**!",
             ephemeral=True,
         )
 
-        embed = bot.utils.bloons.raw_challenge_to_embed(self.tile_data[tile_idx])
+        embed = bot.utils.bloons.get_tile_embed(self.tile_data[tile_idx])
         await self.original_interaction.edit_original_response(
             embed=embed,
             view=SpawnlockPaginateView(self.tile_data, self.original_interaction, current=tile_idx),
@@ -5,6 +5,32 @@ DB_USER = "postgres"
 DB_PSWD = "postgres"
 DB_HOST = "127.0.0.1"
 DB_NAME = "ct_ticket_tracker"
+# Optional, these are the defaults
+DB_POOL_MIN_SIZE = 2
+DB_POOL_MAX_SIZE = 10
+DB_COMMAND_TIMEOUT = 30  # Seconds the bot waits for a query before giving up
+DB_STATEMENT_TIMEOUT = 30  # Seconds PostgreSQL lets a statement run before cancelling it
+DB_SLOW_QUERY_MS = 250  # Queries slower than this get logged
+
+# Optional. "all" caches every member of every guild (the default), "features" only
+# caches members of guilds with an active planner, of the ones in MEMBER_CACHE_GUILDS
+# and of the ones cogs need them in (like Welcome's server)
+MEMBER_CACHE_POLICY = "all"
+MEMBER_CACHE_GUILDS = [
+
+]
+
+# Optional. Total number of shards, None lets Discord decide. With SHARD_PROCESSES > 1
+# the shards are split among that many processes.
+SHARD_COUNT = None
+SHARD_PROCESSES = 1
+# Optional. The background jobs (leaderboards, planner refreshes & pings, event rollover)
+# run in only one process at a time, elected through PostgreSQL. If it stops renewing its
+# leadership for this many seconds, another process takes over.
+LEADER_LEASE_SECONDS = 30
+# Optional. With SHARD_PROCESSES > 1, how many of the processes can be elected to run the
+# background jobs. The others never do, so they don't keep a connection open for the election.
+BACKGROUND_JOB_PROCESSES = 2
 
 # Will have access to the commands in bot/cogs/OwnerCog.py
 CO_OWNER_IDS = [
@@ -1,31 +1,79 @@
+import argparse
+import math
+import subprocess
+import sys
 import discord
 import logging
 from datetime import datetime
+import config
 import bot.db.connection
+import bot.db.invalidation
 from bot import __version__
+import bot.utils.io
+import bot.utils.bloons
+from bot.utils.Scheduler import Scheduler
+from bot.utils.StateStore import StateStore
+from bot.utils.Resolver import Resolver
+from bot.utils.Outbound import Outbound
+from bot.utils.MemberCachePolicy import MemberCachePolicy
+from bot.utils.LeaderElection import LeaderElection
 from discord.ext import commands
 from config import TOKEN, APP_ID
 
 
-class CtTicketTracker(commands.Bot):
-    def __init__(self):
+class CtTicketTracker(commands.AutoShardedBot):
+    def __init__(self,
+                 shard_ids: list[int] or None = None,
+                 shard_count: int or None = None,
+                 background_jobs: bool = True):
+        """
+        :param shard_ids: The shards this process runs. None to run all of them.
+        :param shard_count: The total number of shards. None to use the amount Discord recommends.
+        :param background_jobs: If False, this process won't run the loops that work on every guild
+                                (leaderboards, planner refreshes & pings, event rollover). If True,
+                                it runs each of them while it's the elected leader for it.
+        """
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
+        self.member_cache = MemberCachePolicy(self)
+        member_cache_kwargs = {"chunk_guilds_at_startup": self.member_cache.chunk_guilds_at_startup}
+        if self.member_cache.member_cache_flags is not None:
+            member_cache_kwargs["member_cache_flags"] = self.member_cache.member_cache_flags
         super().__init__(
             command_prefix=",,,",
             intents=intents,
             application_id=APP_ID,
             activity=discord.Game(name=f"/help"),
             log_level=logging.ERROR,
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+            **member_cache_kwargs,
         )
+        self.background_jobs = background_jobs
         self.remove_command("help")
         self.version = __version__
         self.last_restart = datetime.now()
         self.synced_tree = None
+        self.state = StateStore(f"{bot.utils.io.CACHE_DIR}/state.db")
+        # Every process has its own scheduler, which saves its durable jobs under its own name
+        self.scheduler = Scheduler(
+            self.state,
+            state_name="scheduler" if shard_ids is None else f"scheduler-{shard_ids[0]}",
+        )
+        self.resolver = Resolver(self)
+        self.outbound = Outbound()
+        self.leader = LeaderElection(lease=getattr(config, "LEADER_LEASE_SECONDS", 30))
+        self.add_listener(self.member_cache.on_member_join)
+        self.add_listener(self.member_cache.refresh, "on_ready")
 
     async def setup_hook(self):
         await bot.db.connection.start()
+        await bot.db.invalidation.start()
+        await self.scheduler.load_state()
+        self.scheduler.start()
+        if self.background_jobs:
+            self.leader.start()
         cogs = [
             "OwnerCog",
             "TrackerCog",
@@ -40,6 +88,19 @@ class CtTicketTracker(commands.Bot):
         for cog in cogs:
             await self.load_extension(f"bot.cogs.{cog}")
 
+    async def close(self):
+        # Lets the other processes take over right away instead of waiting for the lease to run out
+        await self.leader.stop()
+        await bot.db.invalidation.stop()
+        await super().close()
+        await self.state.close()
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether a guild is on one of the shards this process runs."""
+        if self.shard_ids is None:
+            return True
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
     async def get_app_command(self, cmd_name: str) -> discord.app_commands.AppCommand or None:
         if self.synced_tree is None:
             self.synced_tree = await self.tree.fetch_commands()
@@ -54,5 +115,63 @@ class CtTicketTracker(commands.Bot):
                     return
 
 
+def parse_shard_range(shard_range: str) -> list[int]:
+    """Parses a range of shard IDs like "0-3" (both included) or a single ID like "2"."""
+    first, _, last = shard_range.partition("-")
+    return list(range(int(first), int(last if last else first)+1))
+
+
+def launch_shard_processes(shard_count: int, processes: int, background_job_processes: int) -> None:
+    """Runs the bot in several processes, each with a range of shards, and waits for them.
+
+    :param background_job_processes: How many of them can run the background jobs. One is
+                                     enough, the others only stand by in case it stops.
+    """
+    per_process = math.ceil(shard_count / processes)
+    children = []
+    for first in range(0, shard_count, per_process):
+        last = min(first+per_process, shard_count) - 1
+        command = [sys.executable, __file__, "--shards", f"{first}-{last}"]
+        if len(children) >= background_job_processes:
+            command.append("--no-background-jobs")
+        children.append(subprocess.Popen(command))
+    try:
+        for child in children:
+            child.wait()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+
+
 if __name__ == '__main__':
-    CtTicketTracker().run(TOKEN)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", help="Range of shard IDs to run in this process, like 0-3")
+    parser.add_argument("--no-background-jobs", action="store_true",
+                        help="Never run the background jobs in this process, leave them to the others")
+    parser.add_argument("--compile-snapshots", nargs="*", metavar="SEASON",
+                        help="Compile the tile snapshots of the given seasons (the current one if none) and exit")
+    args = parser.parse_args()
+
+    if args.compile_snapshots is not None:
+        for season in args.compile_snapshots or [None]:
+            try:
+                tiles = bot.utils.bloons.compile_season_snapshot(int(season) if season is not None else None)
+                print(f"Compiled {len(tiles)} tiles of season {season or 'current'}")
+            except (FileNotFoundError, ValueError) as exc:
+                print(f"Couldn't compile season {season or 'current'}: {exc}")
+        sys.exit(0)
+
+    SHARD_COUNT = getattr(config, "SHARD_COUNT", None)
+    SHARD_PROCESSES = getattr(config, "SHARD_PROCESSES", 1)
+    BACKGROUND_JOB_PROCESSES = getattr(config, "BACKGROUND_JOB_PROCESSES", 2)
+    if args.shards is None and SHARD_COUNT is not None and SHARD_PROCESSES > 1:
+        launch_shard_processes(SHARD_COUNT, SHARD_PROCESSES, BACKGROUND_JOB_PROCESSES)
+    else:
+        shards = parse_shard_range(args.shards) if args.shards is not None else None
+        if shards is not None and SHARD_COUNT is None:
+            parser.error("SHARD_COUNT must be set in config.py to run a range of shards")
+        CtTicketTracker(
+            shard_ids=shards,
+            shard_count=SHARD_COUNT,
+            background_jobs=not args.no_background_jobs,
+        ).run(TOKEN)